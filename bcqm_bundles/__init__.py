@@ -2,15 +2,27 @@
 
 Stage-1 toy models for bundles of soft-rudder threads, supporting:
 - independent bundles (no coupling),
-- shared-bias coupling.
+- shared-bias coupling,
+- local coupling on a thread graph.
 """
 
 __all__ = [
     "config_schemas",
     "kernels",
+    "graphs",
+    "jit",
+    "bitpacked",
     "phase_dynamics",
     "simulate",
     "analysis",
+    "pyramid",
+    "sketches",
+    "bench",
+    "sharedmem",
+    "sweep",
+    "instrument",
+    "planner",
+    "catalog",
 ]
 
 __version__ = "0.1.0"
@@ -2,19 +2,83 @@
 
 Provides:
   * PSD estimation for acceleration time series,
-  * extraction of A_COM in a frequency band,
-  * flip statistics P(k) and kappa_eff,
-  * summary alignment and lifetime statistics.
+  * extraction of A_COM in a frequency band, from full Welch spectra or
+    from a band-limited (decimated) estimator,
+  * flip statistics P(k) and kappa_eff, per step and over windows of
+    several lengths,
+  * summary alignment and lifetime statistics,
+  * FFT autocorrelations, integrated autocorrelation times and effective
+    sample sizes of S_v, the COM velocity and the COM direction sign,
+  * bootstrap confidence intervals for A_COM, suppression ratios and
+    beta_COM(N) across the pairs of a run.
 """
 
 from __future__ import annotations
 
+import json
+import math
 import os
-from typing import Dict, Tuple
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 
-from .config_schemas import TopLevelConfig
+from .config_schemas import (
+    AutocorrelationConfig,
+    BootstrapConfig,
+    TopLevelConfig,
+    coupling_strengths,
+    window_sizes,
+)
+from .kernels import slip_probability
+from .sketches import KLLSketch, write_sketches
+
+
+TIMESERIES_FILE = "timeseries.npz"
+SUMMARY_FILE = "summary.json"
+BAND_AMPLITUDES_FILE = "band_amplitudes.npy"
+FLIP_DISTRIBUTIONS_FILE = "flip_distributions.npz"
+MEMBER_VALUES_FILE = "member_values.npz"
+
+# summary.json key reserved for run-level statistics; every other key is a
+# W{W}_N{N} pair entry.
+RUN_SUMMARY_KEY = "_run"
+
+# Run tree of the lambda = 0 replica (simulate.lambda_dir_name(0.0)), the
+# control variate of analysis.control_variate.
+CONTROL_TREE = "lambda0"
+
+# Upper bound on samples (or segment samples) per chunk in
+# band_limited_amplitudes and decimate.
+_PSD_CHUNK = 1 << 22
+
+# Guard band, in frequency bins of the original segments, between fmax and
+# the edges of the anti-alias filter of band_limited_amplitudes: the
+# passband reaches fmax + guard, and nothing above the stopband edge
+# aliases to within guard bins of the band.
+_BAND_GUARD_BINS = 8
+
+# Stopband attenuation of that filter (its passband ripple is about the
+# same, ~1e-5 relative in amplitude).
+_BAND_ATTENUATION_DB = 100.0
+
+# Cost of an rfft per sample and per log2 of its length, in filter
+# multiply-adds (NumPy's pocketfft against a BLAS matrix-vector product);
+# decimation_plan weighs filter taps against segment transforms with it.
+_FFT_COST = 1.3
+
+# Upper bound on resample indices drawn at once by bootstrap_means.
+_BOOTSTRAP_CHUNK = 1 << 22
+
+# Upper bound on windowed flip counts formed at once by
+# windowed_flip_distributions.
+_WINDOW_CHUNK = 1 << 22
+
+# Upper bound on FFT buffer elements per chunk of members in autocovariance.
+_ACF_CHUNK = 1 << 22
+
+# Series whose integrated autocorrelation time analyse_pair reports.
+AUTOCORRELATION_SERIES = ("Sv", "velocity", "dir_sign")
 
 
 def _hann_window(M: int) -> np.ndarray:
@@ -86,17 +150,635 @@ def amplitude_from_band(freqs: np.ndarray, Pxx: np.ndarray, fmin: float, fmax: f
     return float(np.sqrt(band_power))
 
 
+def antialias_filter(D: int, fs: float, fmax: float, guard: float) -> Optional[np.ndarray]:
+    """Zero-phase low-pass FIR for decimation by D, or None if D aliases into the band.
+
+    A Kaiser-windowed sinc with unit DC gain, passband up to fmax + guard
+    and stopband from fs / D - fmax - guard (frequencies above that alias
+    to at least guard above fmax), attenuated by _BAND_ATTENUATION_DB. The
+    length, always odd, depends only on the transition width relative to
+    fs, not on the segment length.
+    """
+    f_pass = fmax + guard
+    f_stop = fs / D - fmax - guard
+    if f_stop <= f_pass:
+        return None
+    A = _BAND_ATTENUATION_DB
+    taps = int(np.ceil((A - 8.0) / (2.285 * 2.0 * np.pi * (f_stop - f_pass) / fs))) | 1
+    n = np.arange(taps) - taps // 2
+    fc = 0.5 * (f_pass + f_stop) / fs
+    h = 2.0 * fc * np.sinc(2.0 * fc * n) * np.kaiser(taps, 0.1102 * (A - 8.7))
+    return h / h.sum()
+
+
+def decimation_plan(fs: float, seg_len: int, overlap: float, fmax: float) -> Tuple[int, Optional[np.ndarray]]:
+    """(D, filter) for band_limited_amplitudes; D = 1 (no filter) when that is cheapest.
+
+    D must divide both seg_len and the segment step, so that decimated
+    segments start on original samples. Among those, D minimises the
+    estimated cost per input sample: filter taps / D multiply-adds plus
+    the segment transforms, _FFT_COST log2(seg_len / D) / (D (1 - overlap)).
+    """
+    step = int(seg_len * (1.0 - overlap))
+    if step <= 0:
+        step = seg_len
+    guard = _BAND_GUARD_BINS * fs / seg_len
+    best = (_FFT_COST * np.log2(seg_len) * seg_len / step, 1, None)
+    for D in range(2, seg_len // 2 + 1):
+        if seg_len % D or step % D:
+            continue
+        h = antialias_filter(D, fs, fmax, guard)
+        if h is None:
+            break
+        if h.size > seg_len // D // 4:
+            continue  # the filter would smear the window edges
+        cost = (h.size + _FFT_COST * np.log2(seg_len // D) * seg_len / step) / D
+        if cost < best[0]:
+            best = (cost, D, h)
+    return best[1], best[2]
+
+
+def decimate(x: np.ndarray, h: np.ndarray, D: int) -> np.ndarray:
+    """Filter (n, T) series with the zero-phase FIR h and keep every D-th sample.
+
+    Polyphase: only the kept outputs are computed, y[m] = sum_j h[j]
+    x[m D + j - len(h) // 2], zero outside the series, as matrix-vector
+    products over chunks of outputs, so the working memory is bounded by
+    _PSD_CHUNK rather than by T.
+    """
+    n, T = x.shape
+    taps, half = h.size, h.size // 2
+    n_out = -(-T // D)
+    y = np.empty((n, n_out), dtype=float)
+    rows = max(1, _PSD_CHUNK // (n * taps))
+    for m0 in range(0, n_out, rows):
+        m1 = min(n_out, m0 + rows)
+        lo, hi = m0 * D - half, (m1 - 1) * D + taps - half
+        piece = x[:, max(lo, 0):min(hi, T)]
+        if lo < 0 or hi > T:
+            piece = np.pad(piece, ((0, 0), (max(-lo, 0), max(hi - T, 0))))
+        windows = np.lib.stride_tricks.sliding_window_view(piece, taps, axis=1)[:, ::D]
+        y[:, m0:m1] = windows @ h[::-1]
+    return y
+
+
+def band_limited_amplitudes(
+    x: np.ndarray,
+    fs: float,
+    seg_len: int,
+    overlap: float,
+    fmin: float,
+    fmax: float,
+) -> np.ndarray:
+    """Band amplitudes of (n_ens, T) series without full-resolution Welch spectra.
+
+    Each series is low-passed and decimated by D with a streaming
+    polyphase FIR (decimation_plan, decimate), which leaves [0, fmax]
+    intact; the Welch segments are then taken from the decimated series
+    (seg_len / D samples, starting on the same original steps) and
+    transformed in batched FFTs, keeping only the bins in [fmin, fmax].
+    These are the bins of welch_psd, so the amplitudes agree with
+    amplitude_from_band(*welch_psd(...)) up to the filter ripple and the
+    Hann leakage of the removed frequencies.
+
+    The filter length depends on the band, not on seg_len, and memory is
+    bounded by the chunk sizes. The gain over welch_psd is limited by the
+    band, though: for the default fmax = 0.1 D is at most 4, and the FIR
+    (about 130 taps at D = 4) costs about as much as the transforms it
+    saves, so the two estimators take about the same time (see README).
+    Narrow, low bands allow large D and gain accordingly.
+
+    Returns one amplitude per member.
+    """
+    x = np.asarray(x, dtype=float)
+    n_ens, T = x.shape
+    step = int(seg_len * (1.0 - overlap))
+    if step <= 0:
+        step = seg_len
+    n_seg = (T - seg_len) // step + 1 if T >= seg_len else 0
+    if n_seg <= 0:
+        raise ValueError("Time series too short for given seg_len")
+
+    D, h = decimation_plan(fs, seg_len, overlap, fmax)
+    M, hop = seg_len // D, step // D
+    window = _hann_window(M)
+    U = (window**2).sum()
+    freqs = np.fft.rfftfreq(M, d=D / fs)
+    mask = (freqs >= fmin) & (freqs <= fmax)
+    if not np.any(mask):
+        raise ValueError("No frequencies in requested band")
+
+    power = np.zeros(n_ens, dtype=float)
+    chunk = max(1, _PSD_CHUNK // T)
+    for i in range(0, n_ens, chunk):
+        y = decimate(x[i:i + chunk], h, D) if D > 1 else x[i:i + chunk]
+        segs = np.lib.stride_tricks.sliding_window_view(y, M, axis=1)[:, : (n_seg - 1) * hop + 1 : hop]
+        per = max(1, _PSD_CHUNK // (y.shape[0] * M))
+        for j in range(0, n_seg, per):
+            Xf = np.fft.rfft(segs[:, j:j + per] * window, axis=-1)[..., mask]
+            power[i:i + chunk] += (Xf.real**2 + Xf.imag**2).sum(axis=(1, 2))
+    band_power = power / (n_seg * np.count_nonzero(mask)) * D / (fs * U)
+    return np.sqrt(band_power)
+
+
+def band_amplitudes(
+    x: np.ndarray,
+    fs: float,
+    seg_len: int,
+    overlap: float,
+    fmin: float,
+    fmax: float,
+    estimator: str = "welch",
+) -> np.ndarray:
+    """Per-member band amplitudes of (n_ens, T) series.
+
+    estimator "welch" takes amplitude_from_band of each member's full
+    welch_psd; "band" uses band_limited_amplitudes.
+    """
+    if estimator == "welch":
+        amps = []
+        for series in x:
+            freqs, Pxx = welch_psd(series, fs=fs, seg_len=seg_len, overlap=overlap)
+            amps.append(amplitude_from_band(freqs, Pxx, fmin=fmin, fmax=fmax))
+        return np.asarray(amps, dtype=float)
+    if estimator == "band":
+        return band_limited_amplitudes(x, fs, seg_len, overlap, fmin, fmax)
+    raise ValueError(f"Unknown analysis.psd.estimator {estimator!r}")
+
+
+def kappa_from_distribution(Pk: np.ndarray) -> Tuple[float, float, float]:
+    """(P0, P1, kappa_eff) of a flip-count distribution P(k).
+
+    kappa_eff = log(P0 / P1), or inf when one flip is (almost) never seen.
+    """
+    P0 = float(Pk[0]) if Pk.size > 0 else 0.0
+    P1 = float(Pk[1]) if Pk.size > 1 else 0.0
+
+    eps = 1e-12
+    if P1 < eps:
+        kappa_eff = float("inf")
+    else:
+        kappa_eff = float(np.log((P0 + eps) / (P1 + eps)))
+    return P0, P1, kappa_eff
+
+
+def windowed_flip_distributions(
+    flips: np.ndarray,
+    windows: Sequence[int],
+    windowing: str = "sliding",
+    member_k: int = 0,
+):
+    """Distributions P_w(k) of flip counts summed over windows of w steps.
+
+    "sliding" windows start at every step; "blocked" windows tile each
+    trajectory without overlap (a partial last block is dropped). Every
+    window of every length is a difference of one cumulative sum over
+    flips of shape (n_ens, steps), and all of them are histogrammed with
+    one bincount per chunk of members.
+
+    Returns P of shape (len(windows), k_max + 1), one normalised row per
+    window length (all NaN if the window is longer than the series).
+    With member_k > 0 returns (P, P_member) instead, where P_member of
+    shape (n_ens, len(windows), member_k) holds each member's own P_w(k)
+    for k < member_k, histogrammed from the same window counts with a
+    second bincount keyed by member.
+    """
+    flips = np.asarray(flips)
+    n_ens, steps = flips.shape
+    w = np.asarray(windows, dtype=np.int64)
+    C = np.zeros((n_ens, steps + 1), dtype=np.int64)
+    np.cumsum(flips, axis=1, out=C[:, 1:])
+
+    if windowing == "sliding":
+        n_win = np.maximum(steps - w + 1, 0)
+        stride = np.ones_like(w)
+    elif windowing == "blocked":
+        n_win = steps // w
+        stride = w
+    else:
+        raise ValueError(f"Unknown windowing {windowing!r}")
+
+    # Start and end of every window, all lengths concatenated; row tells
+    # which window length each one belongs to.
+    row = np.repeat(np.arange(w.size), n_win)
+    first = np.repeat(np.cumsum(n_win) - n_win, n_win)
+    starts = (np.arange(row.size) - first) * stride[row]
+    ends = starts + w[row]
+
+    width = int(w.max()) * (int(flips.max()) if flips.size else 0) + 1
+    offset = row * width
+    counts = np.zeros(w.size * width, dtype=np.int64)
+    # Per-member counts of k = 0 .. member_k - 1, with k >= member_k
+    # pooled into one overflow bin.
+    member_width = member_k + 1
+    member_counts = np.zeros((n_ens, w.size, member_width), dtype=np.int64)
+    chunk = max(1, _WINDOW_CHUNK // max(row.size, 1))
+    for i in range(0, n_ens, chunk):
+        block = C[i:i + chunk]
+        k = block[:, ends] - block[:, starts]
+        if member_k:
+            m = np.arange(block.shape[0])[:, None] * w.size + row
+            key = m * member_width + np.minimum(k, member_k)
+            member_counts[i:i + chunk] = np.bincount(
+                key.ravel(), minlength=block.shape[0] * w.size * member_width
+            ).reshape(block.shape[0], w.size, member_width)
+        k += offset
+        counts += np.bincount(k.ravel(), minlength=counts.size)
+
+    counts = counts.reshape(w.size, width)
+    used = np.flatnonzero(counts.any(axis=0))
+    counts = counts[:, : (used[-1] + 1 if used.size else 1)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        P = counts / (n_win * n_ens)[:, None].astype(float)
+        if not member_k:
+            return P
+        P_member = member_counts[..., :member_k] / n_win[:, None].astype(float)
+    return P, P_member
+
+
+def autocovariance(x: np.ndarray) -> np.ndarray:
+    """Autocovariance C(t), t = 0..T-1, of (n_ens, T) series pooled over members.
+
+    Each member is centred on its own mean and correlated with itself by a
+    zero-padded FFT (no wrap-around), in chunks of members; C(t) is the
+    member average of sum_s dx_s dx_{s+t} / T.
+    """
+    x = np.asarray(x, dtype=float)
+    n_ens, T = x.shape
+    nfft = 1 << (2 * T - 2).bit_length()  # power of two >= 2T - 1
+    C = np.zeros(T, dtype=float)
+    chunk = max(1, _ACF_CHUNK // nfft)
+    for i in range(0, n_ens, chunk):
+        block = x[i:i + chunk]
+        block = block - block.mean(axis=1, keepdims=True)
+        F = np.fft.rfft(block, n=nfft, axis=1)
+        power = F.real ** 2 + F.imag ** 2
+        C += np.fft.irfft(power, n=nfft, axis=1)[:, :T].sum(axis=0)
+    return C / (n_ens * T)
+
+
+def integrated_autocorr_time(x: np.ndarray, window_c: float = 5.0) -> Tuple[float, float]:
+    """Integrated autocorrelation time and effective sample size of (n_ens, T) series.
+
+    tau_int(M) = 1 + 2 sum_{t=1}^{M} rho(t) is evaluated with Sokal's
+    automatic window, the smallest M with M >= window_c * tau_int(M).
+    Returns (tau_int, ess) with ess = n_ens * T / tau_int the effective
+    number of independent samples in the ensemble; both are NaN for a
+    constant series.
+    """
+    C = autocovariance(x)
+    if not C[0] > 0:
+        return float("nan"), float("nan")
+    n_ens, T = np.shape(x)
+    tau = 2.0 * np.cumsum(C / C[0]) - 1.0
+    inside = np.arange(T) >= window_c * tau
+    M = int(np.argmax(inside)) if inside.any() else T - 1
+    tau_int = float(tau[M])
+    ess = n_ens * T / tau_int if tau_int > 0 else float("inf")
+    return tau_int, float(ess)
+
+
+def com_velocity(acceleration: np.ndarray, V0: np.ndarray, N: int) -> np.ndarray:
+    """COM velocity V(t), t = 0..steps-2, from the accelerations and V(0).
+
+    Velocities are means of N directions, i.e. multiples of 1/N, so the
+    cumulative sum is snapped back onto that grid (this keeps V == 0, and
+    hence the direction sign, exact).
+    """
+    acc = np.asarray(acceleration, dtype=float)
+    V = np.empty_like(acc)
+    V[:, 0] = V0
+    np.cumsum(acc[:, :-1], axis=1, out=V[:, 1:])
+    V[:, 1:] += np.asarray(V0)[:, None]
+    return np.round(V * N) / N
+
+
+def com_position(acceleration: np.ndarray, V0: np.ndarray, N: int) -> np.ndarray:
+    """COM position X(t), t = 0..steps-1, from the accelerations and V(0).
+
+    All threads start at x = 0, so X(0) = 0; like the velocity, X is
+    snapped onto the 1/N grid.
+    """
+    V = com_velocity(acceleration, V0, N)
+    X = np.zeros((V.shape[0], V.shape[1] + 1), dtype=float)
+    np.cumsum(V, axis=1, out=X[:, 1:])
+    return np.round(X * N) / N
+
+
+def autocorrelation_summary(
+    data: Dict[str, np.ndarray],
+    N: int,
+    acf_cfg: AutocorrelationConfig,
+) -> Dict[str, float]:
+    """tau_int_<series> and ess_<series> for S_v, COM velocity and dir_sign.
+
+    The velocity and direction sign need the V0 array stored by newer runs;
+    for older timeseries.npz files only S_v is reported.
+    """
+    series = {"Sv": data["Sv"]}
+    if "V0" in data:
+        V = com_velocity(data["acceleration"], data["V0"], N)
+        series["velocity"] = V
+        series["dir_sign"] = np.sign(V)
+    out: Dict[str, float] = {}
+    for name in AUTOCORRELATION_SERIES:
+        if name in series:
+            tau_int, ess = integrated_autocorr_time(series[name], acf_cfg.window_c)
+            out[f"tau_int_{name}"] = tau_int
+            out[f"ess_{name}"] = ess
+    return out
+
+
+def _pair_size(pair_dir: str) -> int:
+    """Bundle size N from a pair directory name W{W}_N{N}."""
+    return int(os.path.basename(os.path.normpath(pair_dir)).rsplit("_N", 1)[1])
+
+
+def lifetime_summary(lifetimes: np.ndarray, survived: np.ndarray) -> Dict[str, float]:
+    """Mean and median lifetime and the fraction of members that survived."""
+    return {
+        "mean_lifetime": float(lifetimes.mean()),
+        "median_lifetime": float(np.median(lifetimes)),
+        "frac_survived": float(survived.mean()),
+    }
+
+
+def write_pair_sketches(cfg: TopLevelConfig, pair_dir: str, values: Dict[str, np.ndarray]) -> None:
+    """Write KLL sketches of per-member values to sketches.json (analysis.sketch.k > 0).
+
+    Each sketch's coin flips are seeded from analysis.sketch.seed and a
+    checksum of its values, so sketches of different shards, to be merged
+    later, do not share them.
+    """
+    sketch_cfg = cfg.analysis.sketch
+    if sketch_cfg.k > 0:
+        sketches = {}
+        for name, v in values.items():
+            v = np.ascontiguousarray(v, dtype=float)
+            sketches[name] = KLLSketch(sketch_cfg.k, [sketch_cfg.seed, zlib.crc32(v)]).update(v)
+        write_sketches(pair_dir, sketches)
+
+
+def independent_flip_probabilities(q: float, n: int) -> Tuple[float, float]:
+    """(P0, P1) of the flips of n independent threads, each flipping with probability q.
+
+    For the lambda = 0 replica flips are Bernoulli(q) in every thread and
+    step whatever the state, so n = N w for windows of w steps.
+    """
+    return float((1.0 - q) ** n), float(n * q * (1.0 - q) ** (n - 1))
+
+
+def independent_mean_Sv(N: int) -> float:
+    """E[S_v] of N independent threads.
+
+    Directions start as fair coins and symmetric flips keep them so, hence
+    S_v = |2 B - N| / N with B ~ Binomial(N, 1/2) at every step.
+    """
+    pmf = np.array([math.comb(N, b) / 2**N for b in range(N + 1)])
+    return float(np.sum(pmf * np.abs(2 * np.arange(N + 1) - N)) / N)
+
+
+def independent_band_power(q: float, N: int, fs: float, seg_len: int, fmin: float, fmax: float) -> float:
+    """Expected Welch band power (A_COM^2) of N independent threads.
+
+    The COM velocity is a mean of N telegraph processes with correlation
+    rho^|t|, rho = 1 - 2q, so the acceleration a = diff(V) has
+    autocovariance (2 - 2 rho) / N at lag 0 and -rho^(t-1) (1 - rho)^2 / N
+    at lag t >= 1. The expected segment periodogram is the window-weighted
+    transform of that autocovariance; the symmetric Hann window gives the
+    last sample of the series zero weight, so every segment has the same
+    expectation.
+    """
+    rho = 1.0 - 2.0 * q
+    lags = np.arange(seg_len)
+    R = np.empty(seg_len)
+    R[0] = 2.0 - 2.0 * rho
+    R[1:] = -(rho ** (lags[1:] - 1)) * (1.0 - rho) ** 2
+    R /= N
+    window = _hann_window(seg_len)
+    U = (window**2).sum()
+    W = np.fft.rfft(window, 2 * seg_len)
+    c = np.fft.irfft(np.abs(W) ** 2, 2 * seg_len)[:seg_len]  # window autocorrelation
+    g = R * c
+    Pxx = (2.0 * np.fft.rfft(g).real - g[0]) / (fs * U)
+    freqs = np.fft.rfftfreq(seg_len, d=1.0 / fs)
+    mask = (freqs >= fmin) & (freqs <= fmax)
+    return float(Pxx[mask].mean())
+
+
+def member_values(
+    data: Mapping[str, np.ndarray],
+    amps: np.ndarray,
+    P_member: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Per-member values whose member means are the summary estimates.
+
+    A (band amplitude), band_power (A^2), P0, P1, mean_Sv, lifetime and,
+    shape (n_ens, len(windows)), P0_w and P1_w from P_member, the per-member
+    windowed distributions of windowed_flip_distributions(member_k=2).
+    """
+    flips = data["flips"]
+    return {
+        "A": amps,
+        "band_power": amps**2,
+        "P0": (flips == 0).mean(axis=1),
+        "P1": (flips == 1).mean(axis=1),
+        "mean_Sv": data["Sv"].mean(axis=1),
+        "lifetime": data["lifetimes"].astype(float),
+        "P0_w": P_member[..., 0],
+        "P1_w": P_member[..., 1],
+    }
+
+
+def ensemble_units(x: np.ndarray, antithetic: bool) -> np.ndarray:
+    """Independent sampling units of per-member values x (axis 0).
+
+    Antithetic partners are correlated by construction, so their pair
+    means are the units; otherwise every member is one.
+    """
+    x = np.asarray(x, dtype=float)
+    return 0.5 * (x[0::2] + x[1::2]) if antithetic else x
+
+
+def _se(units: np.ndarray) -> float:
+    n = units.shape[0]
+    return float(units.std(ddof=1) / np.sqrt(n)) if n > 1 else float("nan")
+
+
+def _variance_ratio(x: np.ndarray, y: np.ndarray) -> float:
+    """var(x) / var(y); inf when y is constant to rounding, 1 when both are."""
+    var_x, var_y = x.var(ddof=1), y.var(ddof=1)
+    if var_y > 1e-12 * var_x:
+        return float(var_x / var_y)
+    return 1.0 if var_x == 0 else float("inf")
+
+
+def standard_error(name: str, x: np.ndarray, antithetic: bool) -> Dict[str, float]:
+    """{<name>_se: standard error of the member mean of x}.
+
+    With *antithetic* the error is taken over pair means, and
+    <name>_antithetic_gain gives the estimator variance with independent
+    members over that with pairs, per member simulated.
+    """
+    units = ensemble_units(x, antithetic)
+    out = {f"{name}_se": _se(units)}
+    if antithetic:
+        out[f"{name}_antithetic_gain"] = 0.5 * _variance_ratio(np.asarray(x, dtype=float), units)
+    return out
+
+
+def control_variate_units(y: np.ndarray, c: np.ndarray, mu: float) -> np.ndarray:
+    """Units y - beta (c - mu), c being a control with known mean mu.
+
+    beta = cov(y, c) / var(c) is fitted on the same units, which biases
+    the estimate by O(1/n) only.
+    """
+    var_c = c.var(ddof=1)
+    beta = float(np.cov(y, c)[0, 1] / var_c) if var_c > 0 else 0.0
+    return y - beta * (c - mu)
+
+
+def _control_values(pair_dir: str) -> Dict[str, np.ndarray]:
+    """member_values of the lambda = 0 replica of the same pair."""
+    tree = os.path.dirname(os.path.normpath(pair_dir))
+    path = os.path.join(os.path.dirname(tree), CONTROL_TREE, os.path.basename(pair_dir), MEMBER_VALUES_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; the lambda = 0 replica must be analysed first")
+    with np.load(path) as control:
+        return dict(control)
+
+
+def variance_reduction_summary(
+    cfg: TopLevelConfig,
+    values: Dict[str, np.ndarray],
+    W_coh: float,
+    N: int,
+    control: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, Any]:
+    """Standard errors and control-variate estimates of the member means.
+
+    standard_error of each mean-type summary entry (A_mean, P0, P1,
+    mean_Sv, mean_lifetime), over antithetic pairs when members are paired.
+
+    With *control* (the member_values of the lambda = 0 replica, same
+    random numbers) A_mean, P0, P1, mean_Sv and the windowed P0_w<w> /
+    P1_w<w> are replaced by control-variate estimates against the
+    closed-form independent-thread means; the plain means stay as
+    <m>_plain, <m>_cv_gain gives the variance reduction, and the
+    kappa_eff entries are recomputed from the adjusted P0 and P1. Also
+    returns "A_units", the adjusted amplitude units for the bootstrap.
+    """
+    antithetic = cfg.ensemble.antithetic
+    windows = window_sizes(cfg.analysis.kappa_eff)
+    entries = {"A_mean": values["A"], "P0": values["P0"], "P1": values["P1"], "mean_Sv": values["mean_Sv"]}
+    for j, w in enumerate(windows):
+        entries[f"P0_w{w}"] = values["P0_w"][:, j]
+        entries[f"P1_w{w}"] = values["P1_w"][:, j]
+
+    out: Dict[str, Any] = {}
+    for name, x in list(entries.items())[:4] + [("mean_lifetime", values["lifetime"])]:
+        out.update(standard_error(name, x, antithetic))
+    # Fitting the control coefficient takes two units at least.
+    if control is None or ensemble_units(values["A"], antithetic).size < 2:
+        return out
+
+    q = slip_probability(W_coh, cfg.kernel)
+    psd_cfg = cfg.analysis.psd
+    amp_cfg = cfg.analysis.amplitude_fit
+    P0, P1 = independent_flip_probabilities(q, N)
+    band_power = independent_band_power(
+        q, N, 1.0, psd_cfg.segment_length, amp_cfg.freq_min, amp_cfg.freq_max
+    )
+    means = {
+        "A_mean": ("band_power", band_power),
+        "P0": ("P0", P0),
+        "P1": ("P1", P1),
+        "mean_Sv": ("mean_Sv", independent_mean_Sv(N)),
+    }
+    controls = {key: control[key] for key in ("band_power", "P0", "P1", "mean_Sv")}
+    for j, w in enumerate(windows):
+        P0_w, P1_w = independent_flip_probabilities(q, N * w)
+        means[f"P0_w{w}"] = (f"P0_w{w}", P0_w)
+        means[f"P1_w{w}"] = (f"P1_w{w}", P1_w)
+        controls[f"P0_w{w}"] = control["P0_w"][:, j]
+        controls[f"P1_w{w}"] = control["P1_w"][:, j]
+
+    for name, x in entries.items():
+        key, mu = means[name]
+        y = ensemble_units(x, antithetic)
+        c = ensemble_units(controls[key], antithetic)
+        if not (np.all(np.isfinite(y)) and np.all(np.isfinite(c))):
+            continue  # e.g. windows longer than the series
+        adjusted = control_variate_units(y, c, mu)
+        out[f"{name}_plain"] = float(x.mean())
+        out[name] = float(adjusted.mean())
+        out[f"{name}_se"] = _se(adjusted)
+        out[f"{name}_cv_gain"] = _variance_ratio(y, adjusted)
+        if name == "A_mean":
+            out["A_units"] = adjusted
+
+    for suffix, p0, p1 in [("", "P0", "P1")] + [(f"_w{w}", f"P0_w{w}", f"P1_w{w}") for w in windows]:
+        if p0 in out and p1 in out:
+            plain = np.array([out[f"{p0}_plain"], out[f"{p1}_plain"]])
+            out[f"kappa_eff{suffix}_plain"] = kappa_from_distribution(plain)[2]
+            out[f"kappa_eff{suffix}"] = kappa_from_distribution(np.array([out[p0], out[p1]]))[2]
+    return out
+
+
 def analyse_pair(
     cfg: TopLevelConfig,
     pair_dir: str,
 ) -> Dict[str, float]:
     """Analyse one (W_coh, N) pair directory.
 
-    Expects a 'timeseries.npz' file created by simulate.run_all.
-    Returns a small dictionary of summary quantities.
+    Expects a 'timeseries.npz' file created by simulate.run_all; see
+    analyse_arrays for the summary and the files written next to it.
+    """
+    path = os.path.join(pair_dir, TIMESERIES_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} not found; runs with execution.keep_timeseries false are "
+            "analysed during the run and cannot be re-analysed"
+        )
+    with np.load(path) as data:
+        return analyse_arrays(cfg, data, pair_dir)
+
+
+def analyse_arrays(
+    cfg: TopLevelConfig,
+    data: Mapping[str, np.ndarray],
+    pair_dir: str,
+) -> Dict[str, float]:
+    """Analyse the arrays of one (W_coh, N) pair.
+
+    *data* holds the timeseries.npz arrays, loaded or still in memory
+    (simulate.run_batch with execution.analyse); derived files go to
+    pair_dir, whose W{W}_N{N} name gives N.
+    Returns a small dictionary of summary quantities. Besides the
+    single-step P0, P1 and kappa_eff it holds P0_w<w>, P1_w<w> and
+    kappa_eff_w<w> for every analysis.kappa_eff.window_size w; the full
+    windowed P_w(k) go to flip_distributions.npz in pair_dir. Integrated
+    autocorrelation times and effective sample sizes are added as
+    tau_int_<series> and ess_<series> (see autocorrelation_summary).
+
+    Mergeable quantile sketches of the per-member lifetimes, persistence
+    lengths and band amplitudes go to sketches.json (write_pair_sketches).
+
+    With ensemble.antithetic or analysis.control_variate the summary
+    also carries standard errors and variance-reduced estimates (see
+    variance_reduction_summary); with the control variate the per-member
+    values go to member_values.npz, where the other lambda trees of the
+    run look up their lambda = 0 control.
+
+    Lifetime-only runs (analysis.lifetime.lifetime_only) store no time
+    series; their summary has the lifetime statistics only.
     """
-    path = os.path.join(pair_dir, "timeseries.npz")
-    data = np.load(path)
+    if "acceleration" not in data:
+        write_pair_sketches(cfg, pair_dir, {"lifetime": data["lifetimes"]})
+        summary = lifetime_summary(data["lifetimes"], data["survived"])
+        if cfg.ensemble.antithetic:
+            summary.update(standard_error("mean_lifetime", data["lifetimes"], True))
+        return summary
 
     acc = data["acceleration"]  # shape (n_ens, T)
     flips = data["flips"]       # shape (n_ens, steps)
@@ -111,46 +793,55 @@ def analyse_pair(
     fmin = cfg.analysis.amplitude_fit.freq_min
     fmax = cfg.analysis.amplitude_fit.freq_max
 
-    amps = []
-    for series in acc:
-        freqs, Pxx = welch_psd(series, fs=fs, seg_len=seg_len, overlap=overlap)
-        A = amplitude_from_band(freqs, Pxx, fmin=fmin, fmax=fmax)
-        amps.append(A)
+    amps = band_amplitudes(acc, fs, seg_len, overlap, fmin, fmax, cfg.analysis.psd.estimator)
     A_mean = float(np.mean(amps))
     A_std = float(np.std(amps))
+    # Cache per-member amplitudes for the run-level bootstrap stage.
+    np.save(os.path.join(pair_dir, BAND_AMPLITUDES_FILE), amps)
 
     # Flip statistics P(k) across ensemble and time
     maxN = flips.max() if flips.size > 0 else 0
     counts = np.bincount(flips.ravel(), minlength=maxN+1)
     total_steps = flips.size
     Pk = counts / total_steps if total_steps > 0 else counts.astype(float)
+    P0, P1, kappa_eff = kappa_from_distribution(Pk)
 
-    P0 = float(Pk[0]) if Pk.size > 0 else 0.0
-    P1 = float(Pk[1]) if Pk.size > 1 else 0.0
-
-    eps = 1e-12
-    if P1 < eps:
-        kappa_eff = float("inf")
+    # Flip counts over windows of w steps, all window lengths in one pass;
+    # the variance-reduction estimates also need each member's P0_w, P1_w.
+    kappa_cfg = cfg.analysis.kappa_eff
+    windows = window_sizes(kappa_cfg)
+    cv = cfg.analysis.control_variate.enabled
+    reduce_variance = cfg.ensemble.antithetic or cv
+    if reduce_variance:
+        Pk_windows, Pk_members = windowed_flip_distributions(flips, windows, kappa_cfg.windowing, member_k=2)
     else:
-        kappa_eff = float(np.log((P0 + eps) / (P1 + eps)))
+        Pk_windows = windowed_flip_distributions(flips, windows, kappa_cfg.windowing)
+    np.savez(
+        os.path.join(pair_dir, FLIP_DISTRIBUTIONS_FILE),
+        window_sizes=np.asarray(windows),
+        Pk=Pk_windows,
+    )
 
     # Alignment statistics
     mean_Sv = float(Sv.mean())
     std_Sv = float(Sv.std())
 
     # Lifetime statistics
-    mean_life = float(lifetimes.mean())
-    median_life = float(np.median(lifetimes))
-    frac_survived = float(survived.mean())
+    life = lifetime_summary(lifetimes, survived)
 
     # Persistence-length statistics (if present)
     L_persist_mean = float("nan")
     L_persist_median = float("nan")
-    if "L_persist_mean" in data.files:
+    if "L_persist_mean" in data:
         L_vals = data["L_persist_mean"]
         L_persist_mean = float(L_vals.mean())
         L_persist_median = float(np.median(L_vals))
 
+    sketched = {"lifetime": lifetimes, "A": amps}
+    if "L_persist_mean" in data:
+        sketched["L_persist"] = data["L_persist_mean"]
+    write_pair_sketches(cfg, pair_dir, sketched)
+
     summary: Dict[str, float] = {
         "A_mean": A_mean,
         "A_std": A_std,
@@ -159,10 +850,220 @@ def analyse_pair(
         "kappa_eff": kappa_eff,
         "mean_Sv": mean_Sv,
         "std_Sv": std_Sv,
-        "mean_lifetime": mean_life,
-        "median_lifetime": median_life,
-        "frac_survived": frac_survived,
+        "mean_lifetime": life["mean_lifetime"],
+        "median_lifetime": life["median_lifetime"],
+        "frac_survived": life["frac_survived"],
         "L_persist_mean": L_persist_mean,
         "L_persist_median": L_persist_median,
     }
+    for w, Pk_w in zip(windows, Pk_windows):
+        P0_w, P1_w, kappa_w = kappa_from_distribution(Pk_w)
+        summary[f"P0_w{w}"] = P0_w
+        summary[f"P1_w{w}"] = P1_w
+        summary[f"kappa_eff_w{w}"] = kappa_w
+
+    # Correlation times and effective sample sizes
+    arrays = {name: data[name] for name in ("Sv", "acceleration", "V0") if name in data}
+    summary.update(autocorrelation_summary(arrays, _pair_size(pair_dir), cfg.analysis.autocorrelation))
+
+    # Variance reduction: antithetic pairs and the lambda = 0 control
+    if reduce_variance:
+        values = member_values(data, amps, Pk_members)
+        control = None
+        if cv and coupling_strengths(cfg.bundle_coupling) != [0.0]:
+            control = _control_values(pair_dir)
+        W_coh, N = parse_pair_dir(os.path.basename(os.path.normpath(pair_dir)))
+        reduced = variance_reduction_summary(cfg, values, W_coh, N, control)
+        A_units = reduced.pop("A_units", None)
+        summary.update(reduced)
+        if cv:
+            if A_units is not None:
+                values["A_units"] = A_units
+            np.savez(os.path.join(pair_dir, MEMBER_VALUES_FILE), **values)
     return summary
+
+
+def bootstrap_means(
+    samples: Sequence[np.ndarray],
+    n_resamples: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Bootstrap replicates of the mean of each sample.
+
+    Samples of equal length are stacked and resampled together with one
+    batched index array, so the cost is a few NumPy calls per distinct
+    length rather than a Python loop per resample.
+
+    Returns an array of shape (len(samples), n_resamples).
+    """
+    out = np.empty((len(samples), n_resamples), dtype=float)
+    by_length: Dict[int, List[int]] = {}
+    for i, x in enumerate(samples):
+        by_length.setdefault(len(x), []).append(i)
+    for n, rows in sorted(by_length.items()):
+        stack = np.stack([np.asarray(samples[i], dtype=float) for i in rows])  # (G, n)
+        G = len(rows)
+        chunk = max(1, _BOOTSTRAP_CHUNK // (G * n))
+        for b0 in range(0, n_resamples, chunk):
+            b1 = min(n_resamples, b0 + chunk)
+            idx = rng.integers(0, n, size=(G, b1 - b0, n))
+            out[rows, b0:b1] = np.take_along_axis(stack[:, None, :], idx, axis=2).mean(axis=-1)
+    return out
+
+
+def _ci(boot: np.ndarray, confidence: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Percentile interval along the last axis."""
+    alpha = 0.5 * (1.0 - confidence)
+    low, high = np.quantile(boot, [alpha, 1.0 - alpha], axis=-1)
+    return low, high
+
+
+def _loglog_slopes(W: np.ndarray, A: np.ndarray) -> np.ndarray:
+    """Least-squares slopes of log10 A against log10 W along the last axis."""
+    x = np.log10(W)
+    x = x - x.mean()
+    y = np.log10(A)
+    y = y - y.mean(axis=-1, keepdims=True)
+    return (y @ x) / (x @ x)
+
+
+def bootstrap_run(
+    cfg: TopLevelConfig,
+    amplitudes: Dict[Tuple[float, int], np.ndarray],
+) -> Tuple[Dict[Tuple[float, int], Dict[str, float]], Dict[str, Any]]:
+    """Bootstrap confidence intervals over the pairs of one run.
+
+    Parameters
+    ----------
+    amplitudes : dict
+        Per-member band amplitudes keyed by (W_coh, N), as cached by
+        analyse_pair.
+
+    Returns
+    -------
+    (pair_stats, run_stats)
+        pair_stats[(W, N)] holds A_ci_low/A_ci_high and, where an N=1 pair
+        exists at the same W_coh, the suppression ratio
+        A(W,N) / (A(W,1)/sqrt(N)) with ratio_ci_low/ratio_ci_high.
+        run_stats["beta_COM"]["N<n>"] holds beta (from A_mean) and its CI
+        from a log-log fit of A against W_coh over the beta_fit range;
+        run_stats["bootstrap"] records the settings.
+    """
+    boot_cfg: BootstrapConfig = cfg.analysis.bootstrap
+    B = boot_cfg.n_resamples
+    keys = sorted(amplitudes)
+    rng = np.random.default_rng(boot_cfg.seed)
+    boot = bootstrap_means([amplitudes[k] for k in keys], B, rng)
+    A_mean = np.array([np.mean(amplitudes[k]) for k in keys])
+    row = {k: i for i, k in enumerate(keys)}
+
+    pair_stats: Dict[Tuple[float, int], Dict[str, float]] = {}
+    low, high = _ci(boot, boot_cfg.confidence)
+    for k, i in row.items():
+        pair_stats[k] = {"A_ci_low": float(low[i]), "A_ci_high": float(high[i])}
+
+    # Suppression ratio against the single-thread amplitude at the same W.
+    for (W, N), i in row.items():
+        ref = row.get((W, 1))
+        if ref is None:
+            continue
+        ratio = A_mean[i] * np.sqrt(N) / A_mean[ref]
+        r_low, r_high = _ci(boot[i] * np.sqrt(N) / boot[ref], boot_cfg.confidence)
+        pair_stats[(W, N)].update(
+            {"ratio": float(ratio), "ratio_ci_low": float(r_low), "ratio_ci_high": float(r_high)}
+        )
+
+    # beta_COM(N) from a log-log fit over the configured W_coh range.
+    W_min = 10.0 ** cfg.analysis.beta_fit.log_wcoh_min
+    W_max = 10.0 ** cfg.analysis.beta_fit.log_wcoh_max
+    beta: Dict[str, Dict[str, float]] = {}
+    for N in sorted({N for _, N in keys}):
+        fit_keys = [(W, n) for W, n in keys if n == N and W_min <= W <= W_max]
+        if len(fit_keys) < 2:
+            continue
+        W_arr = np.array([W for W, _ in fit_keys])
+        rows = [row[k] for k in fit_keys]
+        beta_point = -_loglog_slopes(W_arr, A_mean[rows])
+        beta_boot = -_loglog_slopes(W_arr, boot[rows].T)
+        b_low, b_high = _ci(beta_boot, boot_cfg.confidence)
+        beta[f"N{N}"] = {
+            "beta": float(beta_point),
+            "beta_ci_low": float(b_low),
+            "beta_ci_high": float(b_high),
+            "n_wcoh": len(fit_keys),
+        }
+
+    run_stats = {
+        "beta_COM": beta,
+        "bootstrap": {
+            "n_resamples": B,
+            "confidence": boot_cfg.confidence,
+            "seed": boot_cfg.seed,
+        },
+    }
+    return pair_stats, run_stats
+
+
+def parse_pair_dir(name: str) -> Tuple[float, int]:
+    """(W_coh, N) from a pair directory name W{W}_N{N}; ValueError otherwise."""
+    w_str, n_str = name.split("_")
+    if not (w_str.startswith("W") and n_str.startswith("N")):
+        raise ValueError(f"not a pair directory name: {name!r}")
+    return float(w_str[1:]), int(n_str[1:])
+
+
+def amplitude_units(cfg: TopLevelConfig, pair_dir: str) -> np.ndarray:
+    """Independent amplitude samples of a pair for the bootstrap.
+
+    The control-variate adjusted units of member_values.npz if the control
+    was applied, else the band amplitudes, averaged over antithetic pairs.
+    """
+    path = os.path.join(pair_dir, MEMBER_VALUES_FILE)
+    if cfg.analysis.control_variate.enabled and os.path.exists(path):
+        with np.load(path) as values:
+            if "A_units" in values:
+                return values["A_units"]
+    return ensemble_units(np.load(os.path.join(pair_dir, BAND_AMPLITUDES_FILE)), cfg.ensemble.antithetic)
+
+
+def run_summary(
+    cfg: TopLevelConfig,
+    out_dir: str,
+    pair_summaries: Dict[str, Dict[str, float]],
+    bootstrap: bool = True,
+) -> Dict[str, Any]:
+    """summary.json contents of a run from its per-pair summaries.
+
+    pair_summaries maps pair directory names (W{W}_N{N}) under out_dir to
+    the dictionaries of analyse_arrays. Entries are keyed W{W}_N{N} with
+    a float W, in directory-name order. With *bootstrap* (and
+    analysis.bootstrap.n_resamples > 0) the run-level bootstrap_run stage
+    is added from the cached band amplitudes (amplitude_units): CIs go
+    into the pair entries, beta_COM and bootstrap under RUN_SUMMARY_KEY.
+    """
+    all_summaries: Dict[str, Any] = {}
+    amplitudes = {}
+    for name in sorted(pair_summaries):
+        W, N = parse_pair_dir(name)
+        summary = dict(pair_summaries[name])
+        all_summaries[f"W{W}_N{N}"] = summary
+        if "A_mean" in summary:  # not for lifetime-only runs
+            amplitudes[(W, N)] = os.path.join(out_dir, name)
+
+    if bootstrap and cfg.analysis.bootstrap.n_resamples > 0 and amplitudes:
+        units = {k: amplitude_units(cfg, p) for k, p in amplitudes.items()}
+        pair_stats, run_stats = bootstrap_run(cfg, units)
+        for (W, N), stats in pair_stats.items():
+            all_summaries[f"W{W}_N{N}"].update(stats)
+        all_summaries[RUN_SUMMARY_KEY] = run_stats
+    return all_summaries
+
+
+def write_summary(out_dir: str, summaries: Dict[str, Any]) -> str:
+    """Write summary.json (see run_summary) to out_dir; return its path."""
+    path = os.path.join(out_dir, SUMMARY_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(summaries, fh, indent=2)
+    os.replace(tmp, path)
+    return path
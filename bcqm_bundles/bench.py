@@ -0,0 +1,291 @@
+"""Benchmark suite for bcqm_bundles.
+
+Times the main cost centres on a fixed matrix of cases so that changes to
+the kernels, the simulation loop, the PSD analysis or the npz I/O can be
+compared against a stored baseline:
+
+  * kernel   — the stepping backend's loop on a single bundle
+               (step_in_place, or jit.run_member with Numba),
+  * simulate — run_ensemble_for_pair for the whole ensemble,
+  * psd      — band amplitude of every member (analysis.psd.estimator),
+  * analysis — analyse_pair on the written pair directory,
+  * io       — np.savez_compressed write and full np.load read.
+
+Results are written as JSON. Throughput metrics (higher is better) are
+compared case by case with a baseline file; a drop larger than the
+threshold counts as a regression.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config_schemas import (
+    TopLevelConfig,
+    EnsembleConfig,
+    BundleCouplingConfig,
+    PhaseDynamicsConfig,
+    AnalysisConfig,
+    PSDConfig,
+    ExecutionConfig,
+)
+from .kernels import BundleState, build_kernel_plan, step_in_place
+from .simulate import run_ensemble_for_pair, resolve_backend
+from .analysis import analyse_pair, band_amplitudes
+from .instrument import peak_rss_mb
+from . import jit
+
+
+@dataclass
+class BenchCase:
+    name: str
+    W_coh: float
+    N: int
+    n_ens: int
+    mode: str = "independent"
+    coupling_strength: float = 0.0
+    phase: bool = False
+
+
+# Fixed benchmark matrix. Keep it stable: baselines are compared by name.
+BENCH_CASES = [
+    BenchCase("W20_N1_ind", 20.0, 1, 8),
+    BenchCase("W20_N16_ind", 20.0, 16, 8),
+    BenchCase("W100_N16_ind", 100.0, 16, 4),
+    BenchCase("W20_N16_sb", 20.0, 16, 8, "shared_bias", 0.5),
+    BenchCase("W100_N16_sb", 100.0, 16, 4, "shared_bias", 0.5),
+    BenchCase("W100_N64_sb", 100.0, 64, 4, "shared_bias", 0.5),
+    BenchCase("W100_N16_sl", 100.0, 16, 4, "strong_lock", 0.75),
+    BenchCase("W20_N16_sb_phase", 20.0, 16, 8, "shared_bias", 0.5, phase=True),
+]
+
+BENCH_STEPS_PER_WCOH = 50
+KERNEL_STEPS = 5000
+
+# (stage, metric) pairs compared against a baseline; higher is better.
+THROUGHPUT_METRICS = [
+    ("kernel", "thread_steps_per_s"),
+    ("simulate", "thread_steps_per_s"),
+    ("psd", "MB_per_s"),
+    ("analysis", "MB_per_s"),
+    ("io_write", "MB_per_s"),
+    ("io_read", "MB_per_s"),
+]
+
+
+def bench_config(case: BenchCase, out_dir: str, backend: str = "numpy") -> TopLevelConfig:
+    """TopLevelConfig for one benchmark case."""
+    return TopLevelConfig(
+        model_name=f"bench_{case.name}",
+        output_dir=out_dir,
+        random_seed=2024,
+        wcoh_grid=[case.W_coh],
+        bundle_sizes=[case.N],
+        ensemble=EnsembleConfig(n_ensembles=case.n_ens, steps_per_wcoh=BENCH_STEPS_PER_WCOH),
+        bundle_coupling=BundleCouplingConfig(mode=case.mode, coupling_strength=case.coupling_strength),
+        phase_dynamics=PhaseDynamicsConfig(enabled=case.phase),
+        analysis=AnalysisConfig(psd=PSDConfig(segment_length=256)),
+        execution=ExecutionConfig(backend=backend),
+    )
+
+
+def _nbytes(data: Dict[str, np.ndarray]) -> int:
+    return int(sum(np.asarray(a).nbytes for a in data.values()))
+
+
+def run_case(case: BenchCase, work_dir: str, backend: str = "numpy") -> Dict[str, Dict[str, float]]:
+    """Time every stage of one benchmark case."""
+    cfg = bench_config(case, work_dir, backend=backend)
+    steps = int(cfg.ensemble.steps_per_wcoh * case.W_coh)
+    result: Dict[str, Dict[str, float]] = {}
+
+    # Step kernel on one bundle, with the backend being benchmarked
+    rng = np.random.default_rng(0)
+    plan = build_kernel_plan(case.W_coh, case.N, cfg.kernel, cfg.bundle_coupling)
+    v0 = rng.choice([-1, 1], size=case.N)
+    kernel_backend = resolve_backend(cfg)
+    if kernel_backend == "numba":
+        sizes = np.array([case.N])
+        jit.run_member(plan, v0, sizes, 2, rng)  # compile (or load from cache) first
+        t0 = time.perf_counter()
+        jit.run_member(plan, v0, sizes, KERNEL_STEPS, rng)
+        wall = time.perf_counter() - t0
+    else:
+        state = BundleState(x=np.zeros((1, case.N), dtype=float), v=v0[None, :].copy())
+        t0 = time.perf_counter()
+        for _ in range(KERNEL_STEPS):
+            step_in_place(plan, state, rng)
+        wall = time.perf_counter() - t0
+    result["kernel"] = {
+        "backend": kernel_backend,
+        "wall_s": wall,
+        "steps_per_s": KERNEL_STEPS / wall,
+        "thread_steps_per_s": KERNEL_STEPS * case.N / wall,
+    }
+
+    # Full pair simulation
+    t0 = time.perf_counter()
+    cpu0 = time.process_time()
+    data = run_ensemble_for_pair(cfg, W_coh=case.W_coh, N=case.N)
+    wall = time.perf_counter() - t0
+    member_steps = case.n_ens * steps
+    result["simulate"] = {
+        "wall_s": wall,
+        "cpu_s": time.process_time() - cpu0,
+        "steps_per_s": member_steps / wall,
+        "thread_steps_per_s": member_steps * case.N / wall,
+    }
+    data_mb = _nbytes(data) / 2**20
+
+    # PSD and band amplitude
+    acc = data["acceleration"]
+    psd = cfg.analysis.psd
+    band = cfg.analysis.amplitude_fit
+    t0 = time.perf_counter()
+    band_amplitudes(acc, 1.0, psd.segment_length, psd.overlap, band.freq_min, band.freq_max, psd.estimator)
+    wall = time.perf_counter() - t0
+    result["psd"] = {"wall_s": wall, "MB_per_s": acc.nbytes / 2**20 / wall}
+
+    # npz write / read
+    pair_dir = os.path.join(work_dir, f"W{int(case.W_coh)}_N{case.N}")
+    os.makedirs(pair_dir, exist_ok=True)
+    path = os.path.join(pair_dir, "timeseries.npz")
+    t0 = time.perf_counter()
+    np.savez_compressed(path, **data)
+    wall = time.perf_counter() - t0
+    file_mb = os.path.getsize(path) / 2**20
+    result["io_write"] = {"wall_s": wall, "MB_per_s": data_mb / wall, "file_MB": file_mb}
+
+    t0 = time.perf_counter()
+    with np.load(path) as loaded:
+        for key in loaded.files:
+            loaded[key]
+    wall = time.perf_counter() - t0
+    result["io_read"] = {"wall_s": wall, "MB_per_s": data_mb / wall}
+
+    # Full analysis of the pair directory (includes loading)
+    t0 = time.perf_counter()
+    analyse_pair(cfg, pair_dir)
+    wall = time.perf_counter() - t0
+    result["analysis"] = {"wall_s": wall, "MB_per_s": data_mb / wall}
+    return result
+
+
+def _best_of(runs: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Per stage, keep the repeat with the smallest wall time."""
+    best: Dict[str, Dict[str, float]] = {}
+    for stage in runs[0]:
+        if "wall_s" in runs[0][stage]:
+            best[stage] = min((r[stage] for r in runs), key=lambda d: d["wall_s"])
+        else:
+            best[stage] = runs[-1][stage]
+    return best
+
+
+def run_benchmarks(
+    backend: str = "numpy",
+    cases: Optional[List[BenchCase]] = None,
+    repeat: int = 1,
+    verbose: bool = True,
+) -> Dict[str, object]:
+    """Run the benchmark matrix and return a JSON-serialisable report.
+
+    Each case is run *repeat* times and the fastest time of every stage is
+    kept, which makes comparisons against a baseline less noisy. The peak
+    RSS is a high-water mark of the whole process, so it is recorded once,
+    in meta, after all cases.
+    """
+    cases = BENCH_CASES if cases is None else cases
+    report: Dict[str, object] = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "backend": resolve_backend(bench_config(cases[0], "", backend)),
+            "steps_per_wcoh": BENCH_STEPS_PER_WCOH,
+            "repeat": repeat,
+        },
+        "cases": {},
+    }
+    work_dir = tempfile.mkdtemp(prefix="bcqm_bundles_bench_")
+    try:
+        for case in cases:
+            case_dir = os.path.join(work_dir, case.name)
+            res = _best_of([run_case(case, case_dir, backend=backend) for _ in range(repeat)])
+            report["cases"][case.name] = res
+            if verbose:
+                print(
+                    f"{case.name:>18}: kernel {res['kernel']['thread_steps_per_s']:.3g} thread-steps/s, "
+                    f"simulate {res['simulate']['thread_steps_per_s']:.3g} thread-steps/s, "
+                    f"psd {res['psd']['MB_per_s']:.3g} MB/s, "
+                    f"write {res['io_write']['MB_per_s']:.3g} MB/s, "
+                    f"read {res['io_read']['MB_per_s']:.3g} MB/s"
+                )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    report["meta"]["peak_rss_MB"] = peak_rss_mb()
+    return report
+
+
+def compare_to_baseline(
+    report: Dict[str, object],
+    baseline: Dict[str, object],
+    threshold: float = 0.1,
+) -> List[str]:
+    """Return a description of every throughput regression beyond threshold.
+
+    A metric regresses when new / baseline < 1 - threshold. Cases or
+    metrics missing from either side are skipped.
+    """
+    regressions = []
+    base_cases = baseline.get("cases", {})
+    for name, res in report["cases"].items():
+        if name not in base_cases:
+            continue
+        for stage, metric in THROUGHPUT_METRICS:
+            new = res.get(stage, {}).get(metric)
+            old = base_cases[name].get(stage, {}).get(metric)
+            if not new or not old:
+                continue
+            ratio = new / old
+            if ratio < 1.0 - threshold:
+                regressions.append(
+                    f"{name} {stage}.{metric}: {old:.4g} -> {new:.4g} ({(ratio - 1.0) * 100:+.1f}%)"
+                )
+    return regressions
+
+
+def main_bench(
+    output: str,
+    baseline: Optional[str] = None,
+    threshold: float = 0.1,
+    backend: str = "numpy",
+    repeat: int = 1,
+) -> int:
+    """Entry point for 'cli bench'. Returns a process exit code."""
+    report = run_benchmarks(backend=backend, repeat=repeat)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Wrote {output}")
+
+    if baseline is None:
+        return 0
+    with open(baseline, "r", encoding="utf-8") as fh:
+        base = json.load(fh)
+    regressions = compare_to_baseline(report, base, threshold=threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"No regressions beyond {threshold:.0%} against {baseline}")
+    return 0
@@ -0,0 +1,167 @@
+"""Bit-packed thread-state engine for the global coupling modes.
+
+Thread directions are stored one bit per thread in uint64 words
+(bit = 1 for v = +1, bit = 0 for v = -1), instead of one int64 per thread.
+A step then costs a few word operations per 64 threads:
+
+  * the alignment count comes from a popcount over the words,
+  * flips are applied as v ^= mask, where mask is a Bernoulli(q) bitmask
+    built from raw bit-generator output,
+  * the COM position only needs the running sum of v, so per-thread
+    positions are never stored.
+
+Bernoulli bitmasks use a bit-sliced comparison U < Q, where U is a uniform
+64-bit integer per thread assembled one bit plane at a time (most
+significant first) from rng.bit_generator.random_raw, and Q = q * 2^64.
+Lanes are resolved as soon as their bit of U differs from Q, so a step
+needs about log2(number of threads) + 2 random words per 64 threads rather
+than 64 doubles. All lambda replicas share the same U (common random
+numbers) and differ only in Q.
+
+The engine draws a different random stream from the dense engines, so its
+outputs are statistically but not bitwise equivalent to theirs.
+
+Scope: every lane of a replica shares one flip probability, looked up from
+the count table (KernelPlan.p_stay_table) by the bundle's alignment count.
+That covers exactly the exchangeable global modes the count table already
+handles on the dense engines; the local mode and heterogeneous slip laws,
+whose stay probabilities differ per thread, are not supported. The engine
+therefore adds no coverage over the count table: it only stores and steps
+the same states in less memory and time.
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+from .kernels import KernelPlan
+
+WORD_BITS = 64
+
+_POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Number of set bits per uint64 word (same shape as words)."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(words).astype(np.int64)
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _POP8[as_bytes].reshape(words.shape + (8,)).sum(axis=-1)
+
+
+def n_words(N: int) -> int:
+    """Number of uint64 words needed for N threads."""
+    return (N + WORD_BITS - 1) // WORD_BITS
+
+
+def valid_mask(N: int) -> np.ndarray:
+    """Word mask with ones on the N real thread bits and zeros on padding."""
+    mask = np.full(n_words(N), np.iinfo(np.uint64).max, dtype=np.uint64)
+    tail = N % WORD_BITS
+    if tail:
+        mask[-1] = np.uint64((1 << tail) - 1)
+    return mask
+
+
+def pack_directions(v: np.ndarray) -> np.ndarray:
+    """Pack a (..., N) array of +-1 directions into (..., n_words) uint64."""
+    N = v.shape[-1]
+    bits = np.zeros(v.shape[:-1] + (n_words(N) * WORD_BITS,), dtype=np.uint8)
+    bits[..., :N] = v > 0
+    packed = np.packbits(bits, axis=-1, bitorder="little")
+    return packed.view(np.uint64)
+
+
+def unpack_directions(words: np.ndarray, N: int) -> np.ndarray:
+    """Inverse of pack_directions, returning int64 directions in {+1, -1}."""
+    bits = np.unpackbits(words.view(np.uint8), axis=-1, bitorder="little")[..., :N]
+    return 2 * bits.astype(np.int64) - 1
+
+
+def bernoulli_mask(
+    q: np.ndarray,
+    valid: np.ndarray,
+    bit_generator: np.random.BitGenerator,
+) -> np.ndarray:
+    """Bernoulli bitmasks with per-replica flip probability q.
+
+    Parameters
+    ----------
+    q : np.ndarray
+        Flip probabilities, shape (L,).
+    valid : np.ndarray
+        Word mask of real thread bits, shape (W,).
+    bit_generator : np.random.BitGenerator
+        Source of raw 64-bit words; one word per thread word per bit plane.
+
+    Returns
+    -------
+    mask : np.ndarray
+        uint64 array of shape (L, W); each real bit is set with
+        probability q[l], using the same uniforms for every replica.
+    """
+    L = q.size
+    W = valid.size
+    Q = np.zeros(L, dtype=np.uint64)
+    always = q >= 1.0
+    frac = ~always & (q > 0.0)
+    Q[frac] = np.ldexp(q[frac], WORD_BITS).astype(np.uint64)
+
+    below = np.zeros((L, W), dtype=np.uint64)  # lanes resolved as U < Q
+    equal = np.broadcast_to(valid, (L, W)).copy()  # lanes with U == Q so far
+    equal[~frac] = 0
+    for j in range(WORD_BITS - 1, -1, -1):
+        if not equal.any():
+            break
+        r = bit_generator.random_raw(W).astype(np.uint64)
+        q_bit = ((Q >> np.uint64(j)) & np.uint64(1)).astype(bool)[:, None]
+        # U bit 0 where Q bit 1 -> U < Q; U bit 1 where Q bit 0 -> U > Q.
+        below |= np.where(q_bit, equal & ~r, np.uint64(0))
+        equal &= np.where(q_bit, r, ~r)
+    below[always] = valid
+    return below
+
+
+def run_member(
+    plan: KernelPlan,
+    steps: int,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Simulate one ensemble member with bit-packed thread states.
+
+    Initial directions are uniform random bits, shared by all replicas.
+
+    Returns (X, Sv, flips, dir_sign), each of shape (L, 1, steps), matching
+    the layout of the dense engines with a single bundle size.
+    """
+    N = plan.N
+    L = plan.p_stay_table.shape[0]
+    bitgen = rng.bit_generator
+    valid = valid_mask(N)
+    words = bitgen.random_raw(valid.size).astype(np.uint64) & valid
+    v = np.tile(words, (L, 1))
+
+    X = np.empty((L, 1, steps), dtype=float)
+    Sv = np.empty((L, 1, steps), dtype=float)
+    flips = np.empty((L, 1, steps), dtype=int)
+    dir_sign = np.empty((L, 1, steps), dtype=int)
+    sx = np.zeros(L, dtype=float)  # sum of thread positions per replica
+
+    n_up = popcount(v).sum(axis=-1)
+    for t in range(steps):
+        # Record COM position & alignment before step
+        m = 2 * n_up - N  # sum of directions
+        X[:, 0, t] = sx / N
+        Sv[:, 0, t] = np.abs(m / N)
+        dir_sign[:, 0, t] = np.sign(m)
+
+        q = 1.0 - plan.p_stay_table[plan.rows, n_up]
+        mask = bernoulli_mask(q, valid, bitgen)
+        v ^= mask
+        flips[:, 0, t] = popcount(mask).sum(axis=-1)
+
+        n_up = popcount(v).sum(axis=-1)
+        sx += 2 * n_up - N  # unit step size
+    return X, Sv, flips, dir_sign
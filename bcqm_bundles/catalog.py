@@ -0,0 +1,225 @@
+"""SQLite catalog of run outputs.
+
+Indexes every analysed run below an outputs root (each directory with a
+metadata.json and a summary.json, including the lambda<value>/ subtrees of
+a coupling sweep) into a single SQLite file:
+
+  * runs      — one row per run directory, with the metadata.json config
+                flattened into columns (e.g. bundle_coupling_coupling_strength,
+                kernel_slip_law_alpha, ensemble_n_ensembles),
+  * pairs     — one row per (run, W_coh, N) with the summary.json metrics,
+  * results   — a view joining both, so every row carries its config,
+  * beta_fits — one row per (run, N) from beta_COM under the summary's
+                "_run" key (bootstrap log-log fits, see
+                analysis.bootstrap_run).
+
+Columns are added as new config fields or summary metrics appear. Updates
+are incremental: a run is re-read only when its metadata.json or
+summary.json changed since it was indexed, and runs whose directory has
+gone are dropped.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CATALOG_NAME = "catalog.sqlite"
+
+_RUN_KEYS = ("run_dir", "metadata_mtime", "summary_mtime")
+_PAIR_KEYS = ("run_dir", "W_coh", "N")
+# Run-level entry of summary.json (analysis.RUN_SUMMARY_KEY); kept as a
+# literal so the catalog does not import the numpy-based analysis module.
+_RUN_SUMMARY_KEY = "_run"
+
+
+def default_catalog_path(root: str) -> str:
+    return os.path.join(root, CATALOG_NAME)
+
+
+def parse_pair_key(key: str) -> Optional[Tuple[float, int]]:
+    """(W_coh, N) from a summary key 'W{W}_N{N}', or None for other keys."""
+    parts = key.split("_")
+    if len(parts) != 2 or not parts[0].startswith("W") or not parts[1].startswith("N"):
+        return None
+    try:
+        return float(parts[0][1:]), int(parts[1][1:])
+    except ValueError:
+        return None
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested dicts to column -> scalar; lists become JSON text."""
+    out: Dict[str, Any] = {}
+    for key, value in d.items():
+        col = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_flatten(value, col + "_"))
+        elif isinstance(value, (list, tuple)):
+            out[col] = json.dumps(value)
+        else:
+            out[col] = value
+    return out
+
+
+def _iter_run_dirs(root: str) -> Iterator[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if "metadata.json" in filenames and "summary.json" in filenames:
+            yield dirpath
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open (and if needed create) a catalog database."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS runs ("
+        "run_dir TEXT PRIMARY KEY, metadata_mtime REAL, summary_mtime REAL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pairs ("
+        "run_dir TEXT, W_coh REAL, N INTEGER, PRIMARY KEY (run_dir, W_coh, N))"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS pairs_WN ON pairs (W_coh, N)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS beta_fits ("
+        "run_dir TEXT, N INTEGER, beta REAL, beta_ci_low REAL, beta_ci_high REAL, "
+        "n_wcoh INTEGER, PRIMARY KEY (run_dir, N))"
+    )
+    conn.execute(
+        "CREATE VIEW IF NOT EXISTS results AS "
+        "SELECT * FROM pairs JOIN runs USING (run_dir)"
+    )
+    return conn
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _upsert(conn: sqlite3.Connection, table: str, row: Dict[str, Any]) -> None:
+    existing = set(_columns(conn, table))
+    for col in row:
+        if col not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN "{col}"')
+    cols = ", ".join(f'"{c}"' for c in row)
+    marks = ", ".join("?" for _ in row)
+    conn.execute(f"INSERT OR REPLACE INTO {table} ({cols}) VALUES ({marks})", list(row.values()))
+
+
+def _delete_run(conn: sqlite3.Connection, run_dir: str) -> None:
+    for table in ("pairs", "beta_fits", "runs"):
+        conn.execute(f"DELETE FROM {table} WHERE run_dir = ?", (run_dir,))
+
+
+def _index_run(conn: sqlite3.Connection, run_dir: str, run_path: str, mtimes: Tuple[float, float]) -> int:
+    with open(os.path.join(run_path, "metadata.json"), "r", encoding="utf-8") as fh:
+        meta = json.load(fh)
+    with open(os.path.join(run_path, "summary.json"), "r", encoding="utf-8") as fh:
+        summary = json.load(fh)
+
+    meta.pop("timing", None)
+    run_row = {"run_dir": run_dir, "metadata_mtime": mtimes[0], "summary_mtime": mtimes[1]}
+    for col, value in _flatten(meta).items():
+        if col not in _RUN_KEYS:
+            run_row[col] = value
+    _delete_run(conn, run_dir)
+    _upsert(conn, "runs", run_row)
+
+    for N_key, fit in (summary.get(_RUN_SUMMARY_KEY) or {}).get("beta_COM", {}).items():
+        conn.execute(
+            "INSERT INTO beta_fits VALUES (?, ?, ?, ?, ?, ?)",
+            (run_dir, int(N_key[1:]), fit["beta"], fit["beta_ci_low"], fit["beta_ci_high"], fit["n_wcoh"]),
+        )
+
+    n_pairs = 0
+    for key, metrics in summary.items():
+        WN = parse_pair_key(key)
+        if WN is None or not isinstance(metrics, dict):
+            continue
+        pair_row = {"run_dir": run_dir, "W_coh": WN[0], "N": WN[1]}
+        for col, value in _flatten(metrics).items():
+            if col not in _PAIR_KEYS:
+                pair_row[col] = value
+        _upsert(conn, "pairs", pair_row)
+        n_pairs += 1
+    return n_pairs
+
+
+def update_catalog(root: str = "outputs_bundles", db_path: Optional[str] = None) -> Dict[str, int]:
+    """Bring the catalog of *root* up to date; returns what changed.
+
+    The database defaults to <root>/catalog.sqlite. Run directories are
+    stored relative to root (e.g. 'run_B1_shared_bias' or
+    'run_B_lambda_sweep/lambda0.25').
+    """
+    db_path = default_catalog_path(root) if db_path is None else db_path
+    conn = connect(db_path)
+    counts = {"indexed": 0, "unchanged": 0, "removed": 0, "pairs": 0}
+    try:
+        with conn:
+            known = {
+                row["run_dir"]: (row["metadata_mtime"], row["summary_mtime"])
+                for row in conn.execute("SELECT run_dir, metadata_mtime, summary_mtime FROM runs")
+            }
+            seen = set()
+            for run_path in _iter_run_dirs(root):
+                run_dir = os.path.relpath(run_path, root).replace(os.sep, "/")
+                seen.add(run_dir)
+                mtimes = (
+                    os.path.getmtime(os.path.join(run_path, "metadata.json")),
+                    os.path.getmtime(os.path.join(run_path, "summary.json")),
+                )
+                if known.get(run_dir) == mtimes:
+                    counts["unchanged"] += 1
+                    continue
+                counts["pairs"] += _index_run(conn, run_dir, run_path, mtimes)
+                counts["indexed"] += 1
+            for run_dir in set(known) - seen:
+                _delete_run(conn, run_dir)
+                counts["removed"] += 1
+    finally:
+        conn.close()
+    return counts
+
+
+def query(db_path: str, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+    """Run a read-only SQL query against the catalog; rows as dicts."""
+    conn = connect(db_path)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def load_run(db_path: str, run_dir: str) -> Dict[Tuple[float, int], Dict[str, Any]]:
+    """Summary metrics of one run keyed by (W_coh, N)."""
+    rows = query(db_path, "SELECT * FROM pairs WHERE run_dir = ? ORDER BY W_coh, N", (run_dir,))
+    return {(row["W_coh"], row["N"]): row for row in rows}
+
+
+def load_beta_fits(db_path: str, run_dir: str) -> Dict[int, Dict[str, Any]]:
+    """beta_COM fits of one run keyed by N (empty if the run has none)."""
+    rows = query(db_path, "SELECT * FROM beta_fits WHERE run_dir = ? ORDER BY N", (run_dir,))
+    return {row["N"]: row for row in rows}
+
+
+def format_rows(rows: Sequence[Dict[str, Any]]) -> str:
+    """Plain-text table of query results."""
+    if not rows:
+        return "(no rows)"
+    cols = list(rows[0])
+    cells = [[_fmt_cell(row[c]) for c in cols] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(cols)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(cols, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(r, widths)) for r in cells]
+    return "\n".join(lines)
+
+
+def _fmt_cell(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
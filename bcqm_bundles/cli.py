@@ -3,7 +3,14 @@
 Usage examples
 --------------
 python -m bcqm_bundles.cli run configs/wcoh_bundle_scan.yml
+python -m bcqm_bundles.cli run configs/run_A2_independent.yml configs/run_B*.yml --jobs 8
+python -m bcqm_bundles.cli run configs/run_B1_shared_bias.yml --jobs 8 --analyse --no-timeseries
+python -m bcqm_bundles.cli status outputs_bundles/run_B1_shared_bias
 python -m bcqm_bundles.cli analyse outputs_bundles/bundle_soft_rudder_v0
+python -m bcqm_bundles.cli catalog outputs_bundles --query "SELECT * FROM results WHERE N = 32"
+python -m bcqm_bundles.cli sweep outputs_bundles/alpha_lambda_sweep --where alpha=1.0
+python -m bcqm_bundles.cli plan configs/run_B1_shared_bias.yml
+python -m bcqm_bundles.cli bench --baseline bench_baseline.json
 """
 
 from __future__ import annotations
@@ -11,50 +18,257 @@ from __future__ import annotations
 import argparse
 import json
 import os
+from dataclasses import replace
 from glob import glob
 
-from .config_schemas import load_config
-from .simulate import run_all
-from .analysis import analyse_pair
+from .config_schemas import load_config, coupling_strengths, is_lambda_sweep
+from .simulate import run_all, run_batch, lambda_dir_name
+from .analysis import analyse_pair, parse_pair_dir, run_summary, write_summary
 
 
 def main(argv=None) -> None:
     parser = argparse.ArgumentParser(description="bcqm_bundles CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    p_run = subparsers.add_parser("run", help="run simulations for a config")
-    p_run.add_argument("config", help="YAML config file")
+    p_run = subparsers.add_parser("run", help="run simulations for one or more configs")
+    p_run.add_argument(
+        "config", nargs="+", help="YAML config files or directories of YAML configs"
+    )
+    p_run.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="worker processes shared by all simulation units (default 1)",
+    )
+    p_run.add_argument(
+        "--backend",
+        choices=["numpy", "numba"],
+        default=None,
+        help="stepping backend (overrides execution.backend in the config)",
+    )
+    p_run.add_argument(
+        "--analyse",
+        action="store_true",
+        help="analyse each pair as soon as it is simulated (sets execution.analyse)",
+    )
+    p_run.add_argument(
+        "--no-timeseries",
+        action="store_true",
+        help="with --analyse, do not write timeseries.npz (sets execution.keep_timeseries false)",
+    )
+    p_run.add_argument(
+        "--profile",
+        action="store_true",
+        help="dump cProfile and tracemalloc snapshots for the costliest pair",
+    )
+
+    p_status = subparsers.add_parser(
+        "status", help="summarise the progress of a running (or finished) run"
+    )
+    p_status.add_argument("output_dir", help="Output directory of the run")
 
     p_an = subparsers.add_parser("analyse", help="analyse an output directory")
     p_an.add_argument("output_dir", help="Output directory created by 'run'")
 
+    p_cat = subparsers.add_parser(
+        "catalog", help="index analysed runs into an SQLite catalog and query it"
+    )
+    p_cat.add_argument(
+        "root", nargs="?", default="outputs_bundles", help="outputs root (default outputs_bundles)"
+    )
+    p_cat.add_argument("--db", default=None, help="catalog file (default <root>/catalog.sqlite)")
+    p_cat.add_argument("--query", default=None, help="SQL to run after updating, e.g. against 'results'")
+
+    p_sweep = subparsers.add_parser(
+        "sweep", help="list the points of a parameter sweep, optionally sliced"
+    )
+    p_sweep.add_argument("output_dir", help="Output directory of the sweep")
+    p_sweep.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        metavar="AXIS=VALUE[,VALUE...]",
+        help="keep points whose axis (dotted path or last component) has one of the values",
+    )
+
+    p_plan = subparsers.add_parser(
+        "plan", help="predict runtime, memory and disk use of a config without running it"
+    )
+    p_plan.add_argument("config", help="YAML config file")
+    p_plan.add_argument("--backend", choices=["numpy", "numba"], default=None)
+    p_plan.add_argument(
+        "--calibrate-from",
+        nargs="+",
+        default=None,
+        metavar="RUN_DIR",
+        help="earlier run directories whose timing records calibrate the cost model "
+        "(default: all runs next to the config's output_dir)",
+    )
+    p_plan.add_argument(
+        "--no-benchmark",
+        action="store_true",
+        help="do not fall back to a micro-benchmark when no timing records match",
+    )
+    p_plan.add_argument("--max-memory-gb", type=float, default=None)
+    p_plan.add_argument("--max-disk-gb", type=float, default=None)
+    p_plan.add_argument("--json", default=None, help="also write the plan as JSON")
+
+    p_bench = subparsers.add_parser("bench", help="run the benchmark suite")
+    p_bench.add_argument(
+        "--output", default="bench_results.json", help="JSON file for the results"
+    )
+    p_bench.add_argument("--baseline", default=None, help="baseline JSON to compare against")
+    p_bench.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fractional throughput drop counted as a regression (default 0.1)",
+    )
+    p_bench.add_argument("--backend", choices=["numpy", "numba"], default="numpy")
+    p_bench.add_argument(
+        "--repeat", type=int, default=3, help="repeats per case; the fastest is kept"
+    )
+
     args = parser.parse_args(argv)
 
     if args.command == "run":
-        cfg = load_config(args.config)
-        run_all(cfg)
+        cfgs = [load_config(path) for path in expand_config_paths(args.config)]
+        if args.backend is not None:
+            cfgs = [replace(cfg, execution=replace(cfg.execution, backend=args.backend)) for cfg in cfgs]
+        if args.no_timeseries and not args.analyse:
+            parser.error("--no-timeseries requires --analyse")
+        if args.analyse:
+            cfgs = [
+                replace(
+                    cfg,
+                    execution=replace(
+                        cfg.execution,
+                        analyse=True,
+                        keep_timeseries=cfg.execution.keep_timeseries and not args.no_timeseries,
+                    ),
+                )
+                for cfg in cfgs
+            ]
+        if len(cfgs) == 1 and args.jobs <= 1:
+            run_all(cfgs[0], profile=args.profile)
+        else:
+            counts = run_batch(cfgs, jobs=args.jobs, profile=args.profile)
+            print(
+                f"{counts['configs']} configs, {counts['units']} units, "
+                f"{counts['units'] - counts['simulated']} shared with an identical unit"
+            )
+    elif args.command == "status":
+        from .instrument import PROGRESS_FILE, format_progress, read_progress, summarise_progress
+
+        path = os.path.join(args.output_dir, PROGRESS_FILE)
+        if not os.path.exists(path):
+            raise SystemExit(f"No {PROGRESS_FILE} in {args.output_dir}")
+        print(format_progress(summarise_progress(read_progress(path))))
     elif args.command == "analyse":
-        out_dir = args.output_dir
-        summary_path = os.path.join(out_dir, "summary.json")
-        all_summaries = {}
-        for pair_dir in sorted(glob(os.path.join(out_dir, "W*_N*"))):
-            # Parse W and N from directory name W{W}_N{N}
-            base = os.path.basename(pair_dir)
-            try:
-                w_str, n_str = base.split("_")
-                W = float(w_str[1:])
-                N = int(n_str[1:])
-            except Exception:
-                continue
-            summary = analyse_pair(load_config_from_metadata(out_dir), pair_dir)
-            key = f"W{W}_N{N}"
-            all_summaries[key] = summary
-        with open(summary_path, "w", encoding="utf-8") as fh:
-            json.dump(all_summaries, fh, indent=2)
+        analyse_output_dir(args.output_dir)
+    elif args.command == "catalog":
+        from .catalog import default_catalog_path, format_rows, query, update_catalog
+
+        db_path = args.db or default_catalog_path(args.root)
+        counts = update_catalog(args.root, db_path)
+        print(
+            f"{db_path}: {counts['indexed']} runs indexed ({counts['pairs']} pairs), "
+            f"{counts['unchanged']} unchanged, {counts['removed']} removed"
+        )
+        if args.query:
+            print(format_rows(query(db_path, args.query)))
+    elif args.command == "sweep":
+        from .sweep import select_points
+
+        where = {}
+        for item in args.where:
+            axis, sep, values = item.partition("=")
+            if not sep:
+                parser.error(f"--where expects AXIS=VALUE, got {item!r}")
+            where[axis] = values.split(",")
+        for point in select_points(args.output_dir, where):
+            params = " ".join(f"{axis}={value}" for axis, value in point["params"].items())
+            print(f"{point['path']}  {params}")
+    elif args.command == "plan":
+        from .planner import main_plan
+
+        code = main_plan(
+            args.config,
+            calibration_dirs=args.calibrate_from,
+            benchmark=not args.no_benchmark,
+            max_memory_gb=args.max_memory_gb,
+            max_disk_gb=args.max_disk_gb,
+            output=args.json,
+            backend=args.backend,
+        )
+        if code:
+            raise SystemExit(code)
+    elif args.command == "bench":
+        from .bench import main_bench
+
+        code = main_bench(
+            args.output,
+            baseline=args.baseline,
+            threshold=args.threshold,
+            backend=args.backend,
+            repeat=args.repeat,
+        )
+        if code:
+            raise SystemExit(code)
     else:
         parser.error(f"Unknown command {args.command!r}")
 
 
+def expand_config_paths(paths):
+    """Expand directories in *paths* to the YAML configs they contain."""
+    out = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(glob(os.path.join(path, "*.yml")) + glob(os.path.join(path, "*.yaml")))
+            if not found:
+                raise ValueError(f"No YAML configs in {path}")
+            out.extend(found)
+        else:
+            out.append(path)
+    return out
+
+
+def analyse_output_dir(out_dir: str) -> None:
+    """Analyse every W*_N* pair under out_dir and write summary.json.
+
+    For a coupling-strength sweep, each lambda<value>/ subtree is analysed
+    in turn (lambda = 0 first, the control of analysis.control_variate)
+    and gets its own summary.json; for a parameter sweep, each point
+    listed in sweep_index.json.
+    """
+    from .sweep import read_sweep_index
+
+    index = read_sweep_index(out_dir)
+    if index is not None and not os.path.exists(os.path.join(out_dir, "metadata.json")):
+        for point in index["points"]:
+            analyse_output_dir(os.path.join(out_dir, point["path"]))
+        return
+
+    cfg = load_config_from_metadata(out_dir)
+    if is_lambda_sweep(cfg.bundle_coupling):
+        for lam in sorted(coupling_strengths(cfg.bundle_coupling), key=lambda lam: lam != 0.0):
+            analyse_output_dir(os.path.join(out_dir, lambda_dir_name(lam)))
+        return
+
+    pair_summaries = {}
+    for pair_dir in sorted(glob(os.path.join(out_dir, "W*_N*"))):
+        name = os.path.basename(pair_dir)
+        try:
+            parse_pair_dir(name)
+        except ValueError:
+            continue
+        pair_summaries[name] = analyse_pair(cfg, pair_dir)
+
+    # Run-level bootstrap; beta_COM and bootstrap go under the reserved
+    # "_run" key next to the W*_N* entries.
+    write_summary(out_dir, run_summary(cfg, out_dir, pair_summaries))
+
+
 def load_config_from_metadata(out_dir: str):
     """Reconstruct a TopLevelConfig from metadata.json.
 
@@ -66,7 +280,9 @@ def load_config_from_metadata(out_dir: str):
         EnsembleConfig,
         KernelConfig,
         SlipLawConfig,
+        SlipSpreadConfig,
         BundleCouplingConfig,
+        GraphConfig,
         PhaseDynamicsConfig,
         PhaseDynamicsParams,
         AnalysisConfig,
@@ -75,6 +291,12 @@ def load_config_from_metadata(out_dir: str):
         BetaFitConfig,
         KappaEffConfig,
         LifetimeConfig,
+        BootstrapConfig,
+        AutocorrelationConfig,
+        SketchConfig,
+        ControlVariateConfig,
+        ExecutionConfig,
+        SweepConfig,
     )
     meta_path = os.path.join(out_dir, "metadata.json")
     with open(meta_path, "r", encoding="utf-8") as fh:
@@ -82,14 +304,18 @@ def load_config_from_metadata(out_dir: str):
 
     ensemble = EnsembleConfig(**meta["ensemble"])
 
-    slip = SlipLawConfig(**meta["kernel"]["slip_law"])
+    slip_meta = dict(meta["kernel"]["slip_law"])
+    slip_meta["heterogeneity"] = SlipSpreadConfig(**slip_meta.get("heterogeneity", {}))
+    slip = SlipLawConfig(**slip_meta)
     kernel = KernelConfig(
         type=meta["kernel"]["type"],
         step_size=meta["kernel"]["step_size"],
         slip_law=slip,
     )
 
-    bc = BundleCouplingConfig(**meta["bundle_coupling"])
+    bc_meta = dict(meta["bundle_coupling"])
+    bc_meta["graph"] = GraphConfig(**bc_meta.get("graph", {}))
+    bc = BundleCouplingConfig(**bc_meta)
 
     pd_params = PhaseDynamicsParams(**meta["phase_dynamics"]["params"])
     phase_dyn = PhaseDynamicsConfig(
@@ -103,8 +329,20 @@ def load_config_from_metadata(out_dir: str):
     beta = BetaFitConfig(**meta["analysis"]["beta_fit"])
     kappa = KappaEffConfig(**meta["analysis"]["kappa_eff"])
     life = LifetimeConfig(**meta["analysis"]["lifetime"])
+    boot = BootstrapConfig(**meta["analysis"].get("bootstrap", {}))
+    acf = AutocorrelationConfig(**meta["analysis"].get("autocorrelation", {}))
+    sketch = SketchConfig(**meta["analysis"].get("sketch", {}))
+    control_variate = ControlVariateConfig(**meta["analysis"].get("control_variate", {}))
     analysis = AnalysisConfig(
-        psd=psd, amplitude_fit=amp, beta_fit=beta, kappa_eff=kappa, lifetime=life
+        psd=psd,
+        amplitude_fit=amp,
+        beta_fit=beta,
+        kappa_eff=kappa,
+        lifetime=life,
+        bootstrap=boot,
+        autocorrelation=acf,
+        sketch=sketch,
+        control_variate=control_variate,
     )
 
     cfg = TopLevelConfig(
@@ -118,6 +356,8 @@ def load_config_from_metadata(out_dir: str):
         bundle_coupling=bc,
         phase_dynamics=phase_dyn,
         analysis=analysis,
+        execution=ExecutionConfig(**meta.get("execution", {})),
+        sweep=SweepConfig(**meta.get("sweep", {})),
     )
     return cfg
 
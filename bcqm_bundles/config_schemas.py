@@ -7,8 +7,8 @@ a small number of helpers to fill defaults and sanity-check fields.
 from __future__ import annotations
 
 import copy
-from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Union
 
 try:
     import yaml  # type: ignore
@@ -19,6 +19,21 @@ except ImportError as exc:  # pragma: no cover
 class EnsembleConfig:
     n_ensembles: int = 50
     steps_per_wcoh: int = 1000
+    # Independent mode only: simulate max(bundle_sizes) threads once and
+    # derive every smaller N from prefix sub-bundles of the same threads.
+    nested_bundle_sizes: bool = False
+    # Members come in mirrored pairs (2j, 2j + 1): reversed initial directions
+    # and phases, and 1 - u for every flip uniform; n_ensembles must be even.
+    antithetic: bool = False
+
+
+@dataclass
+class SlipSpreadConfig:
+    # Per-thread heterogeneity of the slip law: each thread's parameter is
+    # the common value times a factor drawn once per ensemble member.
+    parameter: str = "none"  # "none", "k_prefactor", "W_coh"
+    distribution: str = "lognormal"  # "lognormal" (median 1), "uniform" (mean 1)
+    spread: float = 0.0  # lognormal: sigma of log(factor); uniform: half-width
 
 
 @dataclass
@@ -26,6 +41,7 @@ class SlipLawConfig:
     form: str = "power_law"
     alpha: float = 1.0
     k_prefactor: float = 2.0
+    heterogeneity: SlipSpreadConfig = field(default_factory=SlipSpreadConfig)
 
 
 @dataclass
@@ -35,10 +51,22 @@ class KernelConfig:
     slip_law: SlipLawConfig = field(default_factory=SlipLawConfig)
 
 
+@dataclass
+class GraphConfig:
+    kind: str = "ring"  # "ring", "lattice", "random"
+    neighbours: int = 1  # ring: neighbours on each side
+    mean_degree: float = 4.0  # random: expected degree (Erdos-Renyi)
+    seed: int = 0  # random: graph seed, combined with N
+
+
 @dataclass
 class BundleCouplingConfig:
-    mode: str = "independent"  # "independent", "shared_bias", "strong_lock"
-    coupling_strength: float = 0.0  # lambda in [0,1]
+    mode: str = "independent"  # "independent", "shared_bias", "strong_lock", "local"
+    # lambda in [0,1]; a list runs one common-random-numbers replica per value
+    coupling_strength: Union[float, List[float]] = 0.0
+    # mode "local": stay law applied to each thread's neighbourhood alignment
+    local_law: str = "shared_bias"
+    graph: GraphConfig = field(default_factory=GraphConfig)
 
 
 @dataclass
@@ -46,6 +74,8 @@ class PhaseDynamicsParams:
     base_rate: float = 1.0
     wcoh_scaling: str = "none"  # "none", "inverse", "sqrt_inverse"
     stability_weight: float = 0.5
+    coupling: float = 0.0  # mean-field coupling K (mean_field_kuramoto)
+    freq_spread: float = 0.0  # std of natural frequencies around base_rate (mean_field_kuramoto)
 
 
 @dataclass
@@ -60,6 +90,7 @@ class PSDConfig:
     window: str = "hann"
     segment_length: int = 4096
     overlap: float = 0.5
+    estimator: str = "welch"  # "welch" (full spectra) or "band" (decimated, amplitude-fit band only)
 
 
 @dataclass
@@ -76,13 +107,46 @@ class BetaFitConfig:
 
 @dataclass
 class KappaEffConfig:
-    window_size: int = 1
+    # flip counts are summed over windows of this many steps; a list gives
+    # kappa_eff(window) for every entry
+    window_size: Union[int, List[int]] = 1
+    windowing: str = "sliding"  # "sliding" or "blocked"
 
 
 @dataclass
 class LifetimeConfig:
     f_min: float = 0.6
     evap_window: int = 20
+    # Stop each member once it has evaporated; record lifetimes only
+    lifetime_only: bool = False
+    keep_trajectory: bool = False  # lifetime_only: also store COM and S_v up to evaporation
+
+
+@dataclass
+class BootstrapConfig:
+    n_resamples: int = 2000  # 0 disables the bootstrap stage
+    confidence: float = 0.95
+    seed: int = 0
+
+
+@dataclass
+class AutocorrelationConfig:
+    # Sokal automatic windowing: sum rho(t) up to the first M >= c * tau_int(M)
+    window_c: float = 5.0
+
+
+@dataclass
+class SketchConfig:
+    # KLL quantile sketches of per-member statistics (sketches.json); k = 0 disables them
+    k: int = 200
+    seed: int = 0
+
+
+@dataclass
+class ControlVariateConfig:
+    # Use the lambda = 0 replica (independent threads, same random numbers) as
+    # a control variate with closed-form means; needs 0.0 in coupling_strength
+    enabled: bool = False
 
 
 @dataclass
@@ -92,6 +156,35 @@ class AnalysisConfig:
     beta_fit: BetaFitConfig = field(default_factory=BetaFitConfig)
     kappa_eff: KappaEffConfig = field(default_factory=KappaEffConfig)
     lifetime: LifetimeConfig = field(default_factory=LifetimeConfig)
+    bootstrap: BootstrapConfig = field(default_factory=BootstrapConfig)
+    autocorrelation: AutocorrelationConfig = field(default_factory=AutocorrelationConfig)
+    sketch: SketchConfig = field(default_factory=SketchConfig)
+    control_variate: ControlVariateConfig = field(default_factory=ControlVariateConfig)
+
+
+@dataclass
+class ExecutionConfig:
+    backend: str = "numpy"  # "numpy", "numba" (falls back to numpy if unavailable)
+    engine: str = "dense"  # "dense" (one int per thread), "bitpacked" (one bit per thread)
+    progress_interval_s: float = 10.0  # seconds between progress.jsonl heartbeats; 0 disables them
+    pyramid: bool = True  # also write a min/max/mean decimation pyramid (pyramid.npz) per pair
+    pyramid_min_factor: int = 8  # finest pyramid decimation factor (a power of 2)
+    shared_results: bool = True  # jobs > 1: workers hand results over in shared memory, not pickled
+    analyse: bool = False  # analyse each pair right after simulating it and keep summary.json current
+    keep_timeseries: bool = True  # write timeseries.npz; false needs analyse (summaries only)
+
+
+@dataclass
+class SweepConfig:
+    # Dotted config path -> values, e.g. {"kernel.slip_law.alpha": [0.5, 1.0]};
+    # the run covers the Cartesian product (see bcqm_bundles.sweep)
+    axes: Dict[str, List[Any]] = field(default_factory=dict)
+    seeds: str = "common"  # "common" (same random_seed at every point) or "independent"
+    point_id: str = ""  # set on the per-point configs of an expanded sweep
+
+
+# Config fields that cannot be sweep axes: the run's own identity and grids.
+_NOT_SWEEPABLE = ("model_name", "output_dir", "wcoh_grid", "bundle_sizes", "sweep")
 
 
 @dataclass
@@ -106,6 +199,8 @@ class TopLevelConfig:
     bundle_coupling: BundleCouplingConfig = field(default_factory=BundleCouplingConfig)
     phase_dynamics: PhaseDynamicsConfig = field(default_factory=PhaseDynamicsConfig)
     analysis: AnalysisConfig = field(default_factory=AnalysisConfig)
+    execution: ExecutionConfig = field(default_factory=ExecutionConfig)
+    sweep: SweepConfig = field(default_factory=SweepConfig)
 
 
 def _ensure_list(value: Any) -> list:
@@ -114,6 +209,21 @@ def _ensure_list(value: Any) -> list:
     return [value]
 
 
+def coupling_strengths(coupling_cfg: BundleCouplingConfig) -> List[float]:
+    """Return coupling_strength as a list (one entry per lambda replica)."""
+    return [float(lam) for lam in _ensure_list(coupling_cfg.coupling_strength)]
+
+
+def window_sizes(kappa_cfg: KappaEffConfig) -> List[int]:
+    """Return kappa_eff.window_size as a list of window lengths in steps."""
+    return [int(w) for w in _ensure_list(kappa_cfg.window_size)]
+
+
+def is_lambda_sweep(coupling_cfg: BundleCouplingConfig) -> bool:
+    """True if coupling_strength was given as a list of lambda values."""
+    return isinstance(coupling_cfg.coupling_strength, list)
+
+
 def load_config(path: str) -> TopLevelConfig:
     """Load YAML config from *path* and return a TopLevelConfig.
 
@@ -127,7 +237,14 @@ def load_config(path: str) -> TopLevelConfig:
 
     with open(path, "r", encoding="utf-8") as fh:
         raw = yaml.safe_load(fh)
+    return config_from_dict(raw)
+
 
+def config_from_dict(raw: Dict[str, Any]) -> TopLevelConfig:
+    """Build a TopLevelConfig from a parsed YAML mapping (see load_config).
+
+    asdict(cfg) of any TopLevelConfig is a valid input and gives cfg back.
+    """
     # Basic required fields
     model_name = raw.get("model_name", "bundle_soft_rudder_v0")
     output_dir = raw.get("output_dir", "outputs_bundles/bundle_soft_rudder_v0")
@@ -141,16 +258,35 @@ def load_config(path: str) -> TopLevelConfig:
     ensemble = EnsembleConfig(
         n_ensembles=int(ens_raw.get("n_ensembles", 50)),
         steps_per_wcoh=int(ens_raw.get("steps_per_wcoh", 1000)),
+        nested_bundle_sizes=bool(ens_raw.get("nested_bundle_sizes", False)),
+        antithetic=bool(ens_raw.get("antithetic", False)),
     )
+    if ensemble.antithetic and ensemble.n_ensembles % 2:
+        raise ValueError("ensemble.antithetic requires an even n_ensembles")
 
     # Kernel
     kern_raw = raw.get("kernel", {}) or {}
     slip_raw = kern_raw.get("slip_law", {}) or {}
+    het_raw = slip_raw.get("heterogeneity", {}) or {}
     slip = SlipLawConfig(
         form=str(slip_raw.get("form", "power_law")),
         alpha=float(slip_raw.get("alpha", 1.0)),
         k_prefactor=float(slip_raw.get("k_prefactor", 2.0)),
+        heterogeneity=SlipSpreadConfig(
+            parameter=str(het_raw.get("parameter", "none")),
+            distribution=str(het_raw.get("distribution", "lognormal")),
+            spread=float(het_raw.get("spread", 0.0)),
+        ),
     )
+    het = slip.heterogeneity
+    if het.parameter not in ("none", "k_prefactor", "W_coh"):
+        raise ValueError(f"Unknown kernel.slip_law.heterogeneity.parameter {het.parameter!r}")
+    if het.distribution not in ("lognormal", "uniform"):
+        raise ValueError(f"Unknown kernel.slip_law.heterogeneity.distribution {het.distribution!r}")
+    if het.spread < 0 or (het.distribution == "uniform" and het.spread >= 1.0):
+        raise ValueError(
+            "kernel.slip_law.heterogeneity.spread must be >= 0 (and < 1 for 'uniform')"
+        )
     kernel = KernelConfig(
         type=str(kern_raw.get("type", "soft_rudder_bundle")),
         step_size=float(kern_raw.get("step_size", 1.0)),
@@ -159,10 +295,34 @@ def load_config(path: str) -> TopLevelConfig:
 
     # Bundle coupling
     bc_raw = raw.get("bundle_coupling", {}) or {}
+    lam_raw = bc_raw.get("coupling_strength", 0.0)
+    if isinstance(lam_raw, list):
+        if not lam_raw:
+            raise ValueError("bundle_coupling.coupling_strength list must not be empty")
+        coupling_strength: Union[float, List[float]] = [float(x) for x in lam_raw]
+    else:
+        coupling_strength = float(lam_raw)
+    graph_raw = bc_raw.get("graph", {}) or {}
+    graph = GraphConfig(
+        kind=str(graph_raw.get("kind", "ring")),
+        neighbours=int(graph_raw.get("neighbours", 1)),
+        mean_degree=float(graph_raw.get("mean_degree", 4.0)),
+        seed=int(graph_raw.get("seed", 0)),
+    )
+    if graph.kind not in ("ring", "lattice", "random"):
+        raise ValueError(f"Unknown bundle_coupling.graph.kind {graph.kind!r}")
+    if graph.neighbours < 1:
+        raise ValueError("bundle_coupling.graph.neighbours must be >= 1")
+    if graph.mean_degree <= 0:
+        raise ValueError("bundle_coupling.graph.mean_degree must be positive")
     bundle_coupling = BundleCouplingConfig(
         mode=str(bc_raw.get("mode", "independent")),
-        coupling_strength=float(bc_raw.get("coupling_strength", 0.0)),
+        coupling_strength=coupling_strength,
+        local_law=str(bc_raw.get("local_law", "shared_bias")),
+        graph=graph,
     )
+    if bundle_coupling.local_law == "local":
+        raise ValueError("bundle_coupling.local_law must be a global stay law, not 'local'")
 
     # Phase dynamics
     pd_raw = raw.get("phase_dynamics", {}) or {}
@@ -171,6 +331,8 @@ def load_config(path: str) -> TopLevelConfig:
         base_rate=float(pd_params_raw.get("base_rate", 1.0)),
         wcoh_scaling=str(pd_params_raw.get("wcoh_scaling", "none")),
         stability_weight=float(pd_params_raw.get("stability_weight", 0.5)),
+        coupling=float(pd_params_raw.get("coupling", 0.0)),
+        freq_spread=float(pd_params_raw.get("freq_spread", 0.0)),
     )
     phase_dynamics = PhaseDynamicsConfig(
         enabled=bool(pd_raw.get("enabled", False)),
@@ -186,7 +348,10 @@ def load_config(path: str) -> TopLevelConfig:
         window=str(psd_raw.get("window", "hann")),
         segment_length=int(psd_raw.get("segment_length", 4096)),
         overlap=float(psd_raw.get("overlap", 0.5)),
+        estimator=str(psd_raw.get("estimator", "welch")),
     )
+    if psd.estimator not in ("welch", "band"):
+        raise ValueError(f"Unknown analysis.psd.estimator {psd.estimator!r}")
 
     amp_raw = an_raw.get("amplitude_fit", {}) or {}
     amp = AmplitudeFitConfig(
@@ -201,19 +366,104 @@ def load_config(path: str) -> TopLevelConfig:
     )
 
     kappa_raw = an_raw.get("kappa_eff", {}) or {}
+    w_raw = kappa_raw.get("window_size", 1)
+    if isinstance(w_raw, list):
+        if not w_raw:
+            raise ValueError("analysis.kappa_eff.window_size list must not be empty")
+        window_size: Union[int, List[int]] = [int(w) for w in w_raw]
+    else:
+        window_size = int(w_raw)
     kappa = KappaEffConfig(
-        window_size=int(kappa_raw.get("window_size", 1)),
+        window_size=window_size,
+        windowing=str(kappa_raw.get("windowing", "sliding")),
     )
+    if min(window_sizes(kappa)) < 1:
+        raise ValueError("analysis.kappa_eff.window_size must be >= 1")
+    if kappa.windowing not in ("sliding", "blocked"):
+        raise ValueError(f"Unknown analysis.kappa_eff.windowing {kappa.windowing!r}")
 
     life_raw = an_raw.get("lifetime", {}) or {}
     life = LifetimeConfig(
         f_min=float(life_raw.get("f_min", 0.6)),
         evap_window=int(life_raw.get("evap_window", 20)),
+        lifetime_only=bool(life_raw.get("lifetime_only", False)),
+        keep_trajectory=bool(life_raw.get("keep_trajectory", False)),
+    )
+
+    boot_raw = an_raw.get("bootstrap", {}) or {}
+    boot = BootstrapConfig(
+        n_resamples=int(boot_raw.get("n_resamples", 2000)),
+        confidence=float(boot_raw.get("confidence", 0.95)),
+        seed=int(boot_raw.get("seed", 0)),
+    )
+    if not 0.0 < boot.confidence < 1.0:
+        raise ValueError("analysis.bootstrap.confidence must be in (0, 1)")
+
+    acf_raw = an_raw.get("autocorrelation", {}) or {}
+    acf = AutocorrelationConfig(
+        window_c=float(acf_raw.get("window_c", 5.0)),
+    )
+    if acf.window_c <= 0:
+        raise ValueError("analysis.autocorrelation.window_c must be positive")
+
+    sketch_raw = an_raw.get("sketch", {}) or {}
+    sketch = SketchConfig(
+        k=int(sketch_raw.get("k", 200)),
+        seed=int(sketch_raw.get("seed", 0)),
     )
+    if sketch.k == 1 or sketch.k < 0:
+        raise ValueError("analysis.sketch.k must be 0 (off) or >= 2")
+
+    cv_raw = an_raw.get("control_variate", {}) or {}
+    control_variate = ControlVariateConfig(enabled=bool(cv_raw.get("enabled", False)))
+    if control_variate.enabled:
+        if 0.0 not in coupling_strengths(bundle_coupling):
+            raise ValueError(
+                "analysis.control_variate needs a lambda = 0 replica: add 0.0 to "
+                "bundle_coupling.coupling_strength"
+            )
+        if het.parameter != "none":
+            raise ValueError("analysis.control_variate does not support heterogeneous slip laws")
 
     analysis = AnalysisConfig(
-        psd=psd, amplitude_fit=amp, beta_fit=beta, kappa_eff=kappa, lifetime=life
+        psd=psd,
+        amplitude_fit=amp,
+        beta_fit=beta,
+        kappa_eff=kappa,
+        lifetime=life,
+        bootstrap=boot,
+        autocorrelation=acf,
+        sketch=sketch,
+        control_variate=control_variate,
+    )
+
+    # Execution
+    exec_raw = raw.get("execution", {}) or {}
+    execution = ExecutionConfig(
+        backend=str(exec_raw.get("backend", "numpy")),
+        engine=str(exec_raw.get("engine", "dense")),
+        progress_interval_s=float(exec_raw.get("progress_interval_s", 10.0)),
+        pyramid=bool(exec_raw.get("pyramid", True)),
+        pyramid_min_factor=int(exec_raw.get("pyramid_min_factor", 8)),
+        shared_results=bool(exec_raw.get("shared_results", True)),
+        analyse=bool(exec_raw.get("analyse", False)),
+        keep_timeseries=bool(exec_raw.get("keep_timeseries", True)),
     )
+    f = execution.pyramid_min_factor
+    if f < 2 or f & (f - 1):
+        raise ValueError("execution.pyramid_min_factor must be a power of 2, >= 2")
+    if not execution.keep_timeseries and not execution.analyse:
+        raise ValueError("execution.keep_timeseries: false requires execution.analyse: true")
+
+    # Parameter sweep
+    sweep_raw = raw.get("sweep", {}) or {}
+    sweep = SweepConfig(
+        axes={str(k): _ensure_list(v) for k, v in (sweep_raw.get("axes", {}) or {}).items()},
+        seeds=str(sweep_raw.get("seeds", "common")),
+        point_id=str(sweep_raw.get("point_id", "")),
+    )
+    if sweep.seeds not in ("common", "independent"):
+        raise ValueError(f"Unknown sweep.seeds {sweep.seeds!r}")
 
     cfg = TopLevelConfig(
         model_name=model_name,
@@ -226,6 +476,27 @@ def load_config(path: str) -> TopLevelConfig:
         bundle_coupling=bundle_coupling,
         phase_dynamics=phase_dynamics,
         analysis=analysis,
+        execution=execution,
+        sweep=sweep,
     )
+    check_sweep_axes(cfg)
 
     return cfg
+
+
+def check_sweep_axes(cfg: TopLevelConfig) -> None:
+    """Raise ValueError unless every sweep axis names a scalar config field."""
+    tree = asdict(cfg)
+    for axis, values in cfg.sweep.axes.items():
+        parts = axis.split(".")
+        if parts[0] in _NOT_SWEEPABLE:
+            raise ValueError(f"sweep axis {axis!r}: {parts[0]} cannot be swept")
+        node: Any = tree
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                raise ValueError(f"sweep axis {axis!r} does not name a config field")
+            node = node[part]
+        if isinstance(node, dict):
+            raise ValueError(f"sweep axis {axis!r} names a config section, not a field")
+        if not values:
+            raise ValueError(f"sweep axis {axis!r} has no values")
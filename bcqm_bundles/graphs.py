@@ -0,0 +1,159 @@
+"""Thread interaction graphs for the local bundle coupling mode.
+
+In bundle_coupling.mode "local" a thread does not feel the whole bundle's
+alignment S_v but that of its closed neighbourhood (itself plus its graph
+neighbours). Graphs are stored in CSR form (indptr, indices) and built
+once per (graph spec, N), then cached, so every W_coh and lambda replica
+of a bundle size shares one adjacency.
+
+Supported kinds (bundle_coupling.graph.kind):
+  * ring    — periodic chain, `neighbours` threads on each side,
+  * lattice — periodic 2-D square lattice with 4 neighbours, on the most
+              nearly square rows x cols factorisation of N,
+  * random  — Erdos-Renyi graph with expected degree `mean_degree`, drawn
+              from default_rng([seed, N]) in O(edges) time and memory.
+
+The neighbourhood sums are a plain NumPy CSR product (gather + reduceat),
+so the cost per step is proportional to the number of edges.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Set
+
+import numpy as np
+
+from .config_schemas import GraphConfig
+
+
+@dataclass(frozen=True)
+class ThreadGraph:
+    """Closed-neighbourhood adjacency of an N-thread bundle in CSR form.
+
+    Attributes
+    ----------
+    N : int
+        Number of threads.
+    indptr : np.ndarray
+        Shape (N + 1,); the neighbourhood of thread i is
+        indices[indptr[i]:indptr[i + 1]].
+    indices : np.ndarray
+        Neighbour indices, each row sorted and including i itself.
+    degree : np.ndarray
+        Closed degree (neighbours + 1) per thread, shape (N,).
+    """
+    N: int
+    indptr: np.ndarray
+    indices: np.ndarray
+    degree: np.ndarray
+
+    @property
+    def n_edges(self) -> int:
+        """Number of undirected edges, self-loops excluded."""
+        return int(self.degree.sum() - self.N) // 2
+
+
+def _from_neighbour_sets(neighbours: List[Set[int]]) -> ThreadGraph:
+    N = len(neighbours)
+    rows = [sorted(nbrs | {i}) for i, nbrs in enumerate(neighbours)]
+    degree = np.array([len(r) for r in rows], dtype=np.int64)
+    indptr = np.zeros(N + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    indices = np.fromiter((j for r in rows for j in r), dtype=np.int64, count=int(indptr[-1]))
+    for a in (indptr, indices, degree):
+        a.setflags(write=False)
+    return ThreadGraph(N=N, indptr=indptr, indices=indices, degree=degree)
+
+
+def _from_edges(N: int, i: np.ndarray, j: np.ndarray) -> ThreadGraph:
+    """ThreadGraph from distinct undirected edges (i, j), i != j, without Python sets."""
+    self_loops = np.arange(N, dtype=np.int64)
+    rows = np.concatenate([i, j, self_loops])
+    cols = np.concatenate([j, i, self_loops])
+    indices = np.sort(rows * N + cols) % N  # row-major order
+    degree = np.bincount(rows, minlength=N).astype(np.int64)
+    indptr = np.zeros(N + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    for a in (indptr, indices, degree):
+        a.setflags(write=False)
+    return ThreadGraph(N=N, indptr=indptr, indices=indices, degree=degree)
+
+
+def _random_edges(N: int, mean_degree: float, rng: np.random.Generator):
+    """Edges (i, j), i < j, of an Erdos-Renyi graph with edge probability mean_degree / (N - 1).
+
+    The edge count is drawn from its binomial law and the edges as a
+    uniform sample of that many of the N (N - 1) / 2 pairs, which is the
+    same distribution as one coin per pair at O(edges) cost. Pair k of the
+    row-major upper triangle is decoded to (i, j) in closed form.
+    """
+    n_pairs = N * (N - 1) // 2
+    p = min(1.0, mean_degree / max(N - 1, 1))
+    m = int(rng.binomial(n_pairs, p)) if n_pairs else 0
+    k = rng.choice(n_pairs, size=m, replace=False) if m else np.zeros(0, dtype=np.int64)
+
+    def row_start(r):  # index of pair (r, r + 1)
+        return r * (2 * N - r - 1) // 2
+
+    i = np.floor((2 * N - 1 - np.sqrt((2 * N - 1) ** 2 - 8.0 * k)) / 2).astype(np.int64)
+    # One-step corrections for rounding of the square root at row boundaries
+    i -= k < row_start(i)
+    i += k >= row_start(i + 1)
+    j = i + 1 + k - row_start(i)
+    return i, j
+
+
+def lattice_shape(N: int):
+    """(rows, cols) with rows the largest divisor of N not above sqrt(N)."""
+    rows = int(np.sqrt(N))
+    while N % rows:
+        rows -= 1
+    return rows, N // rows
+
+
+@lru_cache(maxsize=64)
+def _build_graph(kind: str, neighbours: int, mean_degree: float, seed: int, N: int) -> ThreadGraph:
+    if kind == "random":
+        i, j = _random_edges(N, mean_degree, np.random.default_rng([seed, N]))
+        return _from_edges(N, i, j)
+    nbrs: List[Set[int]] = [set() for _ in range(N)]
+    if kind == "ring":
+        for i in range(N):
+            for d in range(1, neighbours + 1):
+                nbrs[i].update(((i - d) % N, (i + d) % N))
+    elif kind == "lattice":
+        rows, cols = lattice_shape(N)
+        for r in range(rows):
+            for c in range(cols):
+                i = r * cols + c
+                nbrs[i].update(
+                    (
+                        ((r - 1) % rows) * cols + c,
+                        ((r + 1) % rows) * cols + c,
+                        r * cols + (c - 1) % cols,
+                        r * cols + (c + 1) % cols,
+                    )
+                )
+    else:
+        raise ValueError(f"Unknown bundle_coupling.graph.kind {kind!r}")
+    for i in range(N):
+        nbrs[i].discard(i)
+    return _from_neighbour_sets(nbrs)
+
+
+def build_graph(graph_cfg: GraphConfig, N: int) -> ThreadGraph:
+    """Return the (cached) thread graph of an N-thread bundle."""
+    return _build_graph(
+        graph_cfg.kind, int(graph_cfg.neighbours), float(graph_cfg.mean_degree), int(graph_cfg.seed), int(N)
+    )
+
+
+def neighbourhood_sums(graph: ThreadGraph, v: np.ndarray) -> np.ndarray:
+    """Sum of v over each thread's closed neighbourhood, same shape as v.
+
+    v may carry any leading batch axes, e.g. (L, n_ens, N). Every
+    neighbourhood contains the thread itself, so no CSR row is empty.
+    """
+    return np.add.reduceat(v[..., graph.indices], graph.indptr[:-1], axis=-1)
@@ -0,0 +1,303 @@
+"""Low-overhead run instrumentation for bcqm_bundles.
+
+StageTimer accumulates wall and CPU time per named stage plus integer
+counters. Stages are timed at ensemble-member granularity or coarser, so
+the bookkeeping is negligible next to the simulation itself.
+
+profile_call runs one callable under cProfile and tracemalloc and dumps
+both to disk; it is used for the hottest pair of a run when profiling is
+requested.
+
+Heartbeat appends throttled progress records (unit, member, steps done,
+steps/s, ETA, RSS) to <output_dir>/progress.jsonl while a unit runs;
+summarise_progress and format_progress turn such a file back into the
+overview printed by `cli status`.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+PROGRESS_FILE = "progress.jsonl"
+
+# Step loops offer progress to a Heartbeat every this many steps; the
+# Heartbeat itself writes at most once per interval.
+HEARTBEAT_STRIDE = 1024
+
+try:
+    import resource  # not available on Windows
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (nan if unknown)."""
+    if resource is None:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    if sys.platform == "darwin":
+        return rss / 2**20
+    return rss / 2**10
+
+
+def current_rss_mb() -> float:
+    """Current resident set size of this process in MB (peak RSS if unknown)."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss_mb()
+
+
+class StageTimer:
+    """Accumulate wall/CPU time per stage and integer counters."""
+
+    def __init__(self) -> None:
+        self.wall: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def add(self, name: str, wall: float, cpu: float) -> None:
+        """Add a measured interval to stage *name*."""
+        self.wall[name] = self.wall.get(name, 0.0) + wall
+        self.cpu[name] = self.cpu.get(name, 0.0) + cpu
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the body of a with-block as stage *name*."""
+        w0 = time.perf_counter()
+        c0 = time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - w0, time.process_time() - c0)
+
+    def count(self, name: str, n: int) -> None:
+        """Increase counter *name* by n."""
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def merge(self, other: "StageTimer") -> None:
+        """Add all stages and counters of *other* into this timer."""
+        for name in other.wall:
+            self.add(name, other.wall[name], other.cpu[name])
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable view of the stages and counters."""
+        return {
+            "stages": {
+                name: {"wall_s": self.wall[name], "cpu_s": self.cpu[name]}
+                for name in self.wall
+            },
+            "counters": dict(self.counters),
+        }
+
+
+def profile_call(fn: Callable[[], Any], out_dir: str, tag: str) -> Any:
+    """Call fn() under cProfile and tracemalloc and dump both to out_dir.
+
+    Writes <tag>.prof (cProfile stats, readable with pstats or snakeviz),
+    <tag>.tracemalloc (a tracemalloc snapshot) and <tag>_tracemalloc_top.txt
+    (the 25 largest allocation sites). Returns fn's result.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        result = profiler.runcall(fn)
+        snapshot = tracemalloc.take_snapshot()
+        traced_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    profiler.dump_stats(os.path.join(out_dir, f"{tag}.prof"))
+    snapshot.dump(os.path.join(out_dir, f"{tag}.tracemalloc"))
+    with open(os.path.join(out_dir, f"{tag}_tracemalloc_top.txt"), "w", encoding="utf-8") as fh:
+        fh.write(f"traced peak: {traced_peak / 2**20:.1f} MB\n")
+        for stat in snapshot.statistics("lineno")[:25]:
+            fh.write(f"{stat}\n")
+    return result
+
+
+def append_progress(paths: Sequence[str], record: Dict[str, Any]) -> None:
+    """Append one JSON record to each progress file in *paths*.
+
+    Each record is a single short write in append mode, so records from
+    several worker processes do not interleave within a line.
+    """
+    line = json.dumps(record) + "\n"
+    for path in paths:
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+
+class Heartbeat:
+    """Throttled progress records for one simulation unit.
+
+    Progress is counted in member steps (ensemble members x steps), with
+    total_steps for the whole unit; threads (bundle size x lambda
+    replicas) converts them into thread steps so that status can compare
+    units of different sizes. update() only looks at the clock, and
+    writes a "progress" record once interval_s has passed since the last
+    one; interval_s <= 0 leaves only the "start" and "done" records.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        unit: str,
+        total_steps: int,
+        n_members: int,
+        threads: int,
+        interval_s: float = 10.0,
+    ) -> None:
+        self.paths = list(paths)
+        self.unit = unit
+        self.total_steps = int(total_steps)
+        self.n_members = int(n_members)
+        self.threads = int(threads)
+        self.interval_s = interval_s
+        self.member = 0
+        self.steps_done = 0
+        self._base = 0
+        self._scale = 1
+        self._t0 = time.perf_counter()
+        self._next = self._t0 + interval_s if interval_s > 0 else float("inf")
+
+    def begin(self, member: int, base: int, scale: int = 1) -> None:
+        """Start counting from *base* steps; update(t) then means base + scale * t."""
+        self.member = member
+        self._base = base
+        self._scale = scale
+        self.update(0)
+
+    def update(self, t: int) -> None:
+        """Note progress t (in the units set by begin); write if due."""
+        self.steps_done = self._base + self._scale * t
+        now = time.perf_counter()
+        if now >= self._next:
+            self.emit("progress", now)
+            self._next = now + self.interval_s
+
+    def finish(self) -> None:
+        """Write the unit's "done" record."""
+        self.member = self.n_members - 1
+        self.steps_done = self.total_steps
+        self.emit("done")
+
+    def emit(self, event: str, now: Optional[float] = None) -> None:
+        """Write a record for *event* ("start", "progress" or "done")."""
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._t0
+        rate = self.steps_done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total_steps - self.steps_done
+        append_progress(
+            self.paths,
+            {
+                "event": event,
+                "time": time.time(),
+                "pid": os.getpid(),
+                "unit": self.unit,
+                "member": self.member,
+                "n_members": self.n_members,
+                "steps_done": self.steps_done,
+                "total_steps": self.total_steps,
+                "threads": self.threads,
+                "elapsed_s": elapsed,
+                "steps_per_s": rate,
+                "eta_s": remaining / rate if rate > 0 else None,
+                "rss_MB": current_rss_mb(),
+            },
+        )
+
+
+def read_progress(path: str) -> List[Dict[str, Any]]:
+    """Records of a progress.jsonl file; a partly written last line is skipped."""
+    records = []
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def summarise_progress(records: Sequence[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+    """Latest state of every unit in a progress stream, plus run totals.
+
+    A unit is "pending" after its "queued" record, "running" after "start"
+    or "progress" and "done" after "done". The run ETA assumes the running
+    workers keep their current thread-step rates for the remaining work,
+    pending units included.
+    """
+    now = time.time() if now is None else now
+    latest: Dict[str, Dict[str, Any]] = {}
+    for rec in records:
+        latest[rec["unit"]] = rec
+    states = {"queued": "pending", "start": "running", "progress": "running", "done": "done"}
+
+    units = []
+    remaining_work = 0.0
+    rate = 0.0
+    for unit, rec in latest.items():
+        state = states.get(rec["event"], rec["event"])
+        units.append(dict(rec, state=state, age_s=now - rec["time"]))
+        if state != "done":
+            remaining_work += (rec["total_steps"] - rec.get("steps_done", 0)) * rec["threads"]
+        if state == "running":
+            rate += rec.get("steps_per_s", 0.0) * rec["threads"]
+    counts = {state: sum(u["state"] == state for u in units) for state in ("done", "running", "pending")}
+    return {
+        "units": units,
+        "counts": counts,
+        "n_units": len(units),
+        "workers": len({u["pid"] for u in units if u["state"] == "running"}),
+        "thread_steps_per_s": rate,
+        "eta_s": remaining_work / rate if rate > 0 else None,
+    }
+
+
+def _fmt_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    seconds = int(round(seconds))
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}h{m:02d}m" if h else (f"{m}m{s:02d}s" if m else f"{s}s")
+
+
+def format_progress(summary: Dict[str, Any]) -> str:
+    """Plain-text view of summarise_progress output."""
+    c = summary["counts"]
+    lines = [
+        f"{c['done']}/{summary['n_units']} units done, {c['running']} running "
+        f"on {summary['workers']} workers, {c['pending']} pending; "
+        f"{summary['thread_steps_per_s']:.3g} thread steps/s, ETA {_fmt_duration(summary['eta_s'])}"
+    ]
+    for u in summary["units"]:
+        if u["state"] == "pending":
+            continue
+        line = (
+            f"  {u['unit']:<12} {u['state']:<8} member {min(u['member'] + 1, u['n_members'])}/{u['n_members']}"
+            f"  {u['steps_done']}/{u['total_steps']} steps  {u['steps_per_s']:.3g} steps/s"
+        )
+        if u["state"] == "running":
+            line += (
+                f"  ETA {_fmt_duration(u['eta_s'])}  RSS {u['rss_MB']:.0f} MB"
+                f"  pid {u['pid']}  updated {_fmt_duration(u['age_s'])} ago"
+            )
+        else:
+            line += f"  {_fmt_duration(u['elapsed_s'])}"
+        lines.append(line)
+    return "\n".join(lines)
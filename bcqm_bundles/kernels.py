@@ -1,17 +1,35 @@
 """Kernel implementations: soft-rudder threads and bundle coupling.
 
 This module implements:
-  * single-thread soft-rudder updates with slip law q(W_coh),
-  * bundle-level coupling modes: independent, shared_bias, strong_lock (test).
+  * single-thread soft-rudder updates with slip law q(W_coh), optionally
+    with per-thread heterogeneous slip parameters (sample_thread_slip),
+  * bundle-level coupling modes: independent, shared_bias, strong_lock (test),
+  * the local mode, where each thread's stay law sees the alignment of its
+    neighbourhood on a thread graph (see graphs.py).
+
+Bundle states may carry a leading replica axis, shape (L, N), with one
+row per coupling strength lambda. All replicas are advanced from the same
+uniform draws (common random numbers), so lambda-to-lambda differences
+are not swamped by independent sampling noise.
+
+Coupling modes are plug-ins: a mode registers a vectorized *stay law*
+p_eff = law(p_stay_base, S_v, lam) with register_coupling_mode. The
+simulation hot loop never looks at mode names; it uses a KernelPlan built
+once per (W_coh, N) pair, whose p_stay table is indexed by the integer
+alignment count (number of threads with v = +1). Mode "local" is not a
+stay law itself: it applies bundle_coupling.local_law per thread, with the
+table also indexed by the thread's closed degree, and steps all ensemble
+members together (step_local_in_place).
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Callable, Dict, Optional, Tuple, Union
 import numpy as np
 
 from .config_schemas import KernelConfig, BundleCouplingConfig
+from .graphs import ThreadGraph, build_graph, neighbourhood_sums
 
 
 @dataclass
@@ -21,9 +39,9 @@ class BundleState:
     Attributes
     ----------
     x : np.ndarray
-        Positions of threads, shape (N,).
+        Positions of threads, shape (N,) or (L, N) for lambda replicas.
     v : np.ndarray
-        Direction states of threads, each in {+1, -1}, shape (N,).
+        Direction states of threads, each in {+1, -1}, same shape as x.
     """
     x: np.ndarray
     v: np.ndarray
@@ -48,11 +66,116 @@ def slip_probability(W_coh: float, kernel_cfg: KernelConfig) -> float:
     return float(np.clip(q, 0.0, 1.0))
 
 
+def sample_thread_slip(
+    W_coh: float,
+    kernel_cfg: KernelConfig,
+    shape,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Draw per-thread slip probabilities for a heterogeneous slip law.
+
+    slip_law.heterogeneity selects the parameter that varies from thread to
+    thread ("k_prefactor" or the thread's own coherence horizon "W_coh");
+    each thread's value is the common one times a factor exp(spread * z)
+    ("lognormal") or 1 + spread * U(-1, 1) ("uniform").
+
+    Returns (q, values), both of the given shape: the clipped slip
+    probabilities k_i / W_i^alpha and the sampled parameter values.
+    """
+    slip = kernel_cfg.slip_law
+    het = slip.heterogeneity
+    if slip.form != "power_law":
+        raise ValueError(f"Unsupported slip law form: {slip.form!r}")
+    if W_coh <= 0:
+        raise ValueError("W_coh must be positive")
+
+    if het.distribution == "lognormal":
+        factor = np.exp(het.spread * rng.standard_normal(shape))
+    elif het.distribution == "uniform":
+        factor = 1.0 + het.spread * rng.uniform(-1.0, 1.0, size=shape)
+    else:
+        raise ValueError(f"Unknown slip heterogeneity distribution {het.distribution!r}")
+
+    if het.parameter == "k_prefactor":
+        values = slip.k_prefactor * factor
+        q = values / (W_coh ** slip.alpha)
+    elif het.parameter == "W_coh":
+        values = W_coh * factor
+        q = slip.k_prefactor / (values ** slip.alpha)
+    else:
+        raise ValueError(f"Slip heterogeneity parameter {het.parameter!r} has no per-thread values")
+    return np.clip(q, 0.0, 1.0), values
+
+
+StayLaw = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+COUPLING_MODES: Dict[str, StayLaw] = {}
+
+
+def register_coupling_mode(name: str) -> Callable[[StayLaw], StayLaw]:
+    """Decorator registering a stay law under bundle_coupling.mode *name*.
+
+    A stay law maps (p_stay_base, S_v, lam) to the effective stay
+    probability. It must be a pure broadcasting expression: it is called
+    once per pair with the whole S_v grid to build the lookup table.
+    Results are clipped to [0, 1] by the caller.
+    """
+    def decorator(law: StayLaw) -> StayLaw:
+        COUPLING_MODES[name] = law
+        return law
+    return decorator
+
+
+def get_stay_law(mode: str) -> StayLaw:
+    """Return the registered stay law for *mode*."""
+    try:
+        return COUPLING_MODES[mode]
+    except KeyError:
+        raise ValueError(f"Unknown bundle_coupling mode {mode!r}") from None
+
+
+@register_coupling_mode("independent")
+def _stay_independent(p_stay_base, S_v, lam):
+    # No coupling: broadcast the base stay probability (read-only view).
+    return np.broadcast_to(p_stay_base, np.broadcast(p_stay_base, S_v, lam).shape)
+
+
+@register_coupling_mode("shared_bias")
+def _stay_shared_bias(p_stay_base, S_v, lam):
+    # Phenomenological interpolation: alignment increases stay probability.
+    return p_stay_base + lam * S_v * (1.0 - p_stay_base)
+
+
+@register_coupling_mode("strong_lock")
+def _stay_strong_lock(p_stay_base, S_v, lam):
+    # Extreme stabilisation test: more aggressive enhancement.
+    # This is not meant as a physical BCQM kernel, only as a limit case.
+    return p_stay_base + lam * (S_v ** 2) * (1.0 - p_stay_base)
+
+
+def _resolve_stay_law(coupling_cfg: BundleCouplingConfig, N: int) -> StayLaw:
+    """Stay law for an N-thread bundle; a single thread is never coupled."""
+    if N == 1:
+        return COUPLING_MODES["independent"]
+    if coupling_cfg.mode == "local":
+        return get_stay_law(coupling_cfg.local_law)
+    return get_stay_law(coupling_cfg.mode)
+
+
+def _lambda_column(coupling_cfg: BundleCouplingConfig) -> np.ndarray:
+    """coupling_strength as a scalar array or an (L, 1) column of replicas."""
+    lam = np.asarray(coupling_cfg.coupling_strength, dtype=float)
+    if lam.ndim == 1:
+        lam = lam[:, None]  # one row per lambda replica
+    return lam
+
+
 def effective_stay_probability(
     W_coh: float,
     state: BundleState,
     kernel_cfg: KernelConfig,
     coupling_cfg: BundleCouplingConfig,
+    q_threads: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """Compute effective stay probabilities for each thread.
 
@@ -66,37 +189,34 @@ def effective_stay_probability(
         Kernel parameters, including base slip law.
     coupling_cfg : BundleCouplingConfig
         Bundle coupling parameters (mode, coupling_strength).
+    q_threads : np.ndarray, optional
+        Per-thread slip probabilities, shape (N,), replacing q(W_coh) for a
+        heterogeneous slip law (see sample_thread_slip).
 
     Returns
     -------
     p_stay_eff : np.ndarray
-        Effective stay probabilities per thread, shape (N,).
+        Effective stay probabilities per thread, same shape as state.v.
+        If coupling_strength is a list, state.v must have shape (L, N)
+        with one row per lambda value.
     """
-    N = state.v.size
-    q_base = slip_probability(W_coh, kernel_cfg)
+    shape = state.v.shape
+    N = shape[-1]
+    q_base = slip_probability(W_coh, kernel_cfg) if q_threads is None else q_threads
     p_stay_base = 1.0 - q_base
 
-    mode = coupling_cfg.mode
-    lam = coupling_cfg.coupling_strength
-
-    if mode == "independent" or N == 1:
-        return np.full(N, p_stay_base, dtype=float)
+    law = _resolve_stay_law(coupling_cfg, N)
+    lam = _lambda_column(coupling_cfg)
 
-    # Direction alignment indicator S_v
-    S_v = float(abs(state.v.mean()))  # in [0, 1]
-
-    if mode == "shared_bias":
-        # Phenomenological interpolation: alignment increases stay probability.
-        p_eff = p_stay_base + lam * S_v * (1.0 - p_stay_base)
-        return np.full(N, float(np.clip(p_eff, 0.0, 1.0)), dtype=float)
-
-    if mode == "strong_lock":
-        # Extreme stabilisation test: more aggressive enhancement.
-        # This is not meant as a physical BCQM kernel, only as a limit case.
-        p_eff = p_stay_base + lam * (S_v ** 2) * (1.0 - p_stay_base)
-        return np.full(N, float(np.clip(p_eff, 0.0, 1.0)), dtype=float)
-
-    raise ValueError(f"Unknown bundle_coupling mode {mode!r}")
+    if coupling_cfg.mode == "local" and N > 1:
+        # Alignment of each thread's closed neighbourhood, in [0, 1]
+        graph = build_graph(coupling_cfg.graph, N)
+        S_v = np.abs(neighbourhood_sums(graph, state.v)) / graph.degree
+    else:
+        # Direction alignment indicator S_v, one value per replica, in [0, 1]
+        S_v = np.abs(state.v.mean(axis=-1, keepdims=True))
+    p_eff = np.clip(law(p_stay_base, S_v, lam), 0.0, 1.0)
+    return np.broadcast_to(p_eff, shape).astype(float)
 
 
 def step_soft_rudder_bundle(
@@ -105,15 +225,18 @@ def step_soft_rudder_bundle(
     kernel_cfg: KernelConfig,
     coupling_cfg: BundleCouplingConfig,
     rng: np.random.Generator,
-) -> Tuple[BundleState, int]:
+    q_threads: Optional[np.ndarray] = None,
+) -> Tuple[BundleState, Union[int, np.ndarray]]:
     """Advance a bundle state by one step.
 
-    Returns the new state and the number of threads that flipped.
+    Returns the new state and the number of threads that flipped (an int,
+    or an array of shape (L,) for lambda replicas).
 
     The position increment per step is v (step_size absorbed into units).
+    Replicas share one draw of N uniforms per step.
     """
-    N = state.v.size
-    p_stay_eff = effective_stay_probability(W_coh, state, kernel_cfg, coupling_cfg)
+    N = state.v.shape[-1]
+    p_stay_eff = effective_stay_probability(W_coh, state, kernel_cfg, coupling_cfg, q_threads)
     # Draw uniform random numbers to decide flips
     u = rng.random(size=N)
     stay_mask = u < p_stay_eff
@@ -124,5 +247,178 @@ def step_soft_rudder_bundle(
     x_new = state.x + v_new  # unit step size
 
     new_state = BundleState(x=x_new, v=v_new)
-    n_flips = int(flip_mask.sum())
+    if flip_mask.ndim == 1:
+        n_flips: Union[int, np.ndarray] = int(flip_mask.sum())
+    else:
+        n_flips = flip_mask.sum(axis=-1)
     return new_state, n_flips
+
+
+@dataclass
+class KernelPlan:
+    """Precomputed stepping data for one (W_coh, N) pair.
+
+    Attributes
+    ----------
+    W_coh : float
+        Coherence horizon the plan was built for.
+    N : int
+        Bundle size.
+    q : float
+        Base slip probability q(W_coh).
+    p_stay_table : np.ndarray
+        Effective stay probability, shape (L, N + 1), indexed by replica and
+        by the number of threads with v = +1. For the local mode the shape
+        is (L, D + 1, D + 1), indexed by replica, closed degree and the
+        number of neighbourhood threads with v = +1 (D the largest degree).
+    u : np.ndarray
+        Preallocated buffer for the per-step uniforms, shape (N,), or
+        (members, N) for the local mode.
+    flip : np.ndarray
+        Preallocated flip mask of the last step, shape (L, N), or
+        (L, members, N) for the local mode.
+    rows : np.ndarray
+        Replica row indices 0..L-1 used for the table lookup.
+    graph : ThreadGraph or None
+        Thread graph of the local mode; None for the global modes.
+    law, lam : StayLaw, np.ndarray
+        The resolved stay law and lambda column, for heterogeneous slip.
+    p_stay_base : np.ndarray or None
+        Per-thread base stay probabilities 1 - q_i of the current member,
+        shape (N,) (or (members, N) for the local mode), set with
+        set_thread_slip; None when all threads share q(W_coh) and the
+        table is used.
+    """
+    W_coh: float
+    N: int
+    q: float
+    p_stay_table: np.ndarray
+    u: np.ndarray
+    flip: np.ndarray
+    rows: np.ndarray
+    graph: Optional[ThreadGraph] = None
+    law: Optional[StayLaw] = None
+    lam: Optional[np.ndarray] = None
+    p_stay_base: Optional[np.ndarray] = None
+
+
+def build_kernel_plan(
+    W_coh: float,
+    N: int,
+    kernel_cfg: KernelConfig,
+    coupling_cfg: BundleCouplingConfig,
+    members: int = 1,
+) -> KernelPlan:
+    """Build the KernelPlan for a (W_coh, N) pair.
+
+    The slip law and the coupling mode are resolved here, once, and the
+    registered stay law is evaluated on the full grid of alignment values
+    S_v = |2 m - N| / N, m = 0..N. For the local mode (N > 1) the thread
+    graph is fetched from the cache and the table covers S = |2 m - d| / d
+    for every closed degree d; its buffers are sized for *members*
+    ensemble members stepped together.
+    """
+    q = slip_probability(W_coh, kernel_cfg)
+    p_stay_base = 1.0 - q
+
+    law = _resolve_stay_law(coupling_cfg, N)
+    lam = _lambda_column(coupling_cfg)
+    L = lam.shape[0] if lam.ndim == 2 else 1
+
+    if coupling_cfg.mode == "local" and N > 1:
+        graph = build_graph(coupling_cfg.graph, N)
+        D = int(graph.degree.max())
+        d = np.maximum(np.arange(D + 1), 1)[:, None]
+        m = np.arange(D + 1)[None, :]
+        # Entries with m > d are never looked up.
+        S = np.minimum(np.abs(2 * m - d) / d, 1.0)
+        table = np.clip(law(p_stay_base, S, lam[..., None]), 0.0, 1.0)
+        table = np.ascontiguousarray(np.broadcast_to(table, (L, D + 1, D + 1)), dtype=float)
+        return KernelPlan(
+            W_coh=W_coh,
+            N=N,
+            q=q,
+            p_stay_table=table,
+            u=np.empty((members, N), dtype=float),
+            flip=np.empty((L, members, N), dtype=bool),
+            rows=np.arange(L),
+            graph=graph,
+            law=law,
+            lam=lam,
+        )
+
+    m = np.arange(N + 1)
+    S_v = np.abs(2 * m - N) / N
+    table = np.clip(law(p_stay_base, S_v, lam), 0.0, 1.0)
+    table = np.ascontiguousarray(np.broadcast_to(table, (L, N + 1)), dtype=float)
+
+    return KernelPlan(
+        W_coh=W_coh,
+        N=N,
+        q=q,
+        p_stay_table=table,
+        u=np.empty(N, dtype=float),
+        flip=np.empty((L, N), dtype=bool),
+        rows=np.arange(L),
+        law=law,
+        lam=lam,
+    )
+
+
+def set_thread_slip(plan: KernelPlan, q_threads: np.ndarray) -> None:
+    """Switch a plan to per-thread slip probabilities q_threads.
+
+    Subsequent steps evaluate the stay law on the base stay probabilities
+    1 - q_i (one vectorized expression per step) instead of the table.
+    """
+    plan.p_stay_base = 1.0 - np.asarray(q_threads, dtype=float)
+
+
+def step_in_place(plan: KernelPlan, state: BundleState, rng: np.random.Generator) -> np.ndarray:
+    """Advance a bundle state (shape (L, N)) by one step, in place.
+
+    Draws the same N uniforms per step as step_soft_rudder_bundle and
+    leaves the flip mask in plan.flip. Returns the number of flipped
+    threads per replica, shape (L,).
+    """
+    N = plan.N
+    if plan.p_stay_base is None:
+        n_up = (state.v.sum(axis=-1) + N) // 2
+        p_stay = plan.p_stay_table[plan.rows, n_up][:, None]
+    else:
+        S_v = np.abs(state.v.sum(axis=-1, keepdims=True)) / N
+        p_stay = np.clip(plan.law(plan.p_stay_base, S_v, plan.lam), 0.0, 1.0)
+
+    rng.random(out=plan.u)
+    # Thread flips unless u < p_stay.
+    np.greater_equal(plan.u, p_stay, out=plan.flip)
+    np.negative(state.v, out=state.v, where=plan.flip)
+    state.x += state.v  # unit step size
+    return plan.flip.sum(axis=-1)
+
+
+def step_local_in_place(plan: KernelPlan, state: BundleState, rng: np.random.Generator) -> np.ndarray:
+    """Advance a batch of locally coupled bundles by one step, in place.
+
+    state has shape (L, members, N): every ensemble member of the plan is
+    stepped at once, with one draw of (members, N) uniforms shared by the
+    lambda replicas. Each thread's stay probability is looked up from its
+    closed degree and the number of +1 threads in its neighbourhood, found
+    with one CSR product over the thread graph (or, with per-thread slip,
+    evaluated from the stay law on the neighbourhood alignment). Leaves the flip mask in
+    plan.flip and returns the number of flipped threads, shape (L, members).
+    """
+    graph = plan.graph
+    sums = neighbourhood_sums(graph, state.v)
+    if plan.p_stay_base is None:
+        n_up = (sums + graph.degree) // 2
+        p_stay = plan.p_stay_table[plan.rows[:, None, None], graph.degree, n_up]
+    else:
+        S = np.abs(sums) / graph.degree
+        p_stay = np.clip(plan.law(plan.p_stay_base, S, plan.lam[..., None]), 0.0, 1.0)
+
+    rng.random(out=plan.u)
+    np.greater_equal(plan.u, p_stay, out=plan.flip)
+    np.negative(state.v, out=state.v, where=plan.flip)
+    state.x += state.v  # unit step size
+    return plan.flip.sum(axis=-1)
@@ -7,29 +7,147 @@ All laws here must be dimensionless and may only depend on:
   * a small set of dimensionless parameters.
 
 No hbar, physical energies, or exp(-i E dt / hbar) are allowed here.
+
+Phase laws are registered with register_phase_law. Since no law feeds back
+into the thread directions, simulate.py evolves the phases after stepping,
+in one batch over all ensemble members and replicas (run_phase_engine),
+driven by the recorded S_v series. Laws that shift every phase of a bundle
+by the same amount leave S_theta unchanged; they are registered with
+invariant_order_parameter=True and the engine then never advances them.
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Callable, Dict, Optional
 import numpy as np
 
-from .config_schemas import PhaseDynamicsConfig
+from .config_schemas import PhaseDynamicsConfig, PhaseDynamicsParams
 from .kernels import BundleState
 
+TWO_PI = 2.0 * np.pi
+
 
 @dataclass
 class PhaseState:
     """Phase state for a bundle.
 
-    theta has shape (N,) with values in [0, 2π).
+    theta has shape (N,) with values in [0, 2π), or (..., N) for batches
+    of bundles (lambda replicas, ensemble members). omega holds per-thread
+    natural frequencies for laws that use them, same shape as theta.
     """
     theta: np.ndarray
+    omega: Optional[np.ndarray] = None
+
+
+# step(theta, omega, S_v, f_W, params) advances theta in place by one step
+# and returns S_theta of the phases it started from (interacting laws need
+# the order parameter anyway, so the engine never computes it twice).
+# S_v has theta's shape minus the thread axis.
+PhaseStep = Callable[
+    [np.ndarray, Optional[np.ndarray], np.ndarray, float, PhaseDynamicsParams],
+    np.ndarray,
+]
+
+
+@dataclass(frozen=True)
+class PhaseLaw:
+    step: PhaseStep
+    invariant_order_parameter: bool = False  # S_theta constant in time
+    natural_frequencies: bool = False  # needs PhaseState.omega
+
+
+PHASE_LAWS: Dict[str, PhaseLaw] = {}
+
 
+def register_phase_law(
+    name: str,
+    invariant_order_parameter: bool = False,
+    natural_frequencies: bool = False,
+) -> Callable[[PhaseStep], PhaseStep]:
+    """Decorator registering an in-place phase step under phase_dynamics.law *name*.
 
-def bundle_alignment_v(state: BundleState) -> float:
-    """Return direction alignment S_v in [0, 1]."""
-    return float(abs(state.v.mean()))
+    Set invariant_order_parameter when the law moves all phases of a bundle
+    by a common shift, so |<exp(iθ)>| never changes; set natural_frequencies
+    when the step reads per-thread frequencies omega.
+    """
+    def decorator(step: PhaseStep) -> PhaseStep:
+        PHASE_LAWS[name] = PhaseLaw(step, invariant_order_parameter, natural_frequencies)
+        return step
+    return decorator
+
+
+def get_phase_law(name: str) -> PhaseLaw:
+    """Return the registered phase law *name*."""
+    try:
+        return PHASE_LAWS[name]
+    except KeyError:
+        raise ValueError(f"Unknown phase dynamics law {name!r}") from None
+
+
+def wcoh_factor(params: PhaseDynamicsParams, W_coh: float) -> float:
+    """Rate scaling f_W(W_coh) selected by params.wcoh_scaling."""
+    if params.wcoh_scaling == "none":
+        return 1.0
+    if params.wcoh_scaling == "inverse":
+        return 1.0 / W_coh
+    if params.wcoh_scaling == "sqrt_inverse":
+        return 1.0 / (W_coh ** 0.5)
+    raise ValueError(f"Unknown wcoh_scaling {params.wcoh_scaling!r}")
+
+
+def order_parameter(theta: np.ndarray) -> np.ndarray:
+    """Phase alignment S_theta = |<exp(iθ)>| over the last axis."""
+    return np.hypot(np.cos(theta).mean(axis=-1), np.sin(theta).mean(axis=-1))
+
+
+@register_phase_law("bundle_stability_v0", invariant_order_parameter=True)
+def _step_bundle_stability_v0(theta, omega, S_v, f_W, params):
+    # Simple example: Δθ = ω0 * f_W(W_coh) * (1 + λ_stab S_v), common to all threads
+    S_theta = order_parameter(theta)
+    delta_theta = params.base_rate * f_W * (1.0 + params.stability_weight * S_v)
+    theta += np.expand_dims(delta_theta, -1)
+    np.remainder(theta, TWO_PI, out=theta)
+    return S_theta
+
+
+@register_phase_law("mean_field_kuramoto", natural_frequencies=True)
+def _step_mean_field_kuramoto(theta, omega, S_v, f_W, params):
+    # Δθ_i = f_W * (ω_i + K_eff R sin(ψ - θ_i)), with R e^{iψ} = <e^{iθ}> and
+    # K_eff = coupling * (1 + λ_stab S_v). The mean field makes this O(N).
+    c = np.cos(theta)
+    s = np.sin(theta)
+    Zr = c.mean(axis=-1, keepdims=True)
+    Zi = s.mean(axis=-1, keepdims=True)
+    R = np.hypot(Zr, Zi)[..., 0]
+    K_eff = params.coupling * (1.0 + params.stability_weight * np.expand_dims(S_v, -1))
+    # R sin(ψ - θ_i) = Im(Z e^{-iθ_i}) = Zi cos θ_i - Zr sin θ_i
+    c *= Zi
+    s *= Zr
+    c -= s
+    c *= K_eff
+    c += omega
+    c *= f_W
+    theta += c
+    np.remainder(theta, TWO_PI, out=theta)
+    return R
+
+
+def init_natural_frequencies(
+    shape, params: PhaseDynamicsParams, rng: np.random.Generator
+) -> np.ndarray:
+    """Per-thread natural frequencies ω_i ~ Normal(base_rate, freq_spread)."""
+    return rng.normal(params.base_rate, params.freq_spread, size=shape)
+
+
+def bundle_alignment_v(state: BundleState):
+    """Return direction alignment S_v in [0, 1].
+
+    A float for a single bundle, or an array of shape (L,) for replicas.
+    """
+    if state.v.ndim == 1:
+        return float(abs(state.v.mean()))
+    return np.abs(state.v.mean(axis=-1))
 
 
 def update_phases(
@@ -40,29 +158,54 @@ def update_phases(
 ) -> PhaseState:
     """Update phases for one step according to the chosen law.
 
-    If cfg.enabled is False, phases are left unchanged.
+    Reference single-step form of run_phase_engine; returns a new
+    PhaseState. If cfg.enabled is False, phases are left unchanged.
     """
-    theta = phase_state.theta
     if not cfg.enabled:
         return phase_state
+    law = get_phase_law(cfg.law)
+    if law.natural_frequencies and phase_state.omega is None:
+        raise ValueError(f"Phase law {cfg.law!r} needs natural frequencies (PhaseState.omega)")
+    theta = phase_state.theta.astype(float, copy=True)
+    S_v = np.asarray(bundle_alignment_v(bundle_state))
+    law.step(theta, phase_state.omega, S_v, wcoh_factor(cfg.params, W_coh), cfg.params)
+    return PhaseState(theta=theta, omega=phase_state.omega)
 
-    law = cfg.law
-    params = cfg.params
-    S_v = bundle_alignment_v(bundle_state)
-
-    if law == "bundle_stability_v0":
-        # Simple example: Δθ = ω0 * f_W(W_coh) * (1 + λ_stab S_v)
-        if params.wcoh_scaling == "none":
-            f_W = 1.0
-        elif params.wcoh_scaling == "inverse":
-            f_W = 1.0 / W_coh
-        elif params.wcoh_scaling == "sqrt_inverse":
-            f_W = 1.0 / (W_coh ** 0.5)
-        else:
-            raise ValueError(f"Unknown wcoh_scaling {params.wcoh_scaling!r}")
-
-        delta_theta = params.base_rate * f_W * (1.0 + params.stability_weight * S_v)
-        theta_new = (theta + delta_theta) % (2.0 * np.pi)
-        return PhaseState(theta=theta_new)
-
-    raise ValueError(f"Unknown phase dynamics law {law!r}")
+
+def run_phase_engine(
+    phase_state: PhaseState,
+    S_v_after: np.ndarray,
+    W_coh: float,
+    cfg: PhaseDynamicsConfig,
+) -> np.ndarray:
+    """Evolve a batch of bundle phases in place and record S_theta.
+
+    Parameters
+    ----------
+    phase_state : PhaseState
+        theta (and omega) of shape (..., N), e.g. (L, n_ens, N); theta is
+        advanced in place.
+    S_v_after : np.ndarray
+        Shape (..., steps - 1): S_v after each step that is followed by a
+        recorded step, i.e. the S_v series recorded at t = 1..steps-1.
+    W_coh : float
+    cfg : PhaseDynamicsConfig
+
+    Returns
+    -------
+    S_theta : np.ndarray
+        Shape (..., steps): phase alignment before each step.
+    """
+    law = get_phase_law(cfg.law)
+    theta = phase_state.theta
+    steps = S_v_after.shape[-1] + 1
+    S_theta = np.empty(theta.shape[:-1] + (steps,), dtype=float)
+    if law.invariant_order_parameter:
+        S_theta[...] = order_parameter(theta)[..., None]
+        return S_theta
+
+    f_W = wcoh_factor(cfg.params, W_coh)
+    for t in range(steps - 1):
+        S_theta[..., t] = law.step(theta, phase_state.omega, S_v_after[..., t], f_W, cfg.params)
+    S_theta[..., steps - 1] = order_parameter(theta)
+    return S_theta
@@ -0,0 +1,433 @@
+"""Dry-run planner: predicted runtime, memory and disk use of a config.
+
+For every simulation unit of a config (one (W_coh, N) pair, or one W_coh
+with nested bundle sizes) the planner reports the step counts, the peak
+size of the in-memory result arrays, the expected compressed npz size and
+a runtime estimate, and warns when a unit will not fit in memory or the run
+will not fit on disk.
+
+Runtime is modelled as a cost per member-step that grows linearly with the
+bundle size, t = a + b * N, fitted to the timing records of earlier runs
+(metadata.json "timing", written by simulate.run_all) that used the same
+backend, engine and phase-dynamics setting. Without such records a short
+micro-benchmark of the config itself is used instead.
+
+A config with sweep axes is planned point by point; unit keys are then
+prefixed with the sweep point ID.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from glob import glob
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config_schemas import TopLevelConfig, coupling_strengths
+from .pyramid import write_pyramid
+from .sweep import sweep_points
+from .simulate import (
+    has_slip_heterogeneity,
+    resolve_backend,
+    resolve_engine,
+    run_ensemble_for_sizes,
+    simulation_units,
+)
+
+# Compressed / raw size of timeseries.npz when no earlier run is available.
+# Observed ratios range from ~0.01 (N=1) to ~0.07 (N=32); stay conservative.
+DEFAULT_NPZ_RATIO = 0.1
+DEFAULT_WRITE_MB_PER_S = 30.0
+MICROBENCH_STEPS = 2000
+
+
+@dataclass
+class UnitPlan:
+    W_coh: float
+    bundle_sizes: List[int]
+    steps: int
+    member_steps: int
+    thread_steps: int
+    memory_bytes: int
+    npz_bytes: int
+    runtime_s: float
+    point_id: str = ""
+
+    @property
+    def key(self) -> str:
+        unit = f"W{int(self.W_coh)}_N{max(self.bundle_sizes)}"
+        return f"{self.point_id}/{unit}" if self.point_id else unit
+
+
+@dataclass
+class CostModel:
+    """Cost per member-step a + b * N (seconds) plus write throughput."""
+    a: float
+    b: float
+    write_MB_per_s: float
+    npz_ratio: float
+    source: str
+
+    def step_cost(self, N: int) -> float:
+        return max(self.a + self.b * N, 0.0)
+
+
+def unit_array_bytes(cfg: TopLevelConfig, W_coh: float, sizes: Sequence[int]) -> Tuple[int, int]:
+    """(result_bytes, peak_bytes) of the arrays held for one unit.
+
+    result_bytes counts the per-pair arrays handed to the writer; peak_bytes
+    adds the per-member working arrays of the simulation loop (in the local
+    mode, the working arrays of all members stepped together). For
+    lifetime-only runs the trajectories are counted at full length, an
+    upper bound.
+    """
+    L = len(coupling_strengths(cfg.bundle_coupling))
+    K = len(sizes)
+    n_ens = cfg.ensemble.n_ensembles
+    steps = int(cfg.ensemble.steps_per_wcoh * W_coh)
+    life_cfg = cfg.analysis.lifetime
+    if life_cfg.lifetime_only:
+        # lifetimes, survived, steps_run (+ trajectory_X, trajectory_Sv).
+        n_traj = 2 if life_cfg.keep_trajectory else 0
+        result = 8 * L * K * n_ens * (3 + steps * n_traj)
+        member = 8 * L * K * steps * n_traj
+        return result, result + member + 8 * 3 * L * max(sizes)
+    # acceleration, flips, Sv (+ Stheta) are (L, K, n_ens, ~steps) 8-byte arrays.
+    n_series = 4 if cfg.phase_dynamics.enabled else 3
+    result = 8 * L * K * n_ens * steps * n_series + 8 * 6 * L * K * n_ens
+    if has_slip_heterogeneity(cfg):
+        # slip_q and the sampled parameter, (n_ens, N) per pair.
+        result += 8 * 2 * L * n_ens * sum(sizes)
+    if cfg.bundle_coupling.mode == "local":
+        return result, result + _local_working_bytes(cfg, L, n_ens, steps, max(sizes))
+    # X, V, a, Sv, flips, dir_sign (+ Sth) per member, (L, K, steps) each.
+    member = 8 * L * K * steps * (n_series + 4)
+    thread_state = 8 * 3 * L * max(sizes)
+    return result, result + member + thread_state
+
+
+def _local_working_bytes(cfg: TopLevelConfig, L: int, n_ens: int, steps: int, N: int) -> int:
+    """Working arrays of the local mode, which steps all members at once.
+
+    The series go straight into the result arrays, so what is left is the
+    (L, n_ens, N) thread state and step temporaries, the neighbourhood
+    gather over the graph's edges, the graph itself, the packed velocity
+    signs and one member's dir_sign for the statistics.
+    """
+    graph_cfg = cfg.bundle_coupling.graph
+    degree = {"ring": 2 * graph_cfg.neighbours, "lattice": 4}.get(graph_cfg.kind, graph_cfg.mean_degree)
+    nnz = int(math.ceil(N * (1.0 + degree)))  # closed neighbourhoods
+    graph = 8 * (2 * N + 1 + nnz)  # indptr, degree, indices
+    # x, v, neighbourhood sums, n_up and p_stay (8 bytes), the flip mask
+    # (1 byte) and the gather v[..., indices].
+    state = L * n_ens * (8 * 5 * N + N + 8 * nnz)
+    uniforms = 8 * n_ens * N
+    signs = L * n_ens * ((steps + 7) // 8)
+    member = 8 * 2 * L * steps  # unpacked signs and dir_sign
+    return graph + state + uniforms + signs + member
+
+
+def _timing_records(dirs: Sequence[str], cfg: TopLevelConfig) -> List[Dict[str, float]]:
+    """Unit timing records from earlier runs comparable to cfg."""
+    backend = resolve_backend(cfg)
+    engine = resolve_engine(cfg, len(cfg.bundle_sizes) if cfg.ensemble.nested_bundle_sizes else 1)
+    records = []
+    for d in dirs:
+        path = os.path.join(d, "metadata.json")
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if meta.get("phase_dynamics", {}).get("enabled") != cfg.phase_dynamics.enabled:
+            continue
+        lifetime_only = meta.get("analysis", {}).get("lifetime", {}).get("lifetime_only", False)
+        if lifetime_only != cfg.analysis.lifetime.lifetime_only:
+            continue
+        for rec in meta.get("timing", {}).get("units", {}).values():
+            if rec.get("backend") != backend or rec.get("engine") != engine:
+                continue
+            stages = rec.get("stages", {})
+            counters = rec.get("counters", {})
+            member_steps = counters.get("member_steps", 0)
+            if not member_steps:
+                continue
+            write = stages.get("write", {}).get("wall_s", 0.0)
+            analyse = stages.get("analyse", {}).get("wall_s", 0.0)
+            records.append(
+                {
+                    "N": max(rec["bundle_sizes"]),
+                    "step_cost": (rec["wall_s"] - write - analyse) / member_steps,
+                    "write_s": write,
+                    "array_bytes": counters.get("array_bytes", 0),
+                    "bytes_written": counters.get("bytes_written", 0),
+                }
+            )
+    return records
+
+
+def _fit_model(samples: List[Tuple[int, float]]) -> Tuple[float, float]:
+    """Least-squares fit of step cost = a + b * N."""
+    Ns = np.array([n for n, _ in samples], dtype=float)
+    ys = np.array([y for _, y in samples], dtype=float)
+    if np.unique(Ns).size < 2:
+        return 0.0, float(ys.mean() / Ns.mean())
+    b, a = np.polyfit(Ns, ys, 1)
+    if b < 0.0 or a < 0.0:
+        # Timing noise dominates the size dependence; use a flat cost.
+        return float(ys.mean()), 0.0
+    return float(a), float(b)
+
+
+def _microbenchmark(cfg: TopLevelConfig) -> CostModel:
+    """Time a short single-member run at the smallest and largest N."""
+    sizes = sorted({min(cfg.bundle_sizes), max(cfg.bundle_sizes)})
+    W_coh = cfg.wcoh_grid[0]
+    bench_cfg = replace(
+        cfg,
+        ensemble=replace(
+            cfg.ensemble,
+            n_ensembles=1,
+            steps_per_wcoh=max(1, int(math.ceil(MICROBENCH_STEPS / W_coh))),
+        ),
+    )
+    L = len(coupling_strengths(cfg.bundle_coupling))
+    samples = []
+    write_rates = []
+    ratios = []
+    tmp = tempfile.mkdtemp(prefix="bcqm_bundles_plan_")
+    try:
+        for N in sizes:
+            # Best of two runs; the first also absorbs one-off start-up costs.
+            wall = math.inf
+            for _ in range(2):
+                t0 = time.perf_counter()
+                results = run_ensemble_for_sizes(bench_cfg, W_coh, [N])
+                wall = min(wall, time.perf_counter() - t0)
+            steps = int(bench_cfg.ensemble.steps_per_wcoh * W_coh)
+            samples.append((N, wall / (L * steps)))
+
+            data = results[0][0]
+            path = os.path.join(tmp, f"N{N}.npz")
+            t0 = time.perf_counter()
+            np.savez_compressed(path, **data)
+            written = os.path.getsize(path)
+            if cfg.execution.pyramid and "acceleration" in data:
+                written += os.path.getsize(write_pyramid(tmp, data, N, cfg.execution.pyramid_min_factor))
+            wall = time.perf_counter() - t0
+            raw = sum(a.nbytes for a in data.values())
+            write_rates.append(raw / 2**20 / max(wall, 1e-9))
+            ratios.append(written / raw)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    a, b = _fit_model(samples)
+    return CostModel(
+        a=a,
+        b=b,
+        write_MB_per_s=min(write_rates),
+        npz_ratio=max(max(ratios), DEFAULT_NPZ_RATIO),
+        source="micro-benchmark",
+    )
+
+
+def build_cost_model(
+    cfg: TopLevelConfig,
+    calibration_dirs: Optional[Sequence[str]] = None,
+    allow_benchmark: bool = True,
+) -> CostModel:
+    """Cost model from earlier runs, else from a micro-benchmark.
+
+    calibration_dirs defaults to every run directory next to
+    cfg.output_dir (e.g. outputs_bundles/*).
+    """
+    if calibration_dirs is None:
+        parent = os.path.dirname(os.path.normpath(cfg.output_dir)) or "."
+        calibration_dirs = sorted(glob(os.path.join(parent, "*")))
+    records = _timing_records(calibration_dirs, cfg)
+    if records:
+        a, b = _fit_model([(r["N"], r["step_cost"]) for r in records])
+        written = sum(r["array_bytes"] for r in records)
+        write_s = sum(r["write_s"] for r in records)
+        ratios = [r["bytes_written"] / r["array_bytes"] for r in records if r["array_bytes"]]
+        return CostModel(
+            a=a,
+            b=b,
+            write_MB_per_s=written / 2**20 / write_s if write_s > 0 else DEFAULT_WRITE_MB_PER_S,
+            npz_ratio=max(ratios) if ratios else DEFAULT_NPZ_RATIO,
+            source=f"{len(records)} timing records",
+        )
+    if allow_benchmark:
+        return _microbenchmark(cfg)
+    # No data at all: a rough NumPy-loop figure (~30 us per step + 0.1 us per thread).
+    return CostModel(3e-5, 1e-7, DEFAULT_WRITE_MB_PER_S, DEFAULT_NPZ_RATIO, "default guess")
+
+
+def plan_config(cfg: TopLevelConfig, model: CostModel) -> List[UnitPlan]:
+    """Predicted cost of every simulation unit of cfg (and its sweep points)."""
+    if cfg.sweep.axes:
+        return [plan for point in sweep_points(cfg) for plan in plan_config(point.cfg, model)]
+    L = len(coupling_strengths(cfg.bundle_coupling))
+    n_ens = cfg.ensemble.n_ensembles
+    plans = []
+    for W_coh, sizes in simulation_units(cfg):
+        steps = int(cfg.ensemble.steps_per_wcoh * W_coh)
+        N = max(sizes)
+        member_steps = L * n_ens * steps
+        result_bytes, peak_bytes = unit_array_bytes(cfg, W_coh, sizes)
+        written = result_bytes if cfg.execution.keep_timeseries else 0
+        runtime = member_steps * model.step_cost(N) + written / 2**20 / model.write_MB_per_s
+        plans.append(
+            UnitPlan(
+                W_coh=W_coh,
+                bundle_sizes=list(sizes),
+                steps=steps,
+                member_steps=member_steps,
+                thread_steps=member_steps * N,
+                memory_bytes=peak_bytes,
+                npz_bytes=int(written * model.npz_ratio),
+                runtime_s=runtime,
+                point_id=cfg.sweep.point_id,
+            )
+        )
+    return plans
+
+
+def available_memory_bytes() -> Optional[int]:
+    """Physical memory of this machine, or None if unknown."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def available_disk_bytes(path: str) -> Optional[int]:
+    """Free space on the filesystem that will hold *path*."""
+    probe = os.path.abspath(path)
+    while not os.path.exists(probe):
+        parent = os.path.dirname(probe)
+        if parent == probe:
+            return None
+        probe = parent
+    return shutil.disk_usage(probe).free
+
+
+def plan_warnings(
+    plans: Sequence[UnitPlan],
+    max_memory_bytes: Optional[int],
+    max_disk_bytes: Optional[int],
+) -> List[str]:
+    """Human-readable warnings for units or runs exceeding the limits."""
+    warnings = []
+    if max_memory_bytes is not None:
+        for p in plans:
+            if p.memory_bytes > max_memory_bytes:
+                warnings.append(
+                    f"{p.key}: needs ~{_fmt_bytes(p.memory_bytes)} in memory, "
+                    f"limit {_fmt_bytes(max_memory_bytes)}"
+                )
+    total_disk = sum(p.npz_bytes for p in plans)
+    if max_disk_bytes is not None and total_disk > max_disk_bytes:
+        warnings.append(
+            f"run needs ~{_fmt_bytes(total_disk)} on disk, {_fmt_bytes(max_disk_bytes)} available"
+        )
+    return warnings
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(n) < 1024 or unit == "TB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024.0
+    return f"{n:.1f} TB"
+
+
+def _fmt_seconds(s: float) -> str:
+    if s < 120:
+        return f"{s:.1f} s"
+    if s < 7200:
+        return f"{s / 60:.1f} min"
+    return f"{s / 3600:.1f} h"
+
+
+def format_plan(plans: Sequence[UnitPlan], model: CostModel) -> str:
+    """Tabular text report of a plan."""
+    w = max([14] + [len(p.key) for p in plans])
+    lines = [
+        f"cost model: {model.source} "
+        f"(step cost {model.a:.3g} s + {model.b:.3g} s * N, "
+        f"write {model.write_MB_per_s:.3g} MB/s, npz ratio {model.npz_ratio:.3g})",
+        f"{'unit':>{w}} {'steps':>9} {'member-steps':>13} {'thread-steps':>13} "
+        f"{'peak mem':>10} {'npz':>10} {'runtime':>10}",
+    ]
+    for p in plans:
+        lines.append(
+            f"{p.key:>{w}} {p.steps:>9d} {p.member_steps:>13.3g} {p.thread_steps:>13.3g} "
+            f"{_fmt_bytes(p.memory_bytes):>10} {_fmt_bytes(p.npz_bytes):>10} "
+            f"{_fmt_seconds(p.runtime_s):>10}"
+        )
+    lines.append(
+        f"{'total':>{w}} {'':>9} {sum(p.member_steps for p in plans):>13.3g} "
+        f"{sum(p.thread_steps for p in plans):>13.3g} "
+        f"{_fmt_bytes(max((p.memory_bytes for p in plans), default=0)):>10} "
+        f"{_fmt_bytes(sum(p.npz_bytes for p in plans)):>10} "
+        f"{_fmt_seconds(sum(p.runtime_s for p in plans)):>10}"
+    )
+    return "\n".join(lines)
+
+
+def main_plan(
+    config_path: str,
+    calibration_dirs: Optional[Sequence[str]] = None,
+    benchmark: bool = True,
+    max_memory_gb: Optional[float] = None,
+    max_disk_gb: Optional[float] = None,
+    output: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> int:
+    """Entry point for 'cli plan'. Returns 1 if any limit is exceeded.
+
+    Memory and disk limits default to the physical memory of this machine
+    and the free space below cfg.output_dir.
+    """
+    from .config_schemas import load_config
+
+    cfg = load_config(config_path)
+    if backend is not None:
+        cfg = replace(cfg, execution=replace(cfg.execution, backend=backend))
+    model = build_cost_model(cfg, calibration_dirs, allow_benchmark=benchmark)
+    plans = plan_config(cfg, model)
+
+    max_memory = available_memory_bytes() if max_memory_gb is None else int(max_memory_gb * 2**30)
+    max_disk = available_disk_bytes(cfg.output_dir) if max_disk_gb is None else int(max_disk_gb * 2**30)
+    warnings = plan_warnings(plans, max_memory, max_disk)
+
+    print(format_plan(plans, model))
+    for line in warnings:
+        print("WARNING: " + line)
+
+    if output is not None:
+        report = {
+            "config": config_path,
+            "cost_model": asdict(model),
+            "units": {p.key: {**asdict(p), "key": p.key} for p in plans},
+            "total": {
+                "member_steps": sum(p.member_steps for p in plans),
+                "thread_steps": sum(p.thread_steps for p in plans),
+                "peak_memory_bytes": max((p.memory_bytes for p in plans), default=0),
+                "npz_bytes": sum(p.npz_bytes for p in plans),
+                "runtime_s": sum(p.runtime_s for p in plans),
+            },
+            "limits": {"memory_bytes": max_memory, "disk_bytes": max_disk},
+            "warnings": warnings,
+        }
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Wrote {output}")
+    return 1 if warnings else 0
@@ -0,0 +1,175 @@
+"""Min/max/mean decimation pyramids of the per-pair trajectories.
+
+Plotting a 1e6-step trajectory on a screen a few thousand pixels wide
+needs at most a few thousand points per member. The writer therefore
+stores, next to timeseries.npz, a pyramid.npz holding the COM position
+X, the alignment S_v and the flip counts at power-of-2 decimation factors
+(min_factor, 2 min_factor, 4 min_factor, ...): for every block of
+`factor` steps the minimum, maximum and mean over the block. Each level
+is reduced from the one below it, so the whole pyramid costs one pass
+over the data.
+
+Layout of pyramid.npz:
+  * factors            — int64 decimation factors, ascending,
+  * {name}_steps       — length of the full series,
+  * {name}_f{f}_min/max/mean — float32 arrays of shape (n_ens, ceil(steps / f)).
+
+The last block of a level may be partial; its mean is over the steps it
+covers. read_pyramid picks the finest level that fits a requested time
+range into a pixel budget, or the raw series when the range itself fits
+the budget, and loads only that level.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .analysis import _pair_size, com_position
+
+
+PYRAMID_FILE = "pyramid.npz"
+
+# Series stored in the pyramid, in file order.
+PYRAMID_SERIES = ("X", "Sv", "flips")
+
+
+def pyramid_series(data: Dict[str, np.ndarray], N: int) -> Dict[str, np.ndarray]:
+    """The (n_ens, steps) series of one pair that go into its pyramid."""
+    return {
+        "X": com_position(data["acceleration"], data["V0"], N),
+        "Sv": np.asarray(data["Sv"]),
+        "flips": np.asarray(data["flips"]),
+    }
+
+
+def _first_level(x: np.ndarray, factor: int):
+    """Per-block (min, max, sum, count) of x over blocks of `factor` steps."""
+    n_ens, T = x.shape
+    n_blocks = -(-T // factor)
+    pad = n_blocks * factor - T
+    x = np.asarray(x, dtype=float)
+    lo = np.pad(x, ((0, 0), (0, pad)), constant_values=np.inf).reshape(n_ens, n_blocks, factor)
+    hi = np.pad(x, ((0, 0), (0, pad)), constant_values=-np.inf).reshape(n_ens, n_blocks, factor)
+    sm = np.pad(x, ((0, 0), (0, pad))).reshape(n_ens, n_blocks, factor)
+    count = np.full(n_blocks, factor, dtype=np.int64)
+    count[-1] -= pad
+    return lo.min(axis=2), hi.max(axis=2), sm.sum(axis=2), count
+
+
+def _next_level(lo: np.ndarray, hi: np.ndarray, sm: np.ndarray, count: np.ndarray):
+    """Merge neighbouring blocks pairwise (an odd last block merges with nothing)."""
+    if lo.shape[1] % 2:
+        lo = np.pad(lo, ((0, 0), (0, 1)), constant_values=np.inf)
+        hi = np.pad(hi, ((0, 0), (0, 1)), constant_values=-np.inf)
+        sm = np.pad(sm, ((0, 0), (0, 1)))
+        count = np.pad(count, (0, 1))
+    n_ens, n = lo.shape
+    return (
+        lo.reshape(n_ens, n // 2, 2).min(axis=2),
+        hi.reshape(n_ens, n // 2, 2).max(axis=2),
+        sm.reshape(n_ens, n // 2, 2).sum(axis=2),
+        count.reshape(n // 2, 2).sum(axis=1),
+    )
+
+
+def build_pyramid(series: Dict[str, np.ndarray], min_factor: int = 8) -> Dict[str, np.ndarray]:
+    """Pyramid arrays (the pyramid.npz layout) of a dict of (n_ens, steps) series.
+
+    Levels run from min_factor upwards in powers of 2 until a level has
+    a single block (or the series is shorter than min_factor).
+    """
+    T_max = max(x.shape[1] for x in series.values())
+    factors = [min_factor]
+    while factors[-1] < T_max:
+        factors.append(2 * factors[-1])
+
+    out: Dict[str, np.ndarray] = {"factors": np.asarray(factors, dtype=np.int64)}
+    for name, x in series.items():
+        out[f"{name}_steps"] = np.int64(x.shape[1])
+        level = _first_level(x, min_factor)
+        for i, f in enumerate(factors):
+            if i:
+                level = _next_level(*level)
+            lo, hi, sm, count = level
+            out[f"{name}_f{f}_min"] = lo.astype(np.float32)
+            out[f"{name}_f{f}_max"] = hi.astype(np.float32)
+            out[f"{name}_f{f}_mean"] = (sm / count).astype(np.float32)
+    return out
+
+
+def write_pyramid(pair_dir: str, data: Dict[str, np.ndarray], N: int, min_factor: int = 8) -> str:
+    """Write pyramid.npz for one pair from its timeseries arrays; return the path."""
+    path = os.path.join(pair_dir, PYRAMID_FILE)
+    np.savez_compressed(path, **build_pyramid(pyramid_series(data, N), min_factor))
+    return path
+
+
+def _raw_series(pair_dir: str, name: str) -> np.ndarray:
+    with np.load(os.path.join(pair_dir, "timeseries.npz")) as data:
+        if name == "X":
+            return com_position(data["acceleration"], data["V0"], _pair_size(pair_dir))
+        return np.asarray(data[name])
+
+
+def read_pyramid(
+    pair_dir: str,
+    name: str,
+    t0: int = 0,
+    t1: Optional[int] = None,
+    pixels: int = 1000,
+    members: Any = None,
+) -> Dict[str, Any]:
+    """Decimated view of series `name` ("X", "Sv" or "flips") over steps [t0, t1).
+
+    Uses the smallest decimation factor that brings the range down to at
+    most `pixels` blocks, plus one where the range straddles a block
+    boundary (the coarsest level if none does), or the raw
+    series from timeseries.npz (factor 1, min == max == mean) when the
+    range already fits. Blocks are aligned to multiples of the factor, so
+    the first and last block may reach slightly outside [t0, t1). If the
+    pair has no pyramid.npz (execution.pyramid off) it is built in memory
+    from timeseries.npz.
+
+    `members` selects ensemble members (any NumPy index along axis 0).
+
+    Returns a dict with t (block start steps), min, max, mean (each of
+    shape (n_members, n_points)) and factor.
+    """
+    if name not in PYRAMID_SERIES:
+        raise ValueError(f"Unknown pyramid series {name!r}; expected one of {PYRAMID_SERIES}")
+    sel = slice(None) if members is None else members
+
+    path = os.path.join(pair_dir, PYRAMID_FILE)
+    if os.path.exists(path):
+        pyr = np.load(path)
+    else:
+        pyr = build_pyramid({name: _raw_series(pair_dir, name)})
+    try:
+        T = int(pyr[f"{name}_steps"])
+        t1 = T if t1 is None else min(int(t1), T)
+        t0 = max(int(t0), 0)
+        if t1 <= t0:
+            raise ValueError(f"Empty time range [{t0}, {t1}) for a series of {T} steps")
+        span = t1 - t0
+
+        if span <= pixels:
+            x = np.asarray(_raw_series(pair_dir, name)[sel, t0:t1], dtype=float)
+            return {"t": np.arange(t0, t1), "min": x, "max": x, "mean": x, "factor": 1}
+
+        factors = pyr["factors"]
+        fits = factors[-(-span // factors) <= pixels]
+        f = int(fits[0]) if fits.size else int(factors[-1])
+        b0, b1 = t0 // f, -(-t1 // f)
+        return {
+            "t": np.arange(b0, b1) * f,
+            "min": pyr[f"{name}_f{f}_min"][sel, b0:b1],
+            "max": pyr[f"{name}_f{f}_max"][sel, b0:b1],
+            "mean": pyr[f"{name}_f{f}_mean"][sel, b0:b1],
+            "factor": f,
+        }
+    finally:
+        if hasattr(pyr, "close"):
+            pyr.close()
@@ -0,0 +1,110 @@
+"""Shared-memory transfer of simulation results from worker processes.
+
+With `cli run --jobs n` (or `batch`) every unit is simulated in a worker
+process. Returning its result arrays through the process pool would
+pickle acceleration, flips and S_v (hundreds of MB for a long pair) and
+hold them twice, once in each process. Instead the worker allocates those
+arrays directly in POSIX shared-memory blocks (SharedArena.zeros is passed
+to run_ensemble_for_sizes as its allocator) and returns only small
+SharedArrayRef descriptors; the parent maps the same blocks
+(attach_results), writes the npz files from them and unlinks the blocks.
+
+Ownership of a block passes from the worker to the parent when the worker
+returns: the worker closes its mapping and stops tracking the block, the
+parent attaches (and so tracks) it and unlinks it once written, so blocks
+are also reclaimed if the parent dies mid-run.
+"""
+
+from __future__ import annotations
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+
+class SharedArrayRef(NamedTuple):
+    """Location of one result array inside a shared-memory block."""
+    block: str
+    offset: int
+    shape: Tuple[int, ...]
+    strides: Tuple[int, ...]
+    dtype: str
+
+
+def _address(a: np.ndarray) -> int:
+    return a.__array_interface__["data"][0]
+
+
+class SharedArena:
+    """Allocator of zero-filled arrays, one shared-memory block per array."""
+
+    def __init__(self) -> None:
+        self.blocks: List[shared_memory.SharedMemory] = []
+
+    def zeros(self, shape: Any, dtype: Any = float) -> np.ndarray:
+        """Like np.zeros, in a new block (new POSIX blocks are zero-filled)."""
+        shape = tuple(int(n) for n in np.atleast_1d(shape))
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        block = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self.blocks.append(block)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def export(self, results: List[List[Dict[str, np.ndarray]]]) -> List[List[Dict[str, Any]]]:
+        """Replace every array that lives in a block by its SharedArrayRef.
+
+        Arrays allocated elsewhere (per-member scalars, slip tables) are
+        small and stay as they are.
+        """
+        spans = []
+        for block in self.blocks:
+            base = _address(np.frombuffer(block.buf, dtype=np.uint8))
+            spans.append((block.name, base, base + block.size))
+
+        def ref(a: np.ndarray) -> Any:
+            if not isinstance(a, np.ndarray):
+                return a
+            addr = _address(a)
+            for name, lo, hi in spans:
+                if lo <= addr < hi:
+                    return SharedArrayRef(name, addr - lo, a.shape, a.strides, a.dtype.str)
+            return a
+
+        return [[{key: ref(a) for key, a in data.items()} for data in per_size] for per_size in results]
+
+    def release(self) -> None:
+        """Close this process's mappings and hand the blocks over to the reader.
+
+        Every array built on the blocks must have been dropped first.
+        """
+        for block in self.blocks:
+            resource_tracker.unregister(block._name, "shared_memory")
+            block.close()
+        self.blocks = []
+
+
+def attach_results(
+    refs: List[List[Dict[str, Any]]],
+) -> Tuple[List[List[Dict[str, np.ndarray]]], List[shared_memory.SharedMemory]]:
+    """Map exported results back to arrays; returns (results, blocks).
+
+    The arrays are views of the blocks: drop them before free_blocks.
+    """
+    blocks: Dict[str, shared_memory.SharedMemory] = {}
+
+    def array(r: Any) -> Any:
+        if not isinstance(r, SharedArrayRef):
+            return r
+        if r.block not in blocks:
+            blocks[r.block] = shared_memory.SharedMemory(name=r.block)
+        return np.ndarray(r.shape, dtype=r.dtype, buffer=blocks[r.block].buf, offset=r.offset, strides=r.strides)
+
+    results = [[{key: array(r) for key, r in data.items()} for data in per_size] for per_size in refs]
+    return results, list(blocks.values())
+
+
+def free_blocks(blocks: List[shared_memory.SharedMemory]) -> None:
+    """Close and unlink blocks obtained from attach_results."""
+    for block in blocks:
+        block.close()
+        block.unlink()
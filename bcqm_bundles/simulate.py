@@ -8,10 +8,15 @@ This module implements the core loop:
 
 from __future__ import annotations
 
+import copy
+import hashlib
 import json
 import os
-from dataclasses import asdict
-from typing import Dict, Tuple
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, replace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
@@ -59,9 +64,31 @@ def _compute_persistence_lengths(dir_sign: np.ndarray) -> tuple[float, float]:
     return mean_run, median_run
 
 
-from .config_schemas import TopLevelConfig
-from .kernels import BundleState, step_soft_rudder_bundle, slip_probability, BundleCouplingConfig, KernelConfig
-from .phase_dynamics import PhaseState, update_phases
+from .config_schemas import TopLevelConfig, coupling_strengths, is_lambda_sweep
+from .kernels import (
+    BundleState,
+    KernelPlan,
+    build_kernel_plan,
+    sample_thread_slip,
+    set_thread_slip,
+    step_in_place,
+    step_local_in_place,
+)
+from . import bitpacked, jit
+from .instrument import (
+    HEARTBEAT_STRIDE,
+    PROGRESS_FILE,
+    Heartbeat,
+    StageTimer,
+    append_progress,
+    peak_rss_mb,
+    profile_call,
+)
+from .analysis import SUMMARY_FILE, TIMESERIES_FILE, analyse_arrays, run_summary, write_summary
+from .pyramid import write_pyramid
+from .sharedmem import SharedArena, attach_results, free_blocks
+from .sweep import sweep_configs
+from .phase_dynamics import PhaseState, get_phase_law, init_natural_frequencies, run_phase_engine
 
 
 def _init_rng(seed: int) -> np.random.Generator:
@@ -80,6 +107,105 @@ def _init_phase_state(N: int, rng: np.random.Generator) -> PhaseState:
     return PhaseState(theta=theta0)
 
 
+class _MirroredUniforms:
+    """Stand-in for a Generator that returns 1 - u for each of its uniforms u.
+
+    Covers what the stepping loops use: random(size=..., out=...) and
+    bit_generator (for _skip_uniforms).
+    """
+
+    def __init__(self, rng: np.random.Generator) -> None:
+        self._rng = rng
+        self.bit_generator = rng.bit_generator
+
+    def random(self, size: Any = None, out: Optional[np.ndarray] = None) -> Any:
+        u = self._rng.random(size=size, out=out)
+        if np.ndim(u) == 0:
+            return 1.0 - u
+        return np.subtract(1.0, u, out=u)
+
+
+class _MirroredRows:
+    """Generator stand-in for the local engine's (n_ens, N) uniform blocks.
+
+    Draws rows for the even members only and fills each odd row with 1 - u
+    of the row above, so that members 2j and 2j + 1 are antithetic.
+    """
+
+    def __init__(self, rng: np.random.Generator) -> None:
+        self._rng = rng
+        self.bit_generator = rng.bit_generator
+
+    def random(self, size: Any = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            out = np.empty(size, dtype=float)
+        even = self._rng.random(out[0::2].shape)
+        out[0::2] = even
+        np.subtract(1.0, even, out=out[1::2])
+        return out
+
+
+class _MemberStarts:
+    """Initial state, phases and flip-uniform stream of each ensemble member.
+
+    Members draw their initial directions and phases from rng, then step
+    on its uniforms. With ensemble.antithetic, member 2j + 1 draws nothing:
+    it starts from the mirror image of member 2j (directions -v, phases
+    2 pi - theta) and steps on 1 - u for each of member 2j's uniforms,
+    replayed from a copy of rng. Even members see the same stream as
+    consecutive members of a plain run.
+    """
+
+    def __init__(self, cfg: TopLevelConfig, N: int, rng: np.random.Generator) -> None:
+        self.antithetic = cfg.ensemble.antithetic
+        self.N = N
+        self.rng = rng
+        self._partner = None
+
+    def member(self, e: int) -> Tuple[BundleState, PhaseState, Any]:
+        """(state0, phase0, uniform stream) of member e; call in member order."""
+        if self.antithetic and e % 2:
+            state0, phase0, replay = self._partner
+            return (
+                BundleState(x=np.zeros(self.N, dtype=float), v=-state0.v),
+                PhaseState(theta=np.mod(2.0 * np.pi - phase0.theta, 2.0 * np.pi)),
+                _MirroredUniforms(replay),
+            )
+        state0 = _init_bundle_state(self.N, self.rng)
+        # Drawn even without phase dynamics to keep the RNG stream fixed.
+        phase0 = _init_phase_state(self.N, self.rng)
+        if self.antithetic:
+            self._partner = (state0, phase0, copy.deepcopy(self.rng))
+        return state0, phase0, self.rng
+
+
+def _thread_slip(
+    cfg: TopLevelConfig, W_coh: float, n_ens: int, N: int, seed: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-thread slip of all members (see sample_thread_slip).
+
+    Antithetic partners share the slip values of their pair.
+    """
+    q_threads, slip_values = sample_thread_slip(
+        W_coh, cfg.kernel, (n_ens, N), np.random.default_rng([seed, 2])
+    )
+    if cfg.ensemble.antithetic:
+        q_threads[1::2] = q_threads[0::2]
+        slip_values[1::2] = slip_values[0::2]
+    return q_threads, slip_values
+
+
+def check_antithetic(cfg: TopLevelConfig) -> None:
+    """Raise ValueError if ensemble.antithetic cannot be used for cfg.
+
+    The bit-packed engine compares raw 64-bit draws, not uniforms.
+    """
+    if cfg.ensemble.n_ensembles % 2:
+        raise ValueError("ensemble.antithetic requires an even n_ensembles")
+    if cfg.execution.engine != "dense":
+        raise ValueError("ensemble.antithetic requires execution.engine 'dense'")
+
+
 def run_ensemble_for_pair(
     cfg: TopLevelConfig,
     W_coh: float,
@@ -90,137 +216,708 @@ def run_ensemble_for_pair(
 
     Returns a dictionary of time series and per-step statistics.
     """
-    rng = _init_rng(cfg.random_seed + seed_offset + int(W_coh) + N)
+    results = run_ensemble_for_lambdas(cfg, W_coh, N, seed_offset=seed_offset)
+    if len(results) != 1:
+        raise ValueError(
+            "coupling_strength is a list; use run_ensemble_for_lambdas instead"
+        )
+    return results[0]
+
+
+def run_ensemble_for_lambdas(
+    cfg: TopLevelConfig,
+    W_coh: float,
+    N: int,
+    seed_offset: int = 0,
+) -> List[Dict[str, np.ndarray]]:
+    """Run an ensemble for one (W_coh, N) pair and every lambda replica.
+
+    All lambda values in cfg.bundle_coupling.coupling_strength are advanced
+    together from the same uniform draws (common random numbers), so the RNG
+    stream is generated once per pair. With a scalar coupling_strength this
+    reproduces run_ensemble_for_pair exactly.
+
+    Returns one result dictionary per lambda, in config order.
+    """
+    results = run_ensemble_for_sizes(cfg, W_coh, [N], seed_offset=seed_offset)
+    return [per_size[0] for per_size in results]
+
+
+def check_lifetime_only(cfg: TopLevelConfig) -> None:
+    """Raise ValueError if analysis.lifetime.lifetime_only cannot be used for cfg.
+
+    Early termination steps one dense member at a time, and phase dynamics
+    need the full S_v series.
+    """
+    if cfg.phase_dynamics.enabled:
+        raise ValueError("analysis.lifetime.lifetime_only requires phase_dynamics to be disabled")
+    if cfg.bundle_coupling.mode == "local":
+        raise ValueError("analysis.lifetime.lifetime_only does not support bundle_coupling.mode 'local'")
+    if cfg.execution.engine != "dense":
+        raise ValueError("analysis.lifetime.lifetime_only requires execution.engine 'dense'")
+
+
+def check_nested_sizes(cfg: TopLevelConfig) -> None:
+    """Raise ValueError if nested bundle sizes are not valid for cfg.
+
+    Prefix sub-bundles are only statistically equivalent to smaller bundles
+    when threads do not interact, i.e. in independent mode without phase
+    dynamics (the phase law couples to the whole bundle's S_v).
+    """
+    if cfg.bundle_coupling.mode != "independent":
+        raise ValueError(
+            "ensemble.nested_bundle_sizes requires bundle_coupling.mode 'independent'"
+        )
+    if cfg.phase_dynamics.enabled:
+        raise ValueError(
+            "ensemble.nested_bundle_sizes requires phase_dynamics to be disabled"
+        )
+
+
+def _prefix_means(a: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Mean over the first k threads for each k in sizes, shape (..., K)."""
+    if sizes.size == 1 and sizes[0] == a.shape[-1]:
+        return a.mean(axis=-1, keepdims=True)
+    # Thread states and positions are integer-valued, so the prefix sums are
+    # exact and agree with a direct mean over the sub-bundle.
+    return np.cumsum(a, axis=-1)[..., sizes - 1] / sizes
+
+
+def has_slip_heterogeneity(cfg: TopLevelConfig) -> bool:
+    """True if threads draw their own slip parameters (kernel.slip_law.heterogeneity)."""
+    return cfg.kernel.slip_law.heterogeneity.parameter != "none"
+
+
+def resolve_backend(cfg: TopLevelConfig) -> str:
+    """Return the stepping backend that will actually be used for cfg.
+
+    "numba" falls back to "numpy" (with a warning) when Numba is not
+    installed, for bundle_coupling.mode "local", whose batched CSR
+    stepping is NumPy only, and for heterogeneous slip laws, whose
+    per-thread stay probabilities are not tabulated. Phase dynamics run after stepping
+    (run_phase_engine), so both backends support them.
+    """
+    backend = cfg.execution.backend
+    if backend == "numpy":
+        return "numpy"
+    if backend != "numba":
+        raise ValueError(f"Unknown execution backend {backend!r}")
+    if not jit.NUMBA_AVAILABLE:
+        warnings.warn("Numba is not installed; using the NumPy backend")
+        return "numpy"
+    if cfg.bundle_coupling.mode == "local":
+        warnings.warn("bundle_coupling.mode 'local' has no Numba kernel; using the NumPy backend")
+        return "numpy"
+    if has_slip_heterogeneity(cfg):
+        warnings.warn("Heterogeneous slip laws have no Numba kernel; using the NumPy backend")
+        return "numpy"
+    if cfg.analysis.lifetime.lifetime_only:
+        warnings.warn("Lifetime-only runs have no Numba kernel; using the NumPy backend")
+        return "numpy"
+    return "numba"
+
+
+def resolve_engine(cfg: TopLevelConfig, n_sizes: int = 1) -> str:
+    """Return the thread-state engine for cfg, validating its restrictions.
+
+    The bit-packed engine stores one bit per thread and supports the global
+    coupling modes with lambda replicas, i.e. only the exchangeable modes
+    the p_stay count table already covers; it does not support phase
+    dynamics, nested bundle sizes, the local coupling mode or heterogeneous
+    slip, whose stay probabilities differ per thread.
+    """
+    engine = cfg.execution.engine
+    if engine == "dense":
+        return "dense"
+    if engine != "bitpacked":
+        raise ValueError(f"Unknown execution engine {engine!r}")
+    if cfg.phase_dynamics.enabled:
+        raise ValueError("execution.engine 'bitpacked' does not support phase dynamics")
+    if n_sizes > 1:
+        raise ValueError("execution.engine 'bitpacked' does not support nested bundle sizes")
+    if cfg.bundle_coupling.mode == "local":
+        raise ValueError("execution.engine 'bitpacked' does not support bundle_coupling.mode 'local'")
+    if has_slip_heterogeneity(cfg):
+        raise ValueError("execution.engine 'bitpacked' does not support heterogeneous slip laws")
+    return "bitpacked"
+
+
+def _run_member_numpy(
+    plan: KernelPlan,
+    state0: BundleState,
+    sizes_arr: np.ndarray,
+    steps: int,
+    rng: np.random.Generator,
+    heartbeat: Optional[Heartbeat] = None,
+):
+    """Reference NumPy loop for one ensemble member.
+
+    Returns (X, Sv, flips, dir_sign), each of shape (L, K, steps). Progress
+    is offered to *heartbeat* every HEARTBEAT_STRIDE steps.
+    """
+    L = plan.p_stay_table.shape[0]
+    K = sizes_arr.size
+    # Every replica starts from the same initial condition.
+    state = BundleState(x=np.tile(state0.x, (L, 1)), v=np.tile(state0.v, (L, 1)))
+
+    X = np.zeros((L, K, steps), dtype=float)
+    Sv = np.zeros((L, K, steps), dtype=float)
+    flips = np.zeros((L, K, steps), dtype=int)
+    # COM direction sign per step: -1, 0, or +1
+    dir_sign = np.zeros((L, K, steps), dtype=int)
+
+    for t in range(steps):
+        if heartbeat is not None and not t % HEARTBEAT_STRIDE:
+            heartbeat.update(t)
+        # Record COM position & alignment before step
+        X[:, :, t] = _prefix_means(state.x, sizes_arr)
+        mean_v = _prefix_means(state.v, sizes_arr)
+        Sv[:, :, t] = np.abs(mean_v)
+        # Direction sign: -1 for predominantly negative, +1 for positive, 0 if exactly balanced
+        dir_sign[:, :, t] = np.sign(mean_v)
+
+        # Advance one step (in place)
+        n_flips = step_in_place(plan, state, rng)
+        if K == 1:
+            flips[:, 0, t] = n_flips
+        else:
+            flips[:, :, t] = np.cumsum(plan.flip, axis=-1)[..., sizes_arr - 1]
+
+    return X, Sv, flips, dir_sign
+
+
+def _skip_uniforms(rng: np.random.Generator, n: int) -> None:
+    """Advance rng past n uniform doubles without drawing them."""
+    # PCG64 (default_rng) spends one 64-bit output per double.
+    rng.bit_generator.advance(n)
+
+
+def _run_member_lifetime(
+    plan: KernelPlan,
+    state0: BundleState,
+    sizes_arr: np.ndarray,
+    steps: int,
+    rng: np.random.Generator,
+    f_min: float,
+    evap_window: int,
+    keep_trajectory: bool = False,
+    heartbeat: Optional[Heartbeat] = None,
+):
+    """Step one member only until every (replica, size) row has evaporated.
+
+    Applies the evaporation rule of _member_statistics online (S_v < f_min
+    for evap_window consecutive steps) and stops as soon as all rows have
+    evaporated. The uniforms the remaining steps would have drawn are then
+    skipped, so later members see the same random stream as in a full run
+    and every lifetime is identical to the full run's.
+
+    Returns (lifetimes, survived, steps_run, X, Sv): lifetimes and survived
+    of shape (L, K), the number of steps recorded, and with keep_trajectory
+    the COM position and S_v series of shape (L, K, steps_run), NaN after
+    each row's evaporation step (None otherwise).
+    """
+    L = plan.p_stay_table.shape[0]
+    K = sizes_arr.size
+    state = BundleState(x=np.tile(state0.x, (L, 1)), v=np.tile(state0.v, (L, 1)))
+
+    lifetimes = np.full((L, K), steps, dtype=int)
+    alive = np.ones((L, K), dtype=bool)
+    below_run = np.zeros((L, K), dtype=int)
+    X_rows: List[np.ndarray] = []
+    Sv_rows: List[np.ndarray] = []
+
+    steps_run = steps
+    for t in range(steps):
+        if heartbeat is not None and not t % HEARTBEAT_STRIDE:
+            heartbeat.update(t)
+        Sv = np.abs(_prefix_means(state.v, sizes_arr))
+        if keep_trajectory:
+            X_rows.append(np.where(alive, _prefix_means(state.x, sizes_arr), np.nan))
+            Sv_rows.append(np.where(alive, Sv, np.nan))
+
+        below = Sv < f_min
+        below_run += 1
+        below_run[~below] = 0
+        evaporated = alive & (below_run >= evap_window)
+        if evaporated.any():
+            lifetimes[evaporated] = t
+            alive &= ~evaporated
+            if not alive.any():
+                steps_run = t + 1
+                _skip_uniforms(rng, (steps - t) * plan.N)
+                break
+
+        step_in_place(plan, state, rng)
+
+    X = Sv_out = None
+    if keep_trajectory:
+        X = np.stack(X_rows, axis=-1)
+        Sv_out = np.stack(Sv_rows, axis=-1)
+    return lifetimes, alive, steps_run, X, Sv_out
+
+
+def _pad_trajectories(series: List[np.ndarray]) -> np.ndarray:
+    """Stack per-member (L, K, T_e) series into (L, K, n_ens, max T_e), NaN-padded."""
+    T = max(a.shape[-1] for a in series)
+    out = np.full(series[0].shape[:2] + (len(series), T), np.nan)
+    for e, a in enumerate(series):
+        out[:, :, e, : a.shape[-1]] = a
+    return out
+
+
+def run_lifetimes_for_sizes(
+    cfg: TopLevelConfig,
+    W_coh: float,
+    sizes: Sequence[int],
+    seed_offset: int = 0,
+    timer: Optional[StageTimer] = None,
+    heartbeat: Optional[Heartbeat] = None,
+) -> List[List[Dict[str, np.ndarray]]]:
+    """Lifetime-only counterpart of run_ensemble_for_sizes.
+
+    Each member is stepped until all its replicas (and nested sizes) have
+    evaporated. Results hold "lifetimes", "survived" and "steps_run" per
+    member, and with analysis.lifetime.keep_trajectory also "trajectory_X"
+    and "trajectory_Sv" (n_ens, T), NaN after each member's evaporation.
+    Lifetimes and survival flags equal those of a full run with the same
+    config.
+    """
+    check_lifetime_only(cfg)
+    sizes_arr = np.asarray(sizes, dtype=int)
+    N = int(sizes_arr.max())
+    K = sizes_arr.size
+    seed = cfg.random_seed + seed_offset + int(W_coh) + N
+    rng = _init_rng(seed)
+
+    L = len(coupling_strengths(cfg.bundle_coupling))
+    n_ens = cfg.ensemble.n_ensembles
+    steps = int(cfg.ensemble.steps_per_wcoh * W_coh)
+    life_cfg = cfg.analysis.lifetime
+
+    plan = build_kernel_plan(W_coh, N, cfg.kernel, cfg.bundle_coupling)
+    heterogeneous = has_slip_heterogeneity(cfg)
+    if heterogeneous:
+        q_threads, slip_values = _thread_slip(cfg, W_coh, n_ens, N, seed)
+    if cfg.ensemble.antithetic:
+        check_antithetic(cfg)
+    starts = _MemberStarts(cfg, N, rng)
+
+    if timer is None:
+        timer = StageTimer()
+
+    lifetimes = np.zeros((L, K, n_ens), dtype=int)
+    survived = np.zeros((L, K, n_ens), dtype=bool)
+    steps_run = np.zeros(n_ens, dtype=int)
+    X_series: List[np.ndarray] = []
+    Sv_series: List[np.ndarray] = []
+    for e in range(n_ens):
+        if heartbeat is not None:
+            heartbeat.begin(e, e * steps)
+        with timer.stage("stepping"):
+            # The phases are drawn to keep the RNG stream the same as in a full run.
+            state0, _, member_rng = starts.member(e)
+            if heterogeneous:
+                set_thread_slip(plan, q_threads[e])
+            member_life, member_surv, steps_run[e], X, Sv = _run_member_lifetime(
+                plan,
+                state0,
+                sizes_arr,
+                steps,
+                member_rng,
+                life_cfg.f_min,
+                life_cfg.evap_window,
+                life_cfg.keep_trajectory,
+                heartbeat,
+            )
+        lifetimes[:, :, e] = member_life
+        survived[:, :, e] = member_surv
+        if life_cfg.keep_trajectory:
+            X_series.append(X)
+            Sv_series.append(Sv)
+
+    timer.count("member_steps", L * int(steps_run.sum()))
+    timer.count("thread_steps", L * int(steps_run.sum()) * N)
+    timer.count("skipped_steps", L * (n_ens * steps - int(steps_run.sum())))
+
+    if life_cfg.keep_trajectory:
+        X_all = _pad_trajectories(X_series)
+        Sv_all = _pad_trajectories(Sv_series)
+
+    results: List[List[Dict[str, np.ndarray]]] = []
+    for l in range(L):
+        per_size: List[Dict[str, np.ndarray]] = []
+        for k in range(K):
+            result: Dict[str, np.ndarray] = {
+                "lifetimes": lifetimes[l, k],
+                "survived": survived[l, k],
+                "steps_run": steps_run,
+            }
+            if life_cfg.keep_trajectory:
+                # Trim the padding shared by all members of this row.
+                T_k = int(lifetimes[l, k].max()) + 1
+                result["trajectory_X"] = X_all[l, k, :, :T_k]
+                result["trajectory_Sv"] = Sv_all[l, k, :, :T_k]
+            if heterogeneous:
+                n_k = int(sizes_arr[k])
+                result["slip_q"] = q_threads[:, :n_k]
+                result[f"slip_{cfg.kernel.slip_law.heterogeneity.parameter}"] = slip_values[:, :n_k]
+            per_size.append(result)
+        results.append(per_size)
+    return results
+
+
+def _run_members_local(
+    plan: KernelPlan,
+    v0: np.ndarray,
+    steps: int,
+    rng: np.random.Generator,
+    acc: np.ndarray,
+    V0: np.ndarray,
+    flips: np.ndarray,
+    Sv: np.ndarray,
+    heartbeat: Optional[Heartbeat] = None,
+) -> np.ndarray:
+    """NumPy loop stepping all ensemble members of a local-mode plan at once.
+
+    v0 holds the initial directions, shape (n_ens, N). The series are
+    written straight into the result arrays, as run_ensemble_for_sizes
+    derives them for the other engines: acc (L, n_ens, steps - 1), V0
+    (L, n_ens), flips and Sv (L, n_ens, steps). Only the last COM position
+    and velocity are kept while stepping.
+
+    Returns the signs of the COM velocity packed one bit per step (set for
+    +1), shape (L, n_ens, ceil(steps / 8)); _unpack_dir_sign turns a
+    member's row back into its dir_sign series.
+    """
+    L = plan.p_stay_table.shape[0]
+    n_ens = v0.shape[0]
+    state = BundleState(
+        x=np.zeros((L,) + v0.shape, dtype=float),
+        v=np.tile(v0, (L, 1, 1)),  # writable: stepped in place
+    )
+    positive = np.zeros((L, n_ens, (steps + 7) // 8), dtype=np.uint8)
+
+    X_prev = V_prev = None
+    for t in range(steps):
+        if heartbeat is not None and not t % HEARTBEAT_STRIDE:
+            heartbeat.update(t)
+        X = state.x.mean(axis=-1)
+        mean_v = state.v.mean(axis=-1)
+        Sv[..., t] = np.abs(mean_v)
+        positive[..., t >> 3] |= np.uint8(1 << (t & 7)) * (mean_v > 0)
+        flips[..., t] = step_local_in_place(plan, state, rng)
+
+        # V[t - 1] = X[t] - X[t - 1] and a[t - 2] = V[t - 1] - V[t - 2].
+        if t >= 1:
+            V = X - X_prev
+            if t == 1:
+                V0[...] = V
+            else:
+                acc[..., t - 2] = V - V_prev
+            V_prev = V
+        X_prev = X
+    if steps >= 2:
+        # The last velocity is zero (see run_ensemble_for_sizes).
+        acc[..., steps - 2] = 0.0 - V_prev
+    return positive
+
+
+def _unpack_dir_sign(positive: np.ndarray, Sv: np.ndarray) -> np.ndarray:
+    """dir_sign series from packed velocity signs and the matching S_v.
+
+    positive is a row of _run_members_local's packed signs; steps with
+    S_v == 0 get sign 0.
+    """
+    steps = Sv.shape[-1]
+    bits = np.unpackbits(positive, axis=-1, count=steps, bitorder="little").astype(int)
+    return np.where(Sv == 0, 0, 2 * bits - 1)
+
+
+def _run_phases(
+    cfg: TopLevelConfig,
+    theta: np.ndarray,
+    Sv_after: np.ndarray,
+    W_coh: float,
+    seed: int,
+) -> np.ndarray:
+    """S_theta series of all members from their initial phases.
+
+    theta is (L, n_ens, N) and Sv_after the recorded full-bundle S_v at
+    t >= 1, shape (L, n_ens, steps - 1). Natural frequencies, if the law
+    uses them, come from a generator of their own so that the thread
+    directions do not depend on the phase law.
+    """
+    pd_cfg = cfg.phase_dynamics
+    omega = None
+    if get_phase_law(pd_cfg.law).natural_frequencies:
+        # One draw per member, shared by all replicas like theta.
+        phase_rng = np.random.default_rng([seed, 1])
+        omega = np.broadcast_to(
+            init_natural_frequencies(theta.shape[1:], pd_cfg.params, phase_rng), theta.shape
+        )
+    return run_phase_engine(PhaseState(theta=theta, omega=omega), Sv_after, W_coh, pd_cfg)
+
+
+def _member_statistics(dir_sign: np.ndarray, Sv: np.ndarray, f_min: float, evap_window: int):
+    """Persistence and lifetime statistics for every (replica, size) row.
+
+    Returns (L_mean, L_median, lifetimes, survived), each of shape (L, K).
+    """
+    L, K, steps = Sv.shape
+    L_mean = np.zeros((L, K), dtype=float)
+    L_median = np.zeros((L, K), dtype=float)
+    lifetimes = np.zeros((L, K), dtype=int)
+    survived = np.zeros((L, K), dtype=bool)
+    for l in range(L):
+        for k in range(K):
+            L_mean[l, k], L_median[l, k] = _compute_persistence_lengths(dir_sign[l, k])
+
+            # Lifetime / evaporation
+            # Define "aligned" as Sv >= f_min; evaporated when Sv < f_min for
+            # evap_window consecutive steps.
+            below = Sv[l, k] < f_min
+            run_length = 0
+            ev_step = None
+            for t in range(steps):
+                if below[t]:
+                    run_length += 1
+                    if run_length >= evap_window:
+                        ev_step = t
+                        break
+                else:
+                    run_length = 0
+            if ev_step is None:
+                lifetimes[l, k] = steps
+                survived[l, k] = True
+            else:
+                lifetimes[l, k] = ev_step
+                survived[l, k] = False
+    return L_mean, L_median, lifetimes, survived
+
+
+def run_ensemble_for_sizes(
+    cfg: TopLevelConfig,
+    W_coh: float,
+    sizes: Sequence[int],
+    seed_offset: int = 0,
+    timer: Optional[StageTimer] = None,
+    heartbeat: Optional[Heartbeat] = None,
+    alloc: Callable[..., np.ndarray] = np.zeros,
+) -> List[List[Dict[str, np.ndarray]]]:
+    """Run one ensemble of max(sizes)-thread bundles at fixed W_coh.
+
+    The observables of each bundle size k in *sizes* are taken from the
+    prefix sub-bundle made of the first k threads, so a single simulation of
+    the largest bundle yields the whole N series. With sizes == [N] this is
+    an ordinary (W_coh, N) run. Callers must only pass several sizes when
+    check_nested_sizes(cfg) accepts the config.
+
+    If *timer* is given, per-stage wall/CPU times (stepping, derive,
+    statistics, phase) and step/flip counters are accumulated into it.
+    If *heartbeat* is given, it is kept up to date with the member steps
+    done (within members for the NumPy loops, per member otherwise).
+
+    Phases are evolved after all members are stepped, in one batch over
+    replicas and members, from the recorded S_v series.
+
+    In the local coupling mode all members are stepped together: their
+    initial states are drawn first, member by member, and then each step
+    draws one (n_ens, N) block of uniforms. The series go straight into the
+    result arrays; only the COM velocity signs are kept on the side, one
+    bit per step, for the persistence statistics.
+
+    With a heterogeneous slip law the per-thread slip probabilities of all
+    members are drawn up front from a generator of their own (so the
+    direction stream is unchanged) and stored in the results as "slip_q"
+    and "slip_<parameter>", shape (n_ens, N) for each bundle size N.
+
+    With ensemble.antithetic, odd members mirror the even member before
+    them (see _MemberStarts): reversed initial state and 1 - u for every
+    flip uniform, with the same per-thread slip probabilities; even members
+    are the ones a plain run would give its members 0, 1, ...
+
+    The large per-step arrays (acceleration, flips, S_v, S_theta) are
+    allocated with *alloc* (np.zeros semantics), e.g. SharedArena.zeros
+    in worker processes.
+
+    Returns results[l][k]: one result dictionary per lambda replica and
+    bundle size, in config order.
+    """
+    sizes_arr = np.asarray(sizes, dtype=int)
+    N = int(sizes_arr.max())
+    K = sizes_arr.size
+    seed = cfg.random_seed + seed_offset + int(W_coh) + N
+    rng = _init_rng(seed)
+
+    lambdas = coupling_strengths(cfg.bundle_coupling)
+    L = len(lambdas)
 
     n_ens = cfg.ensemble.n_ensembles
     steps = int(cfg.ensemble.steps_per_wcoh * W_coh)
 
+    # Slip law, coupling mode and p_stay table (and for the local mode the
+    # thread graph) are resolved once per pair.
+    plan = build_kernel_plan(W_coh, N, cfg.kernel, cfg.bundle_coupling, members=n_ens)
+    local_engine = plan.graph is not None
+
+    heterogeneous = has_slip_heterogeneity(cfg)
+    if heterogeneous:
+        q_threads, slip_values = _thread_slip(cfg, W_coh, n_ens, N, seed)
+    if cfg.ensemble.antithetic:
+        check_antithetic(cfg)
+    starts = _MemberStarts(cfg, N, rng)
+
     # Pre-allocate arrays for aggregated statistics
     # We'll keep acceleration per ensemble, then average in analysis.
-    acc_all = np.zeros((n_ens, steps - 1), dtype=float)
-    flips_all = np.zeros((n_ens, steps), dtype=int)
-    Sv_all = np.zeros((n_ens, steps), dtype=float)
+    acc_all = alloc((L, K, n_ens, steps - 1), dtype=float)
+    flips_all = alloc((L, K, n_ens, steps), dtype=int)
+    Sv_all = alloc((L, K, n_ens, steps), dtype=float)
 
     if cfg.phase_dynamics.enabled:
-        Stheta_all = np.zeros((n_ens, steps), dtype=float)
+        Stheta_all = alloc((L, K, n_ens, steps), dtype=float)
     else:
         Stheta_all = None
 
-    lifetimes = np.zeros(n_ens, dtype=int)
-    survived = np.zeros(n_ens, dtype=bool)
+    lifetimes = np.zeros((L, K, n_ens), dtype=int)
+    survived = np.zeros((L, K, n_ens), dtype=bool)
+    # COM velocity of the first hop; with the accelerations this gives the
+    # whole velocity series back (analysis.com_velocity).
+    V0_all = np.zeros((L, K, n_ens), dtype=float)
 
     # Persistence-length statistics (per-ensemble)
     # L_persist_* are in hop units (number of steps with approximately
     # constant COM direction).
-    L_persist_mean_all = np.zeros(n_ens, dtype=float)
-    L_persist_median_all = np.zeros(n_ens, dtype=float)
+    L_persist_mean_all = np.zeros((L, K, n_ens), dtype=float)
+    L_persist_median_all = np.zeros((L, K, n_ens), dtype=float)
 
     # Lifetime parameters
     f_min = cfg.analysis.lifetime.f_min
     evap_window = cfg.analysis.lifetime.evap_window
 
-    for e in range(n_ens):
-        state = _init_bundle_state(N, rng)
-        phase_state = _init_phase_state(N, rng)
-
-        X = np.zeros(steps, dtype=float)
-        V = np.zeros(steps, dtype=float)
-        Sv = np.zeros(steps, dtype=float)
-        Sth = np.zeros(steps, dtype=float) if cfg.phase_dynamics.enabled else None
-        flips = np.zeros(steps, dtype=int)
-        # COM direction sign per step: -1, 0, or +1
-        dir_sign = np.zeros(steps, dtype=int)
-
-        evaporated_step = None
-
-        for t in range(steps):
-            # Record COM position & alignment before step
-            X[t] = state.x.mean()
-            mean_v = state.v.mean()
-            Sv[t] = abs(mean_v)
-            # Direction sign: -1 for predominantly negative, +1 for positive, 0 if exactly balanced
-            if mean_v > 0:
-                dir_sign[t] = 1
-            elif mean_v < 0:
-                dir_sign[t] = -1
-            else:
-                dir_sign[t] = 0
-            if cfg.phase_dynamics.enabled:
-                # Phase alignment indicator
-                Sth[t] = abs(np.exp(1j * phase_state.theta).mean())
-
-            # Advance one step
-            state, n_flips = step_soft_rudder_bundle(
-                state,
-                W_coh=W_coh,
-                kernel_cfg=cfg.kernel,
-                coupling_cfg=cfg.bundle_coupling,
-                rng=rng,
-            )
-            flips[t] = n_flips
-
-            # Update phases
-            phase_state = update_phases(
-                phase_state,
-                bundle_state=state,
-                W_coh=W_coh,
-                cfg=cfg.phase_dynamics,
+    bitpacked_engine = resolve_engine(cfg, K) == "bitpacked"
+    use_numba = not bitpacked_engine and resolve_backend(cfg) == "numba"
+    stats_fn = jit.member_statistics if use_numba else _member_statistics
+
+    if timer is None:
+        timer = StageTimer()
+
+    if cfg.phase_dynamics.enabled:
+        # Initial phases of every member, shared by all replicas; evolved
+        # after stepping by run_phase_engine.
+        theta_all = np.zeros((L, n_ens, N), dtype=float)
+
+    if local_engine:
+        with timer.stage("stepping"):
+            v0 = np.zeros((n_ens, N), dtype=int)
+            for e in range(n_ens):
+                state0, phase0, _ = starts.member(e)
+                v0[e] = state0.v
+                if cfg.phase_dynamics.enabled:
+                    theta_all[:, e, :] = phase0.theta
+            if heterogeneous:
+                set_thread_slip(plan, q_threads)
+            if heartbeat is not None:
+                heartbeat.begin(0, 0, scale=n_ens)
+            local_rng = _MirroredRows(rng) if cfg.ensemble.antithetic else rng
+            # Local plans hold a single bundle size (K == 1).
+            local_positive = _run_members_local(
+                plan, v0, steps, local_rng,
+                acc_all[:, 0], V0_all[:, 0], flips_all[:, 0], Sv_all[:, 0], heartbeat,
             )
 
-        # Derive velocities and accelerations for this ensemble member
-        V[:-1] = np.diff(X)
-        a = np.diff(V)  # length steps-2
-        acc_all[e, :] = a
-        flips_all[e, :] = flips
-        Sv_all[e, :] = Sv
-        if cfg.phase_dynamics.enabled:
-            Stheta_all[e, :] = Sth
-
-        # Persistence length statistics for this ensemble member
-        L_mean, L_median = _compute_persistence_lengths(dir_sign)
-        L_persist_mean_all[e] = L_mean
-        L_persist_median_all[e] = L_median
-
-        # Lifetime / evaporation
-        # Define "aligned" as Sv >= f_min; evaporated when Sv < f_min for
-        # evap_window consecutive steps.
-        below = Sv < f_min
-        run_length = 0
-        ev_step = None
-        for t in range(steps):
-            if below[t]:
-                run_length += 1
-                if run_length >= evap_window:
-                    ev_step = t
-                    break
-            else:
-                run_length = 0
-        if ev_step is None:
-            lifetimes[e] = steps
-            survived[e] = True
+    for e in range(n_ens):
+        if local_engine:
+            # Series already in the result arrays; only statistics remain.
+            Sv = Sv_all[:, :, e]
+            dir_sign = _unpack_dir_sign(local_positive[:, e], Sv[:, 0])[:, None]
         else:
-            lifetimes[e] = ev_step
-            survived[e] = False
-
-    result: Dict[str, np.ndarray] = {
-        "acceleration": acc_all,
-        "flips": flips_all,
-        "Sv": Sv_all,
-        "lifetimes": lifetimes,
-        "survived": survived,
-        "L_persist_mean": L_persist_mean_all,
-        "L_persist_median": L_persist_median_all,
-    }
-    if cfg.phase_dynamics.enabled and Stheta_all is not None:
-        result["Stheta"] = Stheta_all
-    return result
+            if heartbeat is not None:
+                heartbeat.begin(e, e * steps)
+            with timer.stage("stepping"):
+                if bitpacked_engine:
+                    X, Sv, flips, dir_sign = bitpacked.run_member(plan, steps, rng)
+                else:
+                    state0, phase0, member_rng = starts.member(e)
+                    if cfg.phase_dynamics.enabled:
+                        theta_all[:, e, :] = phase0.theta
+                    if heterogeneous:
+                        set_thread_slip(plan, q_threads[e])
+                    if use_numba:
+                        X, Sv, flips, dir_sign = jit.run_member(plan, state0.v, sizes_arr, steps, member_rng)
+                    else:
+                        X, Sv, flips, dir_sign = _run_member_numpy(
+                            plan, state0, sizes_arr, steps, member_rng, heartbeat
+                        )
+
+            with timer.stage("derive"):
+                # Derive velocities and accelerations for this ensemble member
+                V = np.zeros((L, K, steps), dtype=float)
+                V[..., :-1] = np.diff(X, axis=-1)
+                a = np.diff(V, axis=-1)  # length steps-1
+                acc_all[:, :, e, :] = a
+                V0_all[:, :, e] = V[..., 0]
+                flips_all[:, :, e, :] = flips
+                Sv_all[:, :, e, :] = Sv
 
+        with timer.stage("statistics"):
+            # Persistence length and lifetime statistics for this ensemble member
+            L_mean, L_median, member_life, member_surv = stats_fn(dir_sign, Sv, f_min, evap_window)
+            L_persist_mean_all[:, :, e] = L_mean
+            L_persist_median_all[:, :, e] = L_median
+            lifetimes[:, :, e] = member_life
+            survived[:, :, e] = member_surv
 
-def write_metadata(cfg: TopLevelConfig, out_dir: str) -> None:
+    if cfg.phase_dynamics.enabled:
+        with timer.stage("phase"):
+            Stheta_all[:, 0] = _run_phases(cfg, theta_all, Sv_all[:, 0, :, 1:], W_coh, seed)
+
+    timer.count("member_steps", L * n_ens * steps)
+    timer.count("thread_steps", L * n_ens * steps * N)
+    if local_engine:
+        timer.count("edge_steps", L * n_ens * steps * int(plan.graph.indices.size))
+    # Flips of the full bundle (the largest size) in every replica.
+    timer.count("flips", flips_all[:, int(sizes_arr.argmax())].sum())
+
+    results: List[List[Dict[str, np.ndarray]]] = []
+    for l in range(L):
+        per_size: List[Dict[str, np.ndarray]] = []
+        for k in range(K):
+            result: Dict[str, np.ndarray] = {
+                "acceleration": acc_all[l, k],
+                "flips": flips_all[l, k],
+                "Sv": Sv_all[l, k],
+                "lifetimes": lifetimes[l, k],
+                "survived": survived[l, k],
+                "L_persist_mean": L_persist_mean_all[l, k],
+                "L_persist_median": L_persist_median_all[l, k],
+                "V0": V0_all[l, k],
+            }
+            if cfg.phase_dynamics.enabled and Stheta_all is not None:
+                result["Stheta"] = Stheta_all[l, k]
+            if heterogeneous:
+                n_k = int(sizes_arr[k])
+                result["slip_q"] = q_threads[:, :n_k]
+                result[f"slip_{cfg.kernel.slip_law.heterogeneity.parameter}"] = slip_values[:, :n_k]
+            per_size.append(result)
+        results.append(per_size)
+    return results
+
+
+def lambda_dir_name(lam: float) -> str:
+    """Subdirectory name for one lambda replica of a coupling sweep."""
+    return f"lambda{lam:g}"
+
+
+def write_metadata(
+    cfg: TopLevelConfig,
+    out_dir: str,
+    timing: Optional[Dict[str, Any]] = None,
+) -> None:
     """Write a simple metadata.json file with config and basic info.
 
     We do not attempt to query git here; a commit hash can be added manually
-    or by a wrapper script if needed.
+    or by a wrapper script if needed. If *timing* is given (see run_all) it
+    is stored under the "timing" key.
     """
     meta = {
         "model_name": cfg.model_name,
@@ -242,28 +939,438 @@ def write_metadata(cfg: TopLevelConfig, out_dir: str) -> None:
             "beta_fit": asdict(cfg.analysis.beta_fit),
             "kappa_eff": asdict(cfg.analysis.kappa_eff),
             "lifetime": asdict(cfg.analysis.lifetime),
+            "bootstrap": asdict(cfg.analysis.bootstrap),
+            "autocorrelation": asdict(cfg.analysis.autocorrelation),
+            "sketch": asdict(cfg.analysis.sketch),
+            "control_variate": asdict(cfg.analysis.control_variate),
         },
+        "execution": asdict(cfg.execution),
+        "sweep": asdict(cfg.sweep),
     }
+    if timing is not None:
+        meta["timing"] = timing
     os.makedirs(out_dir, exist_ok=True)
     meta_path = os.path.join(out_dir, "metadata.json")
     with open(meta_path, "w", encoding="utf-8") as fh:
         json.dump(meta, fh, indent=2)
 
 
-def run_all(cfg: TopLevelConfig) -> None:
-    """Run simulations for all (W_coh, N) pairs in cfg.
+def simulation_units(cfg: TopLevelConfig) -> List[Tuple[float, List[int]]]:
+    """The (W_coh, sizes) simulation units of cfg, in run order.
 
-    Saves one NumPy .npz file per pair, plus a metadata.json in the
-    top-level output directory.
+    Without nested bundle sizes every (W_coh, N) pair is its own unit; with
+    ensemble.nested_bundle_sizes each W_coh is one unit at all sizes.
+    """
+    if cfg.ensemble.nested_bundle_sizes:
+        # Simulate only the largest bundle; smaller N are prefix sub-bundles.
+        check_nested_sizes(cfg)
+        size_groups = [list(cfg.bundle_sizes)]
+    else:
+        size_groups = [[N] for N in cfg.bundle_sizes]
+    return [(W_coh, sizes) for W_coh in cfg.wcoh_grid for sizes in size_groups]
+
+
+def unit_signature(cfg: TopLevelConfig, W_coh: float, sizes: Sequence[int]) -> str:
+    """Hash of everything that determines the arrays of one simulation unit.
+
+    Two units with the same signature produce identical outputs, whatever
+    config, model name or output directory they come from. The stepping
+    backend is left out because both backends give identical results.
     """
+    key = {
+        "random_seed": cfg.random_seed,
+        "W_coh": float(W_coh),
+        "sizes": [int(N) for N in sizes],
+        "ensemble": asdict(cfg.ensemble),
+        "kernel": asdict(cfg.kernel),
+        "bundle_coupling": {
+            "mode": cfg.bundle_coupling.mode,
+            "coupling_strength": [float(lam) for lam in coupling_strengths(cfg.bundle_coupling)],
+        },
+        "phase_dynamics": asdict(cfg.phase_dynamics),
+        "lifetime": asdict(cfg.analysis.lifetime),
+        "engine": resolve_engine(cfg, len(sizes)),
+    }
+    if cfg.bundle_coupling.mode == "local":
+        key["bundle_coupling"]["local_law"] = cfg.bundle_coupling.local_law
+        key["bundle_coupling"]["graph"] = asdict(cfg.bundle_coupling.graph)
+    blob = json.dumps(key, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()[:16]
+
+
+def _tree_config(cfg: TopLevelConfig, lam: float, tree_dir: str) -> TopLevelConfig:
+    """Config of the lambda replica of a coupling-strength sweep."""
+    return replace(
+        cfg,
+        output_dir=tree_dir,
+        bundle_coupling=replace(cfg.bundle_coupling, coupling_strength=lam),
+    )
+
+
+def _prepare_output_tree(cfg: TopLevelConfig) -> List[str]:
+    """Create output_dir (and lambda subtrees) with metadata; return tree dirs."""
     out_dir = cfg.output_dir
     os.makedirs(out_dir, exist_ok=True)
     write_metadata(cfg, out_dir)
+    # A fresh progress stream for this run (see cli status).
+    progress_path = os.path.join(out_dir, PROGRESS_FILE)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+
+    if not is_lambda_sweep(cfg.bundle_coupling):
+        _drop_stale_summary(cfg, out_dir)
+        return [out_dir]
+    tree_dirs = []
+    for lam in coupling_strengths(cfg.bundle_coupling):
+        tree_dir = os.path.join(out_dir, lambda_dir_name(lam))
+        write_metadata(_tree_config(cfg, lam, tree_dir), tree_dir)
+        _drop_stale_summary(cfg, tree_dir)
+        tree_dirs.append(tree_dir)
+    return tree_dirs
+
+
+def _drop_stale_summary(cfg: TopLevelConfig, tree_dir: str) -> None:
+    """With execution.analyse, summary.json is rebuilt pair by pair; start afresh."""
+    path = os.path.join(tree_dir, SUMMARY_FILE)
+    if cfg.execution.analyse and os.path.exists(path):
+        os.remove(path)
+
+
+def _unit_progress(cfg: TopLevelConfig, W_coh: float, sizes: Sequence[int]) -> Dict[str, Any]:
+    """Unit name and the totals a Heartbeat of this unit reports against."""
+    n_ens = cfg.ensemble.n_ensembles
+    return {
+        "unit": f"W{int(W_coh)}_N{max(sizes)}",
+        "total_steps": n_ens * int(cfg.ensemble.steps_per_wcoh * W_coh),
+        "n_members": n_ens,
+        "threads": max(sizes) * len(coupling_strengths(cfg.bundle_coupling)),
+    }
+
+
+def _simulate_unit(
+    cfg: TopLevelConfig,
+    W_coh: float,
+    sizes: List[int],
+    profile_dir: Optional[str] = None,
+    progress_paths: Sequence[str] = (),
+    alloc: Callable[..., np.ndarray] = np.zeros,
+    analyse_for: Sequence[Tuple[TopLevelConfig, Sequence[str]]] = (),
+) -> Tuple[List[List[Dict[str, np.ndarray]]], StageTimer, float, Dict[str, Dict[str, float]]]:
+    """Simulate one unit; returns (results, timer, wall seconds, summaries).
+
+    A module-level function so that it can be sent to worker processes.
+    Heartbeats go to every file in *progress_paths*. *alloc* allocates the
+    per-step result arrays of full (not lifetime-only) runs.
+
+    For every (config, tree_dirs) in *analyse_for* the pairs are analysed
+    here, straight from the arrays (see _analyse_unit); summaries maps
+    their pair directories to the analyse_arrays dictionaries.
+    """
+    timer = StageTimer()
+    w0 = time.perf_counter()
+    heartbeat = None
+    if progress_paths:
+        heartbeat = Heartbeat(
+            progress_paths, interval_s=cfg.execution.progress_interval_s, **_unit_progress(cfg, W_coh, sizes)
+        )
+        heartbeat.emit("start")
+
+    def simulate():
+        if cfg.analysis.lifetime.lifetime_only:
+            return run_lifetimes_for_sizes(cfg, W_coh=W_coh, sizes=sizes, timer=timer, heartbeat=heartbeat)
+        return run_ensemble_for_sizes(cfg, W_coh=W_coh, sizes=sizes, timer=timer, heartbeat=heartbeat, alloc=alloc)
+
+    if profile_dir is not None:
+        results = profile_call(simulate, profile_dir, f"W{int(W_coh)}_N{max(sizes)}")
+    else:
+        results = simulate()
+    summaries = _analyse_unit(analyse_for, W_coh, sizes, results, timer)
+    if heartbeat is not None:
+        heartbeat.finish()
+    return results, timer, time.perf_counter() - w0, summaries
+
+
+def _analyse_unit(
+    consumers: Sequence[Tuple[TopLevelConfig, Sequence[str]]],
+    W_coh: float,
+    sizes: Sequence[int],
+    results: List[List[Dict[str, np.ndarray]]],
+    timer: StageTimer,
+) -> Dict[str, Dict[str, float]]:
+    """Analyse the in-memory results of one unit for each consumer config.
+
+    Derived files (band amplitudes, flip distributions, sketches) go to
+    the consumer's pair directories; returns {pair_dir: summary}. The
+    lambda = 0 replica goes first, as the control of the others
+    (analysis.control_variate).
+    """
+    summaries = {}
+    with timer.stage("analyse"):
+        for cfg, tree_dirs in consumers:
+            trees = list(zip(coupling_strengths(cfg.bundle_coupling), tree_dirs, results))
+            for lam, tree_dir, per_size in sorted(trees, key=lambda tree: tree[0] != 0.0):
+                tree_cfg = _tree_config(cfg, lam, tree_dir) if is_lambda_sweep(cfg.bundle_coupling) else cfg
+                for N, data in zip(sizes, per_size):
+                    pair_dir = os.path.join(tree_dir, f"W{int(W_coh)}_N{N}")
+                    os.makedirs(pair_dir, exist_ok=True)
+                    summaries[pair_dir] = analyse_arrays(tree_cfg, data, pair_dir)
+    return summaries
+
+
+def _simulate_unit_shared(
+    cfg: TopLevelConfig,
+    W_coh: float,
+    sizes: List[int],
+    progress_paths: Sequence[str] = (),
+    analyse_for: Sequence[Tuple[TopLevelConfig, Sequence[str]]] = (),
+) -> Tuple[List[List[Dict[str, Any]]], StageTimer, float, Dict[str, Dict[str, float]]]:
+    """Worker form of _simulate_unit with the result arrays in shared memory.
+
+    Returns the results with every shared array replaced by a
+    SharedArrayRef; the parent maps them with sharedmem.attach_results.
+    """
+    arena = SharedArena()
+    results, timer, wall, summaries = _simulate_unit(
+        cfg, W_coh, sizes, None, progress_paths, alloc=arena.zeros, analyse_for=analyse_for
+    )
+    refs = arena.export(results)
+    del results
+    arena.release()
+    return refs, timer, wall, summaries
+
+
+def _write_unit(
+    cfg: TopLevelConfig,
+    tree_dirs: Sequence[str],
+    W_coh: float,
+    sizes: Sequence[int],
+    results: List[List[Dict[str, np.ndarray]]],
+    sim_timer: StageTimer,
+    sim_wall: float,
+) -> Dict[str, Any]:
+    """Write the npz files and timing.json of one unit; return its record.
+
+    Without execution.keep_timeseries only the pyramids (if enabled) and
+    timing.json are written.
+    """
+    timer = StageTimer()
+    timer.merge(sim_timer)
+    w0 = time.perf_counter()
+    pair_dirs = []
+    with timer.stage("write"):
+        for tree_dir, per_size in zip(tree_dirs, results):
+            for N, data in zip(sizes, per_size):
+                pair_dir = os.path.join(tree_dir, f"W{int(W_coh)}_N{N}")
+                os.makedirs(pair_dir, exist_ok=True)
+                if cfg.execution.keep_timeseries:
+                    out_path = os.path.join(pair_dir, TIMESERIES_FILE)
+                    np.savez_compressed(out_path, **data)
+                    timer.count("bytes_written", os.path.getsize(out_path))
+                    timer.count("array_bytes", sum(a.nbytes for a in data.values()))
+                if cfg.execution.pyramid and "acceleration" in data:
+                    pyr_path = write_pyramid(pair_dir, data, N, cfg.execution.pyramid_min_factor)
+                    timer.count("bytes_written", os.path.getsize(pyr_path))
+                pair_dirs.append(pair_dir)
+
+    record = timer.to_dict()
+    record.update(
+        {
+            "W_coh": W_coh,
+            "bundle_sizes": list(sizes),
+            "n_lambdas": len(coupling_strengths(cfg.bundle_coupling)),
+            "backend": resolve_backend(cfg),
+            "engine": resolve_engine(cfg, len(sizes)),
+            "wall_s": sim_wall + time.perf_counter() - w0,
+            "peak_rss_MB": peak_rss_mb(),
+            "pair_dirs": [os.path.relpath(d, cfg.output_dir) for d in pair_dirs],
+        }
+    )
+    for pair_dir in pair_dirs:
+        with open(os.path.join(pair_dir, "timing.json"), "w", encoding="utf-8") as fh:
+            json.dump(record, fh, indent=2)
+    return record
+
+
+def _finish_run(cfg: TopLevelConfig, unit_timing: Dict[str, Dict[str, Any]]) -> None:
+    """Rewrite metadata.json with the unit records and run totals."""
+    run_timer = StageTimer()
+    for rec in unit_timing.values():
+        for name, st in rec["stages"].items():
+            run_timer.add(name, st["wall_s"], st["cpu_s"])
+        for name, n in rec["counters"].items():
+            run_timer.count(name, n)
+    totals = run_timer.to_dict()
+    totals["wall_s"] = sum(rec["wall_s"] for rec in unit_timing.values())
+    totals["peak_rss_MB"] = peak_rss_mb()
+    write_metadata(cfg, cfg.output_dir, timing={"units": unit_timing, "total": totals})
+
+
+def run_all(cfg: TopLevelConfig, profile: bool = False) -> None:
+    """Run simulations for all (W_coh, N) pairs in cfg.
+
+    Saves one NumPy .npz file per pair, plus a metadata.json in the
+    top-level output directory.
+
+    If coupling_strength is a list, every lambda gets its own output tree
+    under output_dir/lambda<value>/ with a scalar-lambda metadata.json, so
+    each tree can be analysed exactly like a single-lambda run.
+
+    With ensemble.nested_bundle_sizes, each W_coh is simulated once at the
+    largest bundle size and the smaller sizes are derived from prefix
+    sub-bundles of the same threads.
+
+    Every simulation unit is instrumented: per-stage wall/CPU times, step and
+    flip counters, bytes written and peak RSS go to a timing.json in each
+    pair directory and, with run totals, into metadata.json. With
+    profile=True the unit with the largest predicted cost (steps x N) is
+    also run under cProfile and tracemalloc, with dumps in output_dir/profile.
+
+    While the run is going, progress records (queued units, then throttled
+    heartbeats of the running ones) are appended to output_dir/progress.jsonl;
+    `cli status` summarises them.
+    """
+    run_batch([cfg], jobs=1, profile=profile)
+
+
+def run_batch(
+    cfgs: Sequence[TopLevelConfig],
+    jobs: int = 1,
+    profile: bool = False,
+) -> Dict[str, int]:
+    """Run several configs as one queue of simulation units.
+
+    Units from all configs go into a single queue, largest predicted cost
+    first, served by *jobs* worker processes (jobs=1 runs in this process).
+    Units with the same unit_signature are simulated once and their results
+    written to every output tree that needs them; the timing record of each
+    copy carries the signature in "unit_id" and the simulating config in
+    "simulated_by". Each config's outputs are the same as from run_all.
+
+    With profile=True the costliest unit of the batch is run in this
+    process under cProfile and tracemalloc, with dumps in
+    <its output_dir>/profile.
+
+    With jobs > 1 and execution.shared_results (the default), workers
+    allocate the per-step result arrays in shared memory and return only
+    descriptors; this process writes the npz files straight from the
+    shared blocks and then frees them (see bcqm_bundles.sharedmem).
+
+    A config with sweep axes is expanded into one config per sweep point
+    (see bcqm_bundles.sweep), each counted as a config of the batch.
+
+    Configs with execution.analyse have every pair analysed where it was
+    simulated, from the arrays still in memory, and their summary.json
+    rewritten as pairs complete; the bootstrap stage is added once the
+    run is done, so the final summary.json equals that of `cli analyse`.
+    With execution.keep_timeseries false, timeseries.npz is not written.
+
+    Returns counts of configs, units requested and units simulated.
+    """
+    cfgs = [point for cfg in cfgs for point in sweep_configs(cfg)]
+    out_dirs = [os.path.abspath(cfg.output_dir) for cfg in cfgs]
+    if len(set(out_dirs)) != len(out_dirs):
+        raise ValueError("Configs in a batch must have distinct output_dir values")
+
+    # signature -> (cfg, W_coh, sizes, [(config index, tree_dirs)])
+    queue: Dict[str, Tuple[TopLevelConfig, float, List[int], List[Tuple[int, List[str]]]]] = {}
+    n_requested = 0
+    cfg_tree_dirs = []
+    for i, cfg in enumerate(cfgs):
+        tree_dirs = _prepare_output_tree(cfg)
+        cfg_tree_dirs.append(tree_dirs)
+        for W_coh, sizes in simulation_units(cfg):
+            sig = unit_signature(cfg, W_coh, sizes)
+            if sig not in queue:
+                queue[sig] = (cfg, W_coh, sizes, [])
+            queue[sig][3].append((i, tree_dirs))
+            n_requested += 1
+
+    def cost(sig: str) -> float:
+        cfg, W_coh, sizes, _ = queue[sig]
+        return W_coh * max(sizes) * len(coupling_strengths(cfg.bundle_coupling)) * cfg.ensemble.n_ensembles
+
+    order = sorted(queue, key=cost, reverse=True)
+    hottest = order[0] if profile and order else None
+
+    def progress_paths(sig: str) -> List[str]:
+        return [os.path.join(cfgs[i].output_dir, PROGRESS_FILE) for i, _ in queue[sig][3]]
+
+    for sig in order:
+        cfg, W_coh, sizes, _ = queue[sig]
+        record = _unit_progress(cfg, W_coh, sizes)
+        record.update(event="queued", time=time.time(), pid=os.getpid(), member=0, steps_done=0)
+        append_progress(progress_paths(sig), record)
+    unit_timing: List[Dict[str, Dict[str, Any]]] = [{} for _ in cfgs]
+    # tree_dir -> {pair dir name: summary} of the configs analysed in the run
+    tree_summaries: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def analyse_for(sig: str) -> List[Tuple[TopLevelConfig, List[str]]]:
+        return [(cfgs[i], tree_dirs) for i, tree_dirs in queue[sig][3] if cfgs[i].execution.analyse]
+
+    def write(sig: str, results, timer: StageTimer, wall: float, summaries: Dict[str, Dict[str, float]]) -> None:
+        cfg, W_coh, sizes, consumers = queue[sig]
+        for i, tree_dirs in consumers:
+            record = _write_unit(cfgs[i], tree_dirs, W_coh, sizes, results, timer, wall)
+            record["unit_id"] = sig
+            record["simulated_by"] = cfg.model_name
+            unit_timing[i][f"W{int(W_coh)}_N{max(sizes)}"] = record
+            if not cfgs[i].execution.analyse:
+                continue
+            for tree_dir in tree_dirs:
+                pairs = tree_summaries.setdefault(tree_dir, {})
+                for N in sizes:
+                    name = f"W{int(W_coh)}_N{N}"
+                    pairs[name] = summaries[os.path.join(tree_dir, name)]
+                write_summary(tree_dir, run_summary(cfgs[i], tree_dir, pairs, bootstrap=False))
+
+    def simulate_here(sig: str) -> None:
+        cfg, W_coh, sizes, _ = queue[sig]
+        profile_dir = os.path.join(cfg.output_dir, "profile") if sig == hottest else None
+        write(sig, *_simulate_unit(cfg, W_coh, sizes, profile_dir, progress_paths(sig), analyse_for=analyse_for(sig)))
+
+    if jobs <= 1:
+        for sig in order:
+            simulate_here(sig)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {}
+            for sig in order:
+                if sig == hottest:
+                    continue
+                cfg, W_coh, sizes, _ = queue[sig]
+                if cfg.execution.shared_results:
+                    fut = pool.submit(
+                        _simulate_unit_shared, cfg, W_coh, sizes, progress_paths(sig), analyse_for(sig)
+                    )
+                else:
+                    fut = pool.submit(
+                        _simulate_unit, cfg, W_coh, sizes, None, progress_paths(sig), analyse_for=analyse_for(sig)
+                    )
+                futures[fut] = sig
+            if hottest is not None:
+                simulate_here(hottest)
+            for fut in as_completed(futures):
+                sig = futures[fut]
+                results, timer, wall, summaries = fut.result()
+                if not queue[sig][0].execution.shared_results:
+                    write(sig, results, timer, wall, summaries)
+                    continue
+                results, blocks = attach_results(results)
+                try:
+                    write(sig, results, timer, wall, summaries)
+                finally:
+                    del results
+                    free_blocks(blocks)
 
-    for W_coh in cfg.wcoh_grid:
-        for N in cfg.bundle_sizes:
-            pair_dir = os.path.join(out_dir, f"W{int(W_coh)}_N{N}")
-            os.makedirs(pair_dir, exist_ok=True)
-            data = run_ensemble_for_pair(cfg, W_coh=W_coh, N=N)
-            out_path = os.path.join(pair_dir, "timeseries.npz")
-            np.savez_compressed(out_path, **data)
+    for i, cfg in enumerate(cfgs):
+        # Keep the unit records in run order regardless of completion order.
+        records = unit_timing[i]
+        ordered = {}
+        for W_coh, sizes in simulation_units(cfg):
+            key = f"W{int(W_coh)}_N{max(sizes)}"
+            ordered[key] = records[key]
+        _finish_run(cfg, ordered)
+        if cfg.execution.analyse:
+            for tree_dir in cfg_tree_dirs[i]:
+                write_summary(tree_dir, run_summary(cfg, tree_dir, tree_summaries.get(tree_dir, {})))
+    return {"configs": len(cfgs), "units": n_requested, "simulated": len(queue)}
@@ -0,0 +1,204 @@
+"""Mergeable quantile sketches for per-member statistics.
+
+Medians of lifetimes, persistence lengths or band amplitudes need every
+per-member value in memory, and medians of shards cannot be combined.
+A KLL sketch (Karnin, Lang & Liberty 2016) keeps a few hundred weighted
+samples instead: level h holds items of weight 2^h, and a level that
+outgrows its capacity is sorted and every other item (random offset) is
+promoted to the level above. Sketches of shards merge level by level, the
+rank error stays about 1.7 / k of n for any stream length, and the exact
+count, sum, minimum and maximum are carried along.
+
+analyse writes one sketch per statistic to sketches.json in each pair
+directory; read_sketches / merge_sketches combine them across shards.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+
+SKETCHES_FILE = "sketches.json"
+
+# Capacity ratio between neighbouring levels.
+_LEVEL_RATIO = 2.0 / 3.0
+
+# Values taken into level 0 between compressions by KLLSketch.update, in
+# multiples of k.
+_UPDATE_CHUNK = 8
+
+
+class KLLSketch:
+    """KLL quantile sketch of a stream of floats.
+
+    Parameters
+    ----------
+    k : int
+        Capacity of the top level; the rank error is about 1.7 / k.
+    seed : int or sequence of ints
+        Seed of the coin flips that pick which half of a level survives.
+        Sketches that will be merged should not share it (see
+        write_pair_sketches, which derives it from the data).
+    """
+
+    def __init__(self, k: int = 200, seed: Any = 0) -> None:
+        if k < 2:
+            raise ValueError("KLLSketch k must be >= 2")
+        self.k = int(k)
+        self.levels: List[np.ndarray] = [np.empty(0, dtype=float)]
+        self.n = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(2, int(np.ceil(self.k * _LEVEL_RATIO**depth)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if level.size <= self._capacity(h):
+                h += 1
+                continue
+            grew = h + 1 == len(self.levels)
+            if grew:
+                self.levels.append(np.empty(0, dtype=float))
+            level = np.sort(level)
+            # An odd item out stays behind so that weights are conserved.
+            keep = level[-1:] if level.size % 2 else level[:0]
+            pairs = level[: level.size - keep.size]
+            promoted = pairs[int(self._rng.integers(2)) :: 2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            # A new top level lowers the capacity of every level below it.
+            h = 0 if grew else h + 1
+
+    def update(self, values: Any) -> "KLLSketch":
+        """Add values (any array-like); NaNs are ignored.
+
+        Values go in _UPDATE_CHUNK * k at a time, compressing after each
+        chunk, so the sketch never holds more than O(k) items however large
+        the batch.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        step = _UPDATE_CHUNK * self.k
+        for start in range(0, values.size, step):
+            chunk = values[start:start + step]
+            chunk = chunk[~np.isnan(chunk)]
+            if not chunk.size:
+                continue
+            self.n += chunk.size
+            self.sum += float(chunk.sum())
+            self.min = min(self.min, float(chunk.min()))
+            self.max = max(self.max, float(chunk.max()))
+            self.levels[0] = np.concatenate([self.levels[0], chunk])
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold another sketch into this one (in place)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=float))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    @property
+    def mean(self) -> float:
+        """Exact mean of every value added."""
+        return self.sum / self.n if self.n else float("nan")
+
+    def quantile(self, q: Any) -> Any:
+        """Approximate q-quantile(s), q in [0, 1]; exact min / max at 0 and 1."""
+        q_arr = np.asarray(q, dtype=float)
+        if not self.n:
+            return np.full(q_arr.shape, np.nan)[()]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2.0**h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items = items[order]
+        cum = np.cumsum(weights[order])
+        idx = np.searchsorted(cum, q_arr * cum[-1], side="left")
+        out = items[np.clip(idx, 0, items.size - 1)]
+        out = np.where(q_arr <= 0.0, self.min, np.where(q_arr >= 1.0, self.max, out))
+        return out[()]
+
+    def median(self) -> float:
+        """Approximate median."""
+        return float(self.quantile(0.5))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable state, including that of the coin-flip generator."""
+        return {
+            "k": self.k,
+            "n": self.n,
+            "sum": self.sum,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+            "levels": [level.tolist() for level in self.levels],
+            "rng": self._rng.bit_generator.state,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any], seed: Any = None) -> "KLLSketch":
+        """Sketch from to_dict state.
+
+        Without *seed* the coin flips continue the stored generator (or,
+        for states without one, a stream seeded from the stored items), so
+        restored shards do not repeat each other's flips.
+        """
+        if seed is None and "rng" not in state:
+            seed = [int(state["n"]), zlib.crc32(json.dumps(state["levels"]).encode("utf-8"))]
+        sketch = cls(k=state["k"], seed=0 if seed is None else seed)
+        if seed is None:
+            sketch._rng.bit_generator.state = state["rng"]
+        sketch.n = int(state["n"])
+        sketch.sum = float(state["sum"])
+        if sketch.n:
+            sketch.min = float(state["min"])
+            sketch.max = float(state["max"])
+        sketch.levels = [np.asarray(level, dtype=float) for level in state["levels"]] or [np.empty(0)]
+        return sketch
+
+
+def write_sketches(pair_dir: str, sketches: Dict[str, KLLSketch]) -> str:
+    """Write named sketches to sketches.json in pair_dir; return the path."""
+    path = os.path.join(pair_dir, SKETCHES_FILE)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({name: s.to_dict() for name, s in sketches.items()}, fh)
+    return path
+
+
+def read_sketches(pair_dir: str) -> Dict[str, KLLSketch]:
+    """Sketches stored in pair_dir (empty if the pair has none)."""
+    path = os.path.join(pair_dir, SKETCHES_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as fh:
+        return {name: KLLSketch.from_dict(state) for name, state in json.load(fh).items()}
+
+
+def merge_sketches(shards: Iterable[Dict[str, KLLSketch]]) -> Dict[str, KLLSketch]:
+    """Merge dicts of named sketches (e.g. read_sketches of several shards)."""
+    merged: Dict[str, KLLSketch] = {}
+    for shard in shards:
+        for name, sketch in shard.items():
+            if name in merged:
+                merged[name].merge(sketch)
+            else:
+                merged[name] = KLLSketch.from_dict(sketch.to_dict())
+    return merged
+
@@ -0,0 +1,175 @@
+"""N-dimensional parameter sweeps.
+
+A config's `sweep:` section declares parameter axes by dotted config path:
+
+    sweep:
+      axes:
+        kernel.slip_law.alpha: [0.5, 1.0, 2.0]
+        bundle_coupling.coupling_strength: [0.0, 0.1, 0.3]
+        phase_dynamics.params.coupling: [0.0, 0.5]
+      seeds: common        # or independent
+
+The run covers the Cartesian product of the axes (times wcoh_grid x
+bundle_sizes, as usual). Points are expanded into ordinary scalar
+configs, each identified by a stable ID, a hash of its (coerced)
+parameter values that does not depend on axis order or on the other
+points. sweep_points generates them one at a time, but run_batch takes
+the full list (sweep_configs): it orders and deduplicates the units of
+every point in one queue, so a run holds all point configs, which are
+small, in memory. Every point writes a normal run tree to
+output_dir/sweep/<point_id>/, and output_dir/sweep_index.json maps IDs
+to parameters, so slices of the sweep can be selected (select_points, or
+`cli sweep --where`) without opening any pair output. The catalog picks up
+every analysed point as a run of its own.
+
+With seeds "common" every point uses the config's random_seed (common
+random numbers, like the lambda replicas of a coupling_strength list), so
+points that differ only in analysis settings share their simulation
+units in run_batch; "independent" offsets the seed by the point ID.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import os
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from .config_schemas import TopLevelConfig, config_from_dict
+
+
+SWEEP_DIR = "sweep"
+SWEEP_INDEX = "sweep_index.json"
+
+
+class SweepPoint(NamedTuple):
+    point_id: str
+    params: Dict[str, Any]
+    cfg: TopLevelConfig
+
+
+def point_id(params: Dict[str, Any]) -> str:
+    """Stable ID of a sweep point from its parameter values."""
+    text = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _get(tree: Dict[str, Any], axis: str) -> Any:
+    for part in axis.split("."):
+        tree = tree[part]
+    return tree
+
+
+def _set(tree: Dict[str, Any], axis: str, value: Any) -> None:
+    *parents, leaf = axis.split(".")
+    for part in parents:
+        tree = tree[part]
+    tree[leaf] = value
+
+
+def point_config(cfg: TopLevelConfig, values: Dict[str, Any]) -> SweepPoint:
+    """The scalar config of one sweep point (axis -> value)."""
+    raw = asdict(cfg)
+    for axis, value in values.items():
+        _set(raw, axis, value)
+    raw["sweep"] = {}
+    # Parse once to coerce the values (e.g. 1 -> 1.0 for float fields), so
+    # equal parameters always give the same ID.
+    coerced = asdict(config_from_dict(raw))
+    params = {axis: _get(coerced, axis) for axis in values}
+    pid = point_id(params)
+    raw["output_dir"] = os.path.join(cfg.output_dir, SWEEP_DIR, pid)
+    raw["sweep"] = {"point_id": pid, "seeds": cfg.sweep.seeds}
+    if cfg.sweep.seeds == "independent":
+        raw["random_seed"] = cfg.random_seed + int(pid[:8], 16)
+    return SweepPoint(pid, params, config_from_dict(raw))
+
+
+def sweep_points(cfg: TopLevelConfig) -> Iterator[SweepPoint]:
+    """Points of cfg's sweep, generated lazily in axis-product order."""
+    axes = list(cfg.sweep.axes)
+    for combo in itertools.product(*(cfg.sweep.axes[a] for a in axes)):
+        yield point_config(cfg, dict(zip(axes, combo)))
+
+
+def write_sweep_index(cfg: TopLevelConfig, points: Sequence[SweepPoint]) -> str:
+    """Write output_dir/sweep_index.json for the given points; return its path."""
+    os.makedirs(cfg.output_dir, exist_ok=True)
+    index = {
+        "model_name": cfg.model_name,
+        "axes": cfg.sweep.axes,
+        "seeds": cfg.sweep.seeds,
+        "points": [
+            {
+                "point_id": p.point_id,
+                "params": p.params,
+                "path": os.path.join(SWEEP_DIR, p.point_id),
+                "random_seed": p.cfg.random_seed,
+            }
+            for p in points
+        ],
+    }
+    path = os.path.join(cfg.output_dir, SWEEP_INDEX)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(index, fh, indent=2)
+    return path
+
+
+def sweep_configs(cfg: TopLevelConfig) -> List[TopLevelConfig]:
+    """Per-point configs of a sweep (writing its index), or [cfg] without one.
+
+    All points are built up front, as run_batch schedules them together.
+    """
+    if not cfg.sweep.axes:
+        return [cfg]
+    points = list(sweep_points(cfg))
+    write_sweep_index(cfg, points)
+    return [p.cfg for p in points]
+
+
+def read_sweep_index(out_dir: str) -> Optional[Dict[str, Any]]:
+    """sweep_index.json of out_dir, or None if out_dir is not a sweep root."""
+    path = os.path.join(out_dir, SWEEP_INDEX)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _matches(value: Any, wanted: Any) -> bool:
+    options = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+    for option in options:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            try:
+                if float(option) == float(value):
+                    return True
+            except (TypeError, ValueError):
+                pass
+        elif str(option) == str(value):
+            return True
+    return False
+
+
+def select_points(out_dir: str, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Index entries of the points whose parameters match *where*.
+
+    where maps an axis (its dotted path, or just the last component when
+    that is unambiguous) to a value or a list of accepted values. Entries
+    carry point_id, params, path (relative to out_dir) and random_seed.
+    """
+    index = read_sweep_index(out_dir)
+    if index is None:
+        raise ValueError(f"{out_dir} has no {SWEEP_INDEX}")
+    axes = list(index["axes"])
+    resolved = {}
+    for key, wanted in (where or {}).items():
+        matches = [a for a in axes if a == key] or [a for a in axes if a.split(".")[-1] == key]
+        if len(matches) != 1:
+            raise ValueError(f"{key!r} matches {len(matches)} sweep axes of {out_dir}: {axes}")
+        resolved[matches[0]] = wanted
+    return [
+        p for p in index["points"]
+        if all(_matches(p["params"][axis], wanted) for axis, wanted in resolved.items())
+    ]
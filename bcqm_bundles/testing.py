@@ -11,7 +11,7 @@ import tempfile
 
 import numpy as np
 
-from .config_schemas import TopLevelConfig, EnsembleConfig, KernelConfig, SlipLawConfig, BundleCouplingConfig, PhaseDynamicsConfig, PhaseDynamicsParams, AnalysisConfig
+from .config_schemas import TopLevelConfig, EnsembleConfig, KernelConfig, SlipLawConfig, BundleCouplingConfig, GraphConfig, PhaseDynamicsConfig, PhaseDynamicsParams, AnalysisConfig, PSDConfig
 from .simulate import run_all
 from .analysis import analyse_pair
 
@@ -37,3 +37,27 @@ def quick_independent_check() -> None:
             pair_dir = os.path.join(cfg.output_dir, f"W{int(W)}_N{N}")
             summary = analyse_pair(cfg, pair_dir)
             print(f"W={W}, N={N}, A_mean={summary['A_mean']:.3g}, kappa_eff={summary['kappa_eff']:.3g}")
+
+
+def quick_local_check() -> None:
+    """Run a tiny local-mode check with a scalar lambda (a single replica)."""
+    tmpdir = tempfile.mkdtemp(prefix="bcqm_bundles_test_")
+    for kind in ("ring", "random"):
+        cfg = TopLevelConfig(
+            model_name=f"test_local_{kind}",
+            output_dir=os.path.join(tmpdir, kind),
+            random_seed=123,
+            wcoh_grid=[10.0],
+            bundle_sizes=[1, 8],
+            ensemble=EnsembleConfig(n_ensembles=4, steps_per_wcoh=100),
+            bundle_coupling=BundleCouplingConfig(
+                mode="local", coupling_strength=0.5, graph=GraphConfig(kind=kind, mean_degree=3.0)
+            ),
+            analysis=AnalysisConfig(psd=PSDConfig(segment_length=256)),
+        )
+        run_all(cfg)
+        for N in cfg.bundle_sizes:
+            pair_dir = os.path.join(cfg.output_dir, f"W10_N{N}")
+            summary = analyse_pair(cfg, pair_dir)
+            assert np.isfinite(summary["mean_Sv"]), summary
+            print(f"{kind}: N={N}, mean_Sv={summary['mean_Sv']:.3g}, kappa_eff={summary['kappa_eff']:.3g}")
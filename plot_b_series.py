@@ -2,19 +2,22 @@
 """
 BCQM IV_d B-series plotting script
 
-Generates BCQM-style figures comparing A2/B1/B2/B3:
+Generates BCQM-style figures comparing A2/B1/B2/B3, reading the run
+summaries from the results catalog (outputs_bundles/catalog.sqlite, brought
+up to date on every call; see bcqm_bundles.catalog):
  - Fig_B_series_ratio_W100.png   (amplitude suppression vs N at W=100)
  - Fig_B_series_beta_vs_N.png    (beta_COM(N) vs N)
  - Fig_B_series_diagnostics_W100.png (Sv and kappa_eff vs N at W=100)
 """
 
-import json
 import math
 from pathlib import Path
 
 import matplotlib.pyplot as plt
 import numpy as np
 
+from bcqm_bundles.catalog import default_catalog_path, load_beta_fits, load_run, update_catalog
+
 
 # ---------------------------------------------------------------------
 # 1. Config: where the runs live
@@ -22,26 +25,29 @@ import numpy as np
 
 BASE = Path(__file__).resolve().parent
 OUT_BASE = BASE / "outputs_bundles"
+CATALOG = default_catalog_path(str(OUT_BASE))
+
+# Runs are catalog run_dir values (directories relative to OUT_BASE)
 
 RUNS = {
     "A2 λ=0": {
         "label": r"$\lambda = 0$ (independent)",
-        "path": OUT_BASE / "run_A2_independent",
+        "run": "run_A2_independent",
         "lambda": 0.0,
     },
     "B1 λ=0.25": {
         "label": r"$\lambda = 0.25$",
-        "path": OUT_BASE / "run_B1_shared_bias",
+        "run": "run_B1_shared_bias",
         "lambda": 0.25,
     },
     "B2 λ=0.5": {
         "label": r"$\lambda = 0.5$",
-        "path": OUT_BASE / "run_B2_shared_bias_stronger",
+        "run": "run_B2_shared_bias_stronger",
         "lambda": 0.5,
     },
     "B3 λ=0.75": {
         "label": r"$\lambda = 0.75$",
-        "path": OUT_BASE / "run_B3_shared_bias_75",
+        "run": "run_B3_shared_bias_75",
         "lambda": 0.75,
     },
 }
@@ -54,17 +60,20 @@ W_SLICE = 100.0
 # 2. Helpers
 # ---------------------------------------------------------------------
 
-def parse_key(key: str):
-    """Keys are of the form 'W20.0_N4' etc."""
-    W_part, N_part = key.split("_")
-    W = float(W_part[1:])
-    N = int(N_part[1:])
-    return W, N
+def load_summary(run: str):
+    """Summary metrics of one run from the catalog, keyed by (W_coh, N)."""
+    summary = load_run(CATALOG, run)
+    if not summary:
+        raise SystemExit(f"No analysed pairs for {run!r} in {CATALOG}")
+    return summary
 
 
-def load_summary(run_path: Path):
-    with open(run_path / "summary.json", "r", encoding="utf-8") as fh:
-        return json.load(fh)
+def ci_yerr(values, lows, highs):
+    """Asymmetric error bars from bootstrap CIs, or None if any are missing."""
+    if any(v is None for v in list(lows) + list(highs)):
+        return None
+    values = np.asarray(values)
+    return np.vstack([values - np.asarray(lows), np.asarray(highs) - values])
 
 
 def bcqm_style(ax, title: str):
@@ -81,14 +90,18 @@ def bcqm_style(ax, title: str):
 # 3. Load all runs
 # ---------------------------------------------------------------------
 
+update_catalog(str(OUT_BASE), CATALOG)
+
 summaries = {}
+beta_fits = {}
 for name, cfg in RUNS.items():
-    summaries[name] = load_summary(cfg["path"])
+    summaries[name] = load_summary(cfg["run"])
+    beta_fits[name] = load_beta_fits(CATALOG, cfg["run"])
 
 # Check N and W grids from the first run
 first_run = next(iter(summaries.values()))
-Ws = sorted({parse_key(k)[0] for k in first_run})
-Ns = sorted({parse_key(k)[1] for k in first_run})
+Ws = sorted({W for W, _ in first_run})
+Ns = sorted({N for _, N in first_run})
 
 print("W grid:", Ws)
 print("N grid:", Ns)
@@ -104,19 +117,24 @@ for name, cfg in RUNS.items():
     summary = summaries[name]
 
     # Build A_single(W) from N=1
-    A_single = {W: summary[f"W{W}_N1"]["A_mean"] for W in Ws}
+    A_single = {W: summary[(W, 1)]["A_mean"] for W in Ws}
 
     ratios = []
     for N in Ns:
-        key = f"W{W_SLICE}_N{N}"
-        A = summary[key]["A_mean"]
+        A = summary[(W_SLICE, N)]["A_mean"]
         ref = A_single[W_SLICE] / math.sqrt(N)
         ratios.append(A / ref)
 
-    ax1.plot(
+    # Bootstrap CIs of the ratio, if the run was analysed with them
+    rows = [summary[(W_SLICE, N)] for N in Ns]
+    yerr = ci_yerr(ratios, [r.get("ratio_ci_low") for r in rows], [r.get("ratio_ci_high") for r in rows])
+
+    ax1.errorbar(
         Ns,
         ratios,
+        yerr=yerr,
         marker="o",
+        capsize=3,
         label=cfg["label"],
     )
 
@@ -147,21 +165,34 @@ fig2, ax2 = plt.subplots(figsize=(8.5, 5.5))
 
 for name, cfg in RUNS.items():
     summary = summaries[name]
+    fits = beta_fits[name]
     beta_vals = []
-
-    for N in Ns:
-        # gather A(W) for this N
-        As = np.array([summary[f"W{W}_N{N}"]["A_mean"] for W in Ws])
-        logW = np.log10(np.array(Ws))
-        logA = np.log10(As)
-        m, c = np.polyfit(logW, logA, 1)
-        beta = -m
-        beta_vals.append(beta)
-
-    ax2.plot(
+    yerr = None
+
+    if all(N in fits for N in Ns):
+        # Bootstrap fits from the analysis stage (beta_fit W_coh range)
+        beta_vals = [fits[N]["beta"] for N in Ns]
+        yerr = ci_yerr(
+            beta_vals,
+            [fits[N]["beta_ci_low"] for N in Ns],
+            [fits[N]["beta_ci_high"] for N in Ns],
+        )
+    else:
+        for N in Ns:
+            # gather A(W) for this N
+            As = np.array([summary[(W, N)]["A_mean"] for W in Ws])
+            logW = np.log10(np.array(Ws))
+            logA = np.log10(As)
+            m, c = np.polyfit(logW, logA, 1)
+            beta = -m
+            beta_vals.append(beta)
+
+    ax2.errorbar(
         Ns,
         beta_vals,
+        yerr=yerr,
         marker="o",
+        capsize=3,
         label=cfg["label"],
     )
 
@@ -207,8 +238,7 @@ for name, cfg in RUNS.items():
     kappa_vals = []
 
     for N in Ns:
-        key = f"W{W_SLICE}_N{N}"
-        d = summary[key]
+        d = summary[(W_SLICE, N)]
         Sv_means.append(d["mean_Sv"])
         kappa_vals.append(d["kappa_eff"])
 